@@ -1,3 +1,7 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Game, PlayerBio, TeamGameLog
+
+admin.site.register(Game)
+admin.site.register(PlayerBio)
+admin.site.register(TeamGameLog)
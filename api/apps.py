@@ -1,5 +1,30 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+    default_auto_field = 'django.db.models.AutoField'
+
+    def ready(self):
+        if settings.NBA_API_DISK_CACHE:
+            from .cache import install_disk_cache
+            install_disk_cache(settings.NBA_API_DISK_CACHE)
+
+        # The search indexes and the warmer are only needed by web workers
+        # (gunicorn starts them in each worker, see gunicorn.conf.py), not by
+        # every manage.py command. Under runserver, only the autoreloader
+        # child serves requests.
+        if 'runserver' in sys.argv[1:2]:
+            if os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv:
+                # Built in the background so they do not hold up the boot, or
+                # already built by the preload (see api/preload.py)
+                if not settings.NBA_API_PRELOAD:
+                    from .search import start_building
+                    start_building()
+                if settings.NBA_API_WARMER:
+                    from .warmer import start
+                    start()
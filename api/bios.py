@@ -0,0 +1,170 @@
+"""API App Player Bios Module
+
+=== Module Description ===
+This module contains the shared loader of player bios (CommonPlayerInfo),
+used by every view showing a player.
+
+Bios change at most a few times a season, so a bio is kept for
+NBA_API_PLAYER_BIO_TIMEOUT seconds, first in the nba_api cache and then in
+the local store, and only fetched upstream when missing from both. Bios can
+also be loaded in batches (<get_bios>), e.g. for every player of a roster, and
+prefetched in the background (<prefetch>) for the players a visitor is
+likely to open next.
+
+Prefetches are low priority upstream requests (see api/upstream.py), so they
+never hold back the requests of visitors. A player is only queued for
+prefetching once, and at most NBA_API_PREFETCH_QUEUE_SIZE players are queued
+at once: the others are dropped.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from dateutil import parser
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection
+
+from . import endpoints, schema, store
+from .cache import CACHE_ALIAS, fetch, get_or_build
+from .upstream import UpstreamUnavailable, low_priority
+from .utils import iter_concurrently
+
+logger = logging.getLogger(__name__)
+
+PLAYER_PHOTO_LINK = "https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{player_id}.png"
+
+# Prefetches run one at a time, each loading its batch one bio at a time
+_prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='nba-api-bio-prefetch')
+# Players queued for prefetching
+_queued: Set[str] = set()
+_queued_lock = threading.Lock()
+
+
+def make_key(player_id: str) -> str:
+    """Return the cache key of the bio of player <player_id>.
+    """
+    return f'player_bio:{player_id}'
+
+
+def fetch_bio(player_id: str) -> Dict:
+    """Return the bio of player <player_id> fetched upstream.
+    """
+    bio = schema.PLAYER_INFO.records(fetch(endpoints.CommonPlayerInfo, player_id).common_player_info)[0]
+    bio['BIRTHDATE'] = parser.parse(bio['BIRTHDATE']).strftime('%Y-%m-%d')
+    return bio
+
+
+def prefetch_bio(player_id: str) -> Optional[Dict]:
+    """Return the bio of player <player_id> fetched upstream, or None if the
+    low priority request was deferred.
+    """
+    try:
+        return fetch_bio(player_id)
+    except UpstreamUnavailable as error:
+        logger.debug('Prefetch of player %s deferred: %s', player_id, error)
+        return None
+
+
+def get_bio(player_id: str) -> Dict:
+    """Return the bio of player <player_id>.
+    """
+    def build() -> Dict:
+        bio = store.load_player_bio(player_id)
+        if bio is None:
+            bio = store.save_player_bio(player_id, fetch_bio(player_id))
+        return bio
+
+    return get_or_build(make_key(player_id), build, lambda bio: settings.NBA_API_PLAYER_BIO_TIMEOUT)
+
+
+def get_bios(player_ids: Iterable[str], save: bool = True, max_workers: Optional[int] = None,
+             fetch_missing: Callable[[str], Optional[Dict]] = fetch_bio) -> Dict[str, Dict]:
+    """Return the bios of players <player_ids>, by player ID.
+
+    Bios are read from the cache and then the local store in a single lookup
+    each, and the others fetched upstream with <fetch_missing> concurrently,
+    by up to <max_workers> threads. Fetched bios are saved to the local store
+    from this thread, as SQLite only allows one writer at a time, unless
+    <save> is False. Bios that fail to load (or are fetched as None) are left
+    out.
+    """
+    cache = caches[CACHE_ALIAS]
+    player_ids = [str(player_id) for player_id in dict.fromkeys(player_ids)]
+    cached = cache.get_many([make_key(player_id) for player_id in player_ids])
+    bios = {
+        player_id: cached[make_key(player_id)] for player_id in player_ids if make_key(player_id) in cached
+    }
+
+    stored = store.load_player_bios([player_id for player_id in player_ids if player_id not in bios])
+    missing = [player_id for player_id in player_ids if player_id not in bios and player_id not in stored]
+    fetched = {}
+    for player_id, bio in iter_concurrently(fetch_missing, missing, max_workers):
+        if bio is None:
+            continue
+        fetched[player_id] = store.save_player_bio(player_id, bio) if save else bio
+
+    loaded = {**stored, **fetched}
+    cache.set_many(
+        {make_key(player_id): bio for player_id, bio in loaded.items()},
+        settings.NBA_API_PLAYER_BIO_TIMEOUT
+    )
+    bios.update(loaded)
+    return bios
+
+
+def prefetch(player_ids: Iterable[str]) -> None:
+    """Load the bios of players <player_ids> in the background, if not
+    cached or queued yet and the NBA_API_PREFETCH_BIOS setting is on.
+
+    Prefetched bios are only cached, so prefetches never write to the local
+    store concurrently with requests.
+    """
+    if not settings.NBA_API_PREFETCH_BIOS:
+        return
+
+    player_ids = [str(player_id) for player_id in dict.fromkeys(player_ids)]
+    cached = caches[CACHE_ALIAS].get_many([make_key(player_id) for player_id in player_ids])
+    with _queued_lock:
+        room = max(settings.NBA_API_PREFETCH_QUEUE_SIZE - len(_queued), 0)
+        missing = [
+            player_id for player_id in player_ids
+            if make_key(player_id) not in cached and player_id not in _queued
+        ][:room]
+        _queued.update(missing)
+
+    if missing:
+        _prefetcher.submit(run_prefetch, missing)
+
+
+def run_prefetch(player_ids: List[str]) -> None:
+    """Load the bios of players <player_ids> without saving them, as low
+    priority requests.
+
+    It runs in the long-lived prefetcher thread, so its database connection
+    is closed once done rather than left open between prefetches.
+    """
+    token = low_priority.set(True)
+    close_old_connections()
+    try:
+        get_bios(player_ids, save=False, max_workers=1, fetch_missing=prefetch_bio)
+    except Exception:
+        logger.exception('Failed to prefetch player bios')
+    finally:
+        low_priority.reset(token)
+        with _queued_lock:
+            _queued.difference_update(player_ids)
+        connection.close()
+
+
+def profile(player_id: str, bio: Dict) -> Dict:
+    """Return <bio> of player <player_id> with the photo URL and age of the
+    player added.
+    """
+    return {
+        **bio,
+        'PHOTO_URL': PLAYER_PHOTO_LINK.format(player_id=player_id),
+        'AGE': datetime.today().year - parser.parse(bio['BIRTHDATE']).year
+    }
@@ -0,0 +1,394 @@
+"""API App Upstream Cache Module
+
+=== Module Description ===
+This module contains the caching layer wrapped around every nba_api endpoint
+call made by the API app.
+
+Endpoint responses are cached by endpoint class and request parameters in the
+<nba_api> django cache (an in-memory LRU cache by default), each endpoint with
+its own TTL. Optionally, a requests-cache SQLite session can be installed
+underneath nba_api so raw responses also persist on disk across workers and
+restarts (see <install_disk_cache>).
+
+Concurrent fetches of the same endpoint and parameters are coalesced into a
+single upstream request (see api/singleflight.py), across the threads of a
+worker and, with the NBA_API_SINGLE_FLIGHT_LOCK setting, across workers
+sharing the cache through a lock key.
+
+Requests sent upstream go through the rate limiter and circuit breaker of
+api/upstream.py. Every response is also kept under a stale key for
+NBA_API_STALE_TIMEOUT seconds, and served (flagged stale) while the breaker
+is open, the request fails, or the same request is already in flight.
+
+Assembled payloads can also be cached with <get_or_build>, with a TTL derived
+from the payload itself (see <game_timeout>).
+
+Inside a <refreshing> block, cached responses are ignored and replaced by
+fresh ones, which is how the cache warmer (see api/warmer.py) refreshes
+datasets before they expire.
+
+@date: 10/18/2026
+"""
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date as date_type, datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Type
+
+import pytz
+from dateutil import parser
+from django.conf import settings
+from django.core.cache import caches
+from nba_api.stats.library.http import NBAStatsHTTP, NBAStatsResponse
+
+from . import replay
+from .metrics import CACHE_REQUESTS, UPSTREAM_REQUESTS
+from .singleflight import SingleFlight
+from .timing import PARSE, UPSTREAM, timed
+from .upstream import UpstreamUnavailable, allow_low_priority, breaker, limiter, low_priority, mark_stale
+from .utils import is_final_status
+
+# Constants
+CACHE_ALIAS = 'nba_api'
+DEFAULT_TIMEOUT = 60
+ENDPOINT_TIMEOUTS = {
+    'CommonPlayerInfo': 24 * 60 * 60,
+    'CommonTeamRoster': 6 * 60 * 60,
+    'LeagueDashTeamStats': 10 * 60,
+    'LeagueGameFinder': 60,
+    'LeagueLeaders': 10 * 60,
+    'LeagueStandings': 10 * 60,
+    'PlayerCareerStats': 60 * 60,
+    'PlayerGameLog': 10 * 60,
+    'TeamGameLog': 10 * 60,
+    'TeamInfoCommon': 60 * 60,
+    'TeamPlayerDashboard': 10 * 60
+}
+# Endpoints of the box score of a game, cached for the live game TTL: final
+# games are served from the local store instead (see api/store.py)
+LIVE_GAME_ENDPOINTS = ['BoxScoreSummaryV2', 'BoxScoreTraditionalV2']
+UPSTREAM_TIMEZONE = pytz.timezone('US/Eastern')
+LOCK_POLL_INTERVAL = 0.05
+
+# In-flight upstream requests of this process
+flights = SingleFlight()
+
+# Minimum TTL of responses fetched inside a <refreshing> block, None outside
+_refresh_timeout: ContextVar[Optional[int]] = ContextVar('refresh_timeout', default=None)
+
+
+def get_timeout(endpoint_cls: Type) -> int:
+    """Return the cache TTL in seconds for given endpoint class.
+    """
+    return get_timeouts().get(endpoint_cls.__name__, DEFAULT_TIMEOUT)
+
+
+def get_timeouts() -> Dict[str, int]:
+    """Return the cache TTL in seconds of every endpoint with its own, by
+    endpoint class name.
+
+    Box score endpoints get the NBA_API_LIVE_GAME_TIMEOUT setting, and
+    timeouts can be overridden per endpoint through the
+    NBA_API_CACHE_TIMEOUTS setting.
+    """
+    overrides = getattr(settings, 'NBA_API_CACHE_TIMEOUTS', {})
+    live = {name: settings.NBA_API_LIVE_GAME_TIMEOUT for name in LIVE_GAME_ENDPOINTS}
+    return {**ENDPOINT_TIMEOUTS, **live, **overrides}
+
+
+def make_key(endpoint_cls: Type, args: tuple, kwargs: Dict[str, Any]) -> str:
+    """Return the cache key for an endpoint call with given parameters.
+
+    The request <timeout> does not change the response, so it is not part of
+    the key.
+    """
+    params = repr((
+        [str(arg) for arg in args],
+        sorted((key, str(value)) for key, value in kwargs.items() if key != 'timeout')
+    ))
+    digest = hashlib.md5(params.encode('utf-8')).hexdigest()
+    return f'{endpoint_cls.__name__}:{digest}'
+
+
+def install_disk_cache(path: str) -> None:
+    """Install a requests-cache SQLite cache at <path> for raw stats.nba.com
+    responses, with the same per-endpoint TTLs as the in-memory cache.
+
+    Requests to any other host are not cached, nor are responses other than
+    JSON (see <send_request>).
+    """
+    import requests_cache
+
+    timeouts = get_timeouts()
+    requests_cache.install_cache(
+        path,
+        backend='sqlite',
+        expire_after=0,
+        filter_fn=lambda response: 'json' in response.headers.get('Content-Type', ''),
+        urls_expire_after={
+            f'stats.nba.com/stats/{name.lower()}': timeout
+            for name, timeout in timeouts.items()
+        }
+    )
+
+
+def fetch(endpoint_cls: Type, *args, **kwargs) -> Any:
+    """Return a loaded endpoint object of class <endpoint_cls>.
+
+    The endpoint is rebuilt from the cached raw response if there is one,
+    otherwise the request is sent to stats.nba.com (or joins the identical
+    request already in flight) and its raw response is cached for the
+    endpoint TTL.
+
+    Example:
+        fetch(BoxScoreSummaryV2, game_id) instead of BoxScoreSummaryV2(game_id)
+    """
+    cache = caches[CACHE_ALIAS]
+    key = make_key(endpoint_cls, args, kwargs)
+    refresh_timeout = _refresh_timeout.get()
+    response = cache.get(key) if refresh_timeout is None else None
+    CACHE_REQUESTS.inc(cache=CACHE_ALIAS, result='miss' if response is None else 'hit')
+    if response is None:
+        response = fetch_or_stale(key, refresh_timeout, endpoint_cls, *args, **kwargs)
+
+    with timed(PARSE):
+        endpoint = endpoint_cls(*args, get_request=False, **kwargs)
+        endpoint.nba_response = NBAStatsResponse(response=response, status_code=200, url=None)
+        endpoint.load_response()
+    return endpoint
+
+
+def fetch_or_stale(key: str, refresh_timeout: Optional[int], endpoint_cls: Type,
+                   *args, **kwargs) -> str:
+    """Return the raw response of an endpoint request, fetched upstream
+    through the in-flight requests of the process.
+
+    The last good response is served stale instead if the same request is
+    already in flight, or if this one fails. Raise UpstreamUnavailable if it
+    fails and there is no stale response, or if it is low priority and cannot
+    be sent now (see <upstream.allow_low_priority>).
+    """
+    # Low priority requests wait for room before joining the requests in
+    # flight, so requests of visitors never share one that is held back
+    if low_priority.get() and not replay.is_replaying() and not allow_low_priority():
+        UPSTREAM_REQUESTS.inc(endpoint=endpoint_cls.__name__, outcome='rejected')
+        raise UpstreamUnavailable('Low priority request deferred')
+
+    stale = caches[CACHE_ALIAS].get(f'stale:{key}')
+    if stale is not None and flights.in_flight(key):
+        return serve_stale(stale)
+
+    try:
+        return flights.do(
+            key,
+            lambda: fetch_response(key, refresh_timeout, stale is not None, endpoint_cls, *args, **kwargs)
+        )
+    except Exception as error:
+        if stale is not None:
+            return serve_stale(stale)
+        if isinstance(error, UpstreamUnavailable):
+            raise
+        raise UpstreamUnavailable(f'{endpoint_cls.__name__} request failed: {error!r}') from error
+
+
+def serve_stale(response: str) -> str:
+    """Return stale <response>, flagging the request being served as stale.
+    """
+    flights.increment('stale_served')
+    CACHE_REQUESTS.inc(cache=CACHE_ALIAS, result='stale')
+    mark_stale()
+    return response
+
+
+def send_request(endpoint_cls: Type, *args, **kwargs) -> str:
+    """Send the request of an endpoint to stats.nba.com and return its raw
+    response, checked to be valid JSON but not parsed into the endpoint.
+
+    Raise UpstreamUnavailable if stats.nba.com answered with an error status
+    or anything other than JSON (e.g. the HTML page served when throttling),
+    so the response is never cached and counts as a failure.
+
+    In record/replay mode, the response is recorded to or replayed from
+    fixtures (see api/replay.py).
+    """
+    name = endpoint_cls.__name__
+    endpoint = endpoint_cls(*args, get_request=False, **kwargs)
+    with timed(UPSTREAM, name):
+        if replay.is_replaying():
+            nba_response = NBAStatsResponse(
+                response=replay.replay(endpoint.endpoint, endpoint.parameters), status_code=200, url=None
+            )
+        else:
+            nba_response = NBAStatsHTTP().send_api_request(
+                endpoint=endpoint.endpoint,
+                parameters=endpoint.parameters,
+                proxy=endpoint.proxy,
+                headers=endpoint.headers,
+                timeout=endpoint.timeout
+            )
+
+    # nba_api has no getter for the status code of its responses
+    status_code = nba_response._status_code
+    if status_code != 200:
+        raise UpstreamUnavailable(f'{name} request failed with status {status_code}')
+    with timed(PARSE):
+        if not nba_response.valid_json():
+            raise UpstreamUnavailable(f'{name} response is not valid JSON')
+
+    response = nba_response.get_response()
+    if replay.is_recording():
+        replay.record(endpoint.endpoint, endpoint.parameters, response)
+    return response
+
+
+def send_guarded_request(has_stale: bool, endpoint_cls: Type, *args, **kwargs) -> str:
+    """Send the request of an endpoint to stats.nba.com through the circuit
+    breaker and rate limiter, and return its raw response.
+
+    Raise UpstreamUnavailable if the breaker is open, or if no request can be
+    sent within the rate limit: right away when a stale response can be
+    served instead (<has_stale>), otherwise within NBA_API_TIMEOUT seconds.
+    A trial request of the half open breaker that is rate limited is given
+    back to the breaker.
+    Replayed responses bypass both guards, and low priority requests were
+    already let through by <fetch_or_stale>.
+    """
+    if replay.is_replaying():
+        return send_request(endpoint_cls, *args, **kwargs)
+    name = endpoint_cls.__name__
+    if not low_priority.get():
+        if not breaker.allow():
+            UPSTREAM_REQUESTS.inc(endpoint=name, outcome='rejected')
+            raise UpstreamUnavailable('Circuit breaker open')
+        if not limiter.acquire(timeout=0 if has_stale else settings.NBA_API_TIMEOUT):
+            # Neither a success nor a failure: without a release, a trial
+            # request would leave the breaker half open for good
+            breaker.release()
+            flights.increment('rate_limited')
+            UPSTREAM_REQUESTS.inc(endpoint=name, outcome='rejected')
+            raise UpstreamUnavailable('Rate limit exceeded')
+
+    try:
+        response = send_request(endpoint_cls, *args, **kwargs)
+    except Exception:
+        breaker.record_failure()
+        UPSTREAM_REQUESTS.inc(endpoint=name, outcome='error')
+        raise
+
+    breaker.record_success()
+    UPSTREAM_REQUESTS.inc(endpoint=name, outcome='success')
+    return response
+
+
+def fetch_response(key: str, refresh_timeout: Optional[int], has_stale: bool,
+                   endpoint_cls: Type, *args, **kwargs) -> str:
+    """Send the request of an endpoint upstream, cache its raw response at
+    <key> (and at its stale key) and return it.
+
+    With the NBA_API_SINGLE_FLIGHT_LOCK setting, only the worker holding the
+    lock of <key> sends the request, and the others wait for its response to
+    show up in the cache, unless they can serve a stale response. A worker
+    that waited NBA_API_TIMEOUT seconds in vain sends the request itself.
+    """
+    cache = caches[CACHE_ALIAS]
+    timeout = max(get_timeout(endpoint_cls), refresh_timeout or 0)
+
+    def send() -> str:
+        response = send_guarded_request(has_stale, endpoint_cls, *args, **kwargs)
+        cache.set(key, response, timeout)
+        cache.set(f'stale:{key}', response, settings.NBA_API_STALE_TIMEOUT)
+        return response
+
+    if not settings.NBA_API_SINGLE_FLIGHT_LOCK:
+        return send()
+
+    lock_key = f'lock:{key}'
+    locked = cache.add(lock_key, 1, settings.NBA_API_TIMEOUT)
+    if not locked and has_stale:
+        raise UpstreamUnavailable('Request in flight in another worker')
+    if not locked:
+        flights.increment('lock_waits')
+        deadline = time.monotonic() + settings.NBA_API_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            response = cache.get(key)
+            if response is not None:
+                flights.increment('coalesced_across_workers')
+                return response
+            if cache.get(lock_key) is None:
+                break
+
+    try:
+        return send()
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def get_or_build(key: str, build: Callable[[], Any],
+                 timeout: Callable[[Any], Optional[int]]) -> Any:
+    """Return the value cached at <key>, or build it with <build> and cache it
+    for <timeout>(value) seconds (forever if None).
+
+    Like <fetch>, the cached value is ignored inside a <refreshing> block.
+    """
+    cache = caches[CACHE_ALIAS]
+    value = cache.get(key) if _refresh_timeout.get() is None else None
+    CACHE_REQUESTS.inc(cache='payload', result='miss' if value is None else 'hit')
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout(value))
+
+    return value
+
+
+def game_timeout(summary: Dict[str, Any]) -> Optional[int]:
+    """Return the cache TTL in seconds of the payload of a game with given
+    <summary>, based on its status:
+      - Final: forever (None)
+      - live: the NBA_API_LIVE_GAME_TIMEOUT setting
+      - scheduled: until tip-off, with at least the live TTL
+    """
+    status = summary['GAME_STATUS_TEXT'] or ''
+    live_timeout = settings.NBA_API_LIVE_GAME_TIMEOUT
+    if is_final_status(status):
+        return None
+    if (summary['LIVE_PERIOD'] or 0) > 0:
+        return live_timeout
+
+    try:
+        date = parser.parse(summary['GAME_DATE_EST']).date()
+    except (ValueError, OverflowError):
+        return DEFAULT_TIMEOUT
+    until_tip_off = seconds_until_tip_off(status, date)
+    if until_tip_off is None:
+        return DEFAULT_TIMEOUT
+    return max(int(until_tip_off), live_timeout)
+
+
+def seconds_until_tip_off(status: str, date: date_type) -> Optional[float]:
+    """Return the number of seconds until tip-off of a game scheduled on
+    <date>, or None if its <status> text is not a tip-off time.
+
+    Scheduled games carry their tip-off time (Eastern) as status text, e.g.
+    '7:30 pm ET'.
+    """
+    try:
+        tip_off = parser.parse(status.replace('ET', ''), default=datetime(date.year, date.month, date.day))
+    except (ValueError, OverflowError):
+        return None
+
+    return (UPSTREAM_TIMEZONE.localize(tip_off) - datetime.now(pytz.utc)).total_seconds()
+
+
+@contextmanager
+def refreshing(min_timeout: int = 0) -> Iterator[None]:
+    """Context in which every <fetch> goes upstream and replaces the cached
+    response, kept for at least <min_timeout> seconds.
+    """
+    token = _refresh_timeout.set(min_timeout)
+    try:
+        yield
+    finally:
+        _refresh_timeout.reset(token)
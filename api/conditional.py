@@ -0,0 +1,104 @@
+"""API App Conditional GET Module
+
+=== Module Description ===
+This module contains the <conditional> view decorator that adds ETag and
+Last-Modified validators to API responses and answers conditional requests
+(If-None-Match / If-Modified-Since) with 304 Not Modified.
+
+The ETag is a hash of the rendered body, and Last-Modified is the time that
+body last changed. Both are kept in the nba_api cache by request path and
+Accept header for a short validity period, during which a conditional request
+is answered without building or rendering the payload at all. Past it, the
+payload is built again (mostly from cached upstream data), and the request
+still gets a 304 if the body did not change.
+"""
+import hashlib
+import time
+from functools import wraps
+from typing import Any, Callable, Optional, Union
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import CACHE_ALIAS
+
+Timeout = Union[None, int, Callable[[Any], Optional[int]]]
+
+
+def make_key(request) -> str:
+    """Return the cache key of the validators of <request>.
+    """
+    params = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+    return f"etag:{hashlib.md5(params.encode('utf-8')).hexdigest()}"
+
+
+def set_validators(response: HttpResponse, etag: str, last_modified: int) -> HttpResponse:
+    """Set the ETag and Last-Modified headers of <response> and return it.
+    """
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional(timeout: Timeout = None) -> Callable:
+    """Return a decorator adding conditional GET support to an API view.
+
+    === Attributes ===
+    timeout:
+        how long, in seconds, the validators of a response are trusted without
+        building the payload again. Either a number, or a function of the
+        response data returning a number (None for forever). Defaults to the
+        NBA_API_ETAG_TIMEOUT setting.
+
+    Example:
+        @conditional(timeout=lambda data: game_timeout(data['summary']))
+        @api_view(['GET'])
+        def game_by_id_api(request, game_id):
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cache = caches[CACHE_ALIAS]
+            key = make_key(request)
+            validators = cache.get(key)
+            if validators is not None:
+                not_modified = get_conditional_response(
+                    request,
+                    etag=validators[0],
+                    last_modified=validators[1],
+                    response=set_validators(HttpResponse(), *validators)
+                )
+                if not_modified.status_code == 304:
+                    return not_modified
+
+            response = view(request, *args, **kwargs)
+            # Streamed responses are sent as they are built, so have no ETag
+            if response.status_code != 200 or response.streaming:
+                return response
+
+            response.render()
+            etag = quote_etag(hashlib.sha1(response.content).hexdigest())
+            if validators is not None and validators[0] == etag:
+                last_modified = validators[1]
+            else:
+                last_modified = int(time.time())
+
+            if timeout is None:
+                validity = settings.NBA_API_ETAG_TIMEOUT
+            elif callable(timeout):
+                validity = timeout(response.data)
+            else:
+                validity = timeout
+            cache.set(key, (etag, last_modified), validity)
+
+            set_validators(response, etag, last_modified)
+            return get_conditional_response(
+                request, etag=etag, last_modified=last_modified, response=response
+            )
+
+        return wrapper
+
+    return decorator
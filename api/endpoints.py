@@ -0,0 +1,49 @@
+"""API App Endpoints Module
+
+=== Module Description ===
+This module gives lazy access to the nba_api endpoint classes used by the
+services, e.g. endpoints.LeagueStandings.
+
+Importing any nba_api endpoint module imports every endpoint of the package
+and pandas, which takes most of the startup time of a web worker. Endpoint
+classes are only imported the first time they are accessed here, so workers
+boot without them, and the first request needing an endpoint pays for it.
+With the NBA_API_PRELOAD setting, they are all imported once before the
+workers are forked instead (see api/preload.py).
+"""
+from importlib import import_module
+from typing import Type
+
+# Module of every endpoint class used, in nba_api.stats.endpoints
+MODULES = {
+    'BoxScoreSummaryV2': 'boxscoresummaryv2',
+    'BoxScoreTraditionalV2': 'boxscoretraditionalv2',
+    'CommonPlayerInfo': 'commonplayerinfo',
+    'CommonTeamRoster': 'commonteamroster',
+    'LeagueDashTeamStats': 'leaguedashteamstats',
+    'LeagueGameFinder': 'leaguegamefinder',
+    'LeagueLeaders': 'leagueleaders',
+    'LeagueStandings': 'leaguestandings',
+    'PlayerCareerStats': 'playercareerstats',
+    'PlayerGameLog': 'playergamelog',
+    'TeamGameLog': 'teamgamelog',
+    'TeamInfoCommon': 'teaminfocommon',
+    'TeamPlayerDashboard': 'teamplayerdashboard'
+}
+
+
+def __getattr__(name: str) -> Type:
+    if name not in MODULES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    endpoint_cls = getattr(import_module(f'nba_api.stats.endpoints.{MODULES[name]}'), name)
+    # Later accesses find the class without going through __getattr__
+    globals()[name] = endpoint_cls
+    return endpoint_cls
+
+
+def load_all() -> None:
+    """Import every endpoint class used.
+    """
+    for name in MODULES:
+        __getattr__(name)
@@ -0,0 +1,226 @@
+"""Backfill Command
+
+=== Module Description ===
+This module contains the command that ingests every game of a season, or of a
+date range, into the local store: the box score of every game and the game
+log of every team that played.
+
+Games and game logs are fetched by a bounded pool of workers, taking items as
+earlier ones complete, and upserted one at a time as they arrive, so writes
+never contend for the database and the command can safely be run again over
+the same range. Completed items are written to a checkpoint file every
+CHECKPOINT_INTERVAL items, and an interrupted run resumes from there.
+
+While the upstream circuit breaker is open, no new item is started: the
+command waits for the breaker cooldown, instead of failing every remaining
+item right away.
+
+Usage:
+    python manage.py backfill --season 2020-21
+    python manage.py backfill --date-from 2021-06-01 --date-to 2021-06-30 --workers 4
+"""
+import json
+import os
+import time
+from typing import Any, Callable, Iterator, List, Set, Tuple
+
+from dateutil import parser
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api import endpoints, services, store
+from api.cache import fetch
+from api.upstream import HALF_OPEN, breaker
+from api.utils import iter_concurrently
+
+# Season type digit of a game id
+GAME_ID_SEASON_TYPES = {
+    '2': 'Regular',
+    '4': 'Post'
+}
+# Number of completed items between two writes of the checkpoint file
+CHECKPOINT_INTERVAL = 50
+# How often (in seconds) to check the breaker while its trial request runs
+BREAKER_POLL_INTERVAL = 0.5
+
+
+def parse_game_id(game_id: str) -> Tuple[str, str]:
+    """Return the season and season type of game <game_id>.
+
+    Game ids are formatted 00TYYNNNNN, where T is the season type and YY the
+    year the season starts.
+
+    Example:
+        parse_game_id('0022000123') == ('2020-21', 'Regular')
+    """
+    year = int(game_id[3:5])
+    year += 1900 if year >= 46 else 2000
+    return f'{year}-{(year + 1) % 100:02d}', GAME_ID_SEASON_TYPES.get(game_id[2])
+
+
+class Command(BaseCommand):
+    help = 'Backfill the box scores and team game logs of a season or date range into the local store.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', help='Season to backfill, e.g. 2020-21')
+        parser.add_argument('--date-from', help='First day to backfill, e.g. 2021-06-01')
+        parser.add_argument('--date-to', help='Last day to backfill, e.g. 2021-06-30')
+        parser.add_argument('--workers', type=int, default=settings.NBA_API_MAX_WORKERS,
+                            help='Number of concurrent upstream requests')
+        parser.add_argument('--checkpoint', help='Checkpoint file, defaults to backfill-<range>.json')
+        parser.add_argument('--restart', action='store_true', help='Ignore the existing checkpoint')
+
+    def handle(self, *args, **options):
+        if not options['season'] and not (options['date_from'] or options['date_to']):
+            raise CommandError('Give a --season or a --date-from/--date-to range.')
+
+        date_from = parser.parse(options['date_from']).strftime('%m/%d/%Y') if options['date_from'] else ''
+        date_to = parser.parse(options['date_to']).strftime('%m/%d/%Y') if options['date_to'] else ''
+        label = '_'.join(
+            value.replace('/', '-') for value in [options['season'], date_from, date_to] if value
+        )
+        checkpoint_path = options['checkpoint'] or f'backfill-{label}.json'
+
+        done = set()
+        if os.path.exists(checkpoint_path) and not options['restart']:
+            with open(checkpoint_path) as file:
+                done = set(json.load(file))
+            self.stdout.write(f'Resuming from {checkpoint_path}: {len(done)} items already done')
+
+        # One row per team per game
+        games = fetch(
+            endpoints.LeagueGameFinder,
+            league_id_nullable='00',
+            season_nullable=options['season'] or '',
+            date_from_nullable=date_from,
+            date_to_nullable=date_to
+        ).league_game_finder_results.get_dict()
+
+        game_id_index, team_id_index = games['headers'].index('GAME_ID'), games['headers'].index('TEAM_ID')
+        game_ids = list(dict.fromkeys(row[game_id_index] for row in games['data']))
+        team_seasons = set()
+        for row in games['data']:
+            game_id, team_id = row[game_id_index], row[team_id_index]
+            season, season_type = parse_game_id(game_id)
+            if season_type is not None:
+                team_seasons.add((str(team_id), season, season_type))
+
+        tasks = [(f'game:{game_id}', game_id) for game_id in game_ids]
+        tasks += [
+            (f'team:{team_id}:{season}:{season_type}', (team_id, season, season_type))
+            for team_id, season, season_type in sorted(team_seasons)
+        ]
+        tasks = [(key, item) for key, item in tasks if key not in done]
+        self.stdout.write(
+            f'{len(game_ids)} games and {len(team_seasons)} team game logs found, {len(tasks)} to backfill'
+        )
+
+        self.run(tasks, done, checkpoint_path, options['workers'])
+
+    def run(self, tasks: List[Tuple[str, object]], done: Set[str],
+            checkpoint_path: str, workers: int) -> None:
+        """Run every task in a pool of <workers> threads, recording the keys of
+        completed tasks to <checkpoint_path>.
+        """
+        failed = 0
+        start = time.monotonic()
+        fetch_task = self.with_connection_closed(self.fetch_task)
+        try:
+            results = iter_concurrently(fetch_task, self.wait_for_upstream(tasks), max(workers, 1))
+            for count, ((key, item), (records, error)) in enumerate(results, 1):
+                if error is None:
+                    try:
+                        self.save(key, item, records)
+                    except Exception as save_error:
+                        error = save_error
+
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f'{key} failed: {error!r}')
+                else:
+                    done.add(key)
+                    if len(done) % CHECKPOINT_INTERVAL == 0:
+                        self.write_checkpoint(checkpoint_path, done)
+
+                elapsed = time.monotonic() - start
+                self.stdout.write(
+                    f'[{count}/{len(tasks)}] {key} '
+                    f'{count / elapsed:.2f} items/s, '
+                    f'eta {(len(tasks) - count) * elapsed / count:.0f}s'
+                )
+        finally:
+            self.write_checkpoint(checkpoint_path, done)
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {len(tasks) - failed} items in {elapsed:.1f}s, {failed} failed'
+        ))
+        if failed:
+            self.stdout.write(f'Run the command again to retry the failed items from {checkpoint_path}')
+
+    def wait_for_upstream(self, tasks: List[Tuple[str, object]]) -> Iterator[Tuple[str, object]]:
+        """Yield every task of <tasks>, waiting before each one while the
+        upstream circuit breaker is open or running its trial request.
+        """
+        for task in tasks:
+            while True:
+                delay = breaker.retry_after()
+                if delay > 0:
+                    self.stderr.write(f'Upstream circuit breaker open, pausing {delay:.0f}s')
+                    time.sleep(delay)
+                elif breaker.state == HALF_OPEN:
+                    time.sleep(BREAKER_POLL_INTERVAL)
+                else:
+                    break
+
+            yield task
+
+    @staticmethod
+    def write_checkpoint(checkpoint_path: str, done: Set[str]) -> None:
+        """Write the keys of the completed tasks <done> to <checkpoint_path>.
+        """
+        with open(checkpoint_path, 'w') as file:
+            json.dump(sorted(done), file)
+
+    @classmethod
+    def fetch_task(cls, task: Tuple[str, object]) -> Tuple[Any, Any]:
+        """Return the fetched records of <task> and None, or None and the
+        error fetching them.
+        """
+        try:
+            return cls.fetch(*task), None
+        except Exception as error:
+            return None, error
+
+    @staticmethod
+    def with_connection_closed(func: Callable) -> Callable:
+        """Return <func> closing the database connections of the worker thread
+        once it returns.
+        """
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                connections.close_all()
+
+        return wrapper
+
+    @staticmethod
+    def fetch(key: str, item):
+        """Return the records of the game or team game log of a task fetched
+        upstream.
+        """
+        if key.startswith('game:'):
+            return services.fetch_game(item)
+
+        return services.fetch_team_game_log(*item)
+
+    @staticmethod
+    def save(key: str, item, records) -> None:
+        """Upsert the fetched <records> of a task to the local store.
+        """
+        if key.startswith('game:'):
+            store.save_game(item, records)
+        else:
+            store.save_team_game_log(*item, records)
@@ -0,0 +1,220 @@
+"""Benchmark API Command
+
+=== Module Description ===
+This module contains the benchmark suite of every route of the API app,
+driven through the Django test client against replayed upstream fixtures
+(see api/replay.py), in a throwaway test database.
+
+Each route is timed cold (empty nba_api cache and local store) and warm, and
+its latency is split into upstream fetch, response parsing, data set
+transforms, serialization and everything else (see api/timing.py). Results
+are appended to a history file, and compared with the previous run to catch
+regressions.
+
+Usage:
+    python manage.py bench_api --record
+    python manage.py bench_api --latency 0.1 --number 20 --fail-on-regression
+"""
+import json
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api import timing
+from api.cache import CACHE_ALIAS
+from api.models import Game, PlayerBio, TeamGameLog
+
+PHASES = [timing.UPSTREAM, timing.PARSE, timing.TRANSFORM, timing.SERIALIZE]
+
+
+def get_commit() -> Optional[str]:
+    """Return the current git commit, if any.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def clear() -> None:
+    """Empty the nba_api cache and the local store.
+    """
+    caches[CACHE_ALIAS].clear()
+    for model in [Game, PlayerBio, TeamGameLog]:
+        model.objects.all().delete()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every API route against replayed upstream fixtures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=10, help='Number of cold and warm runs per route')
+        parser.add_argument('--latency', type=float, default=0, help='Latency injected in replayed responses')
+        parser.add_argument('--fixtures', default=settings.NBA_API_FIXTURES_DIR, help='Fixture directory')
+        parser.add_argument('--record', action='store_true',
+                            help='Record the fixtures of every route from stats.nba.com first')
+        parser.add_argument('--history', default='bench_history.jsonl', help='File the results are appended to')
+        parser.add_argument('--threshold', type=float, default=20,
+                            help='Slowdown (in percent) of a median reported as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regression')
+        parser.add_argument('--game-id', default='0042000406')
+        parser.add_argument('--date', default='2021-07-20')
+        parser.add_argument('--team-id', default='1610612749')
+        parser.add_argument('--player-id', default='203507')
+        parser.add_argument('--season', default='2020-21')
+        parser.add_argument('--season-type', default='Regular')
+
+    def get_routes(self, options) -> List[Tuple[str, str]]:
+        """Return the name and path of every route of the API app.
+        """
+        team_id, player_id = options['team_id'], options['player_id']
+        season, season_type = options['season'], options['season_type']
+        return [
+            ('search', '/api/search/player/James'),
+            ('standings', '/api/standings/'),
+            ('team_list', '/api/team_list/'),
+            ('player_list', '/api/player_list'),
+            ('score', f"/api/score/{options['date']}"),
+            ('games', f"/api/games/{options['game_id']}"),
+            ('teams', f'/api/teams/{team_id}'),
+            ('team_game_log', f'/api/teams/{team_id}/{season}/{season_type}'),
+            ('players', f'/api/players/{player_id}'),
+            ('player_game_log', f'/api/players/{player_id}/{season}/{season_type}')
+        ]
+
+    def handle(self, *args, **options):
+        if options['number'] < 1:
+            raise CommandError('--number must be at least 1.')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # Background bio prefetches would make runs depend on each other
+        try:
+            with override_settings(NBA_API_PREFETCH_BIOS=False):
+                if options['record']:
+                    with override_settings(NBA_API_FIXTURES='record', NBA_API_FIXTURES_DIR=options['fixtures']):
+                        self.run(self.get_routes(options), 1)
+
+                with override_settings(NBA_API_FIXTURES='replay',
+                                       NBA_API_FIXTURES_DIR=options['fixtures'],
+                                       NBA_API_REPLAY_LATENCY=options['latency']):
+                    results = self.run(self.get_routes(options), options['number'])
+        finally:
+            clear()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.report(results)
+        self.track(results, options)
+
+    def run(self, routes: List[Tuple[str, str]], number: int) -> Dict[str, Dict]:
+        """Return the median latency of every phase of every route, cold and
+        warm, in milliseconds.
+        """
+        client = Client()
+        results = {}
+        for name, path in routes:
+            runs = {'cold': [], 'warm': []}
+            for mode in runs:
+                for _ in range(number):
+                    if mode == 'cold':
+                        clear()
+
+                    with timing.collect() as timings:
+                        start = time.perf_counter()
+                        response = client.get(path)
+                        total = time.perf_counter() - start
+
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f'{path} returned {response.status_code}, record its fixtures first: '
+                            f'{response.content[:200]!r}'
+                        )
+                    runs[mode].append({'total': total, **timings.durations})
+
+            results[name] = {
+                mode: {
+                    phase: 1000 * statistics.median(run.get(phase, 0) for run in mode_runs)
+                    for phase in ['total'] + PHASES
+                }
+                for mode, mode_runs in runs.items()
+            }
+            for mode_result in results[name].values():
+                mode_result['other'] = max(
+                    mode_result['total'] - sum(mode_result[phase] for phase in PHASES), 0
+                )
+
+        return results
+
+    def report(self, results: Dict[str, Dict]) -> None:
+        """Write a table of <results>.
+        """
+        columns = ['total'] + PHASES + ['other']
+        self.stdout.write(
+            f"{'route':<16} {'mode':<5} " + ' '.join(f'{column:>10}' for column in columns)
+        )
+        for name, result in results.items():
+            for mode, phases in result.items():
+                self.stdout.write(
+                    f'{name:<16} {mode:<5} ' + ' '.join(f'{phases[column]:8.2f}ms' for column in columns)
+                )
+
+    def track(self, results: Dict[str, Dict], options) -> None:
+        """Compare <results> with the previous run of the same settings in the
+        history file, then append them to it.
+        """
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'commit': get_commit(),
+            'number': options['number'],
+            'latency': options['latency'],
+            'results': results
+        }
+
+        previous = None
+        try:
+            with open(options['history']) as file:
+                for line in file:
+                    run = json.loads(line)
+                    if run['latency'] == entry['latency']:
+                        previous = run
+        except FileNotFoundError:
+            pass
+
+        regressions = []
+        if previous is not None:
+            factor = 1 + options['threshold'] / 100
+            for name, result in results.items():
+                for mode, phases in result.items():
+                    before = previous['results'].get(name, {}).get(mode, {}).get('total')
+                    if before and phases['total'] > factor * before:
+                        regressions.append(
+                            f"{name} {mode}: {before:.2f}ms -> {phases['total']:.2f}ms"
+                        )
+
+        with open(options['history'], 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+
+        if previous is None:
+            self.stdout.write(f"No previous run to compare with, results saved to {options['history']}")
+        elif not regressions:
+            self.stdout.write(self.style.SUCCESS(
+                f"No regression since {previous['time']} ({previous['commit']})"
+            ))
+        else:
+            message = f"Regressions since {previous['time']} ({previous['commit']}):\n  " + '\n  '.join(regressions)
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
@@ -0,0 +1,59 @@
+"""Benchmark Renderer Command
+
+=== Module Description ===
+This module contains a benchmark of <NumpyJSONRenderer> against the previous
+serialization paths of the API, on the largest payloads:
+  - game: the game_by_id_api payload, previously encoded with a simplejson
+    dumps/loads round trip then the DRF JSON renderer
+  - box_score: the raw box score records of a game, with NaN nulls
+  - player_list: the player_list_api payload, previously encoded by the DRF
+    JSON renderer
+
+Usage:
+    python manage.py bench_renderer 0042000406 --number 200
+"""
+import timeit
+
+import simplejson
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api import services
+from api.renderers import NumpyJSONRenderer
+from api.utils import converter
+
+
+def render_round_trip(data) -> bytes:
+    """Previous game_by_id_api serialization path.
+    """
+    serialized = simplejson.dumps(data, ignore_nan=True, default=converter)
+    return JSONRenderer().render(simplejson.loads(serialized))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the API JSON renderer against the previous serialization paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('game_id', help='ID of the game to benchmark on')
+        parser.add_argument('--number', type=int, default=100, help='Number of runs per payload')
+
+    def handle(self, *args, **options):
+        game_id = options['game_id']
+        payloads = [
+            ('game', services.get_game(game_id), render_round_trip),
+            ('box_score', services.fetch_game(game_id), render_round_trip),
+            ('player_list', services.get_player_list(), JSONRenderer().render)
+        ]
+
+        number = options['number']
+        renderer = NumpyJSONRenderer()
+        for name, data, previous in payloads:
+            size = len(renderer.render(data))
+            previous_time = timeit.timeit(lambda: previous(data), number=number) / number
+            new_time = timeit.timeit(lambda: renderer.render(data), number=number) / number
+            self.stdout.write(
+                f'{name:<12} {size / 1024:8.1f}KB '
+                f'previous={size / previous_time / 2 ** 20:7.1f}MB/s '
+                f'renderer={size / new_time / 2 ** 20:7.1f}MB/s '
+                f'speedup={previous_time / new_time:5.1f}x'
+            )
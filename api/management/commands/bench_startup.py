@@ -0,0 +1,102 @@
+"""Benchmark Startup Command
+
+=== Module Description ===
+This module contains a benchmark of the startup of a web worker, in fresh
+Python processes loading the WSGI application as gunicorn does:
+  - lazy: the default mode, where pandas and the nba_api endpoints are only
+    loaded by the first requests needing them (see api/endpoints.py)
+  - preload: the NBA_API_PRELOAD mode, where they are loaded at startup, once
+    in the gunicorn master (see api/preload.py)
+
+It reports the boot time of each mode and the load time left to the first
+requests, then the import time profile (python -X importtime) of the lazy
+mode: the time spent importing each package, at boot and by the first
+requests.
+
+Usage:
+    python manage.py bench_startup --number 5 --top 15
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Loads the application, then everything the first requests would
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import nba_daily.wsgi
+boot = time.perf_counter() - start
+print('-- boot', file=sys.stderr, flush=True)
+start = time.perf_counter()
+from api.preload import preload
+preload()
+print(json.dumps({'boot': boot, 'load': time.perf_counter() - start}))
+"""
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+\d+ \| *(\S+)')
+
+
+def run_script(preload: bool, *options: str) -> Tuple[Dict, str]:
+    """Run SCRIPT in a fresh process and return its timings and its stderr.
+    """
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'nba_daily.settings'),
+        'NBA_API_PRELOAD': '1' if preload else '0',
+        'NBA_API_WARMER': '0'
+    }
+    process = subprocess.run(
+        [sys.executable, *options, '-c', SCRIPT], cwd=settings.BASE_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(process.stdout.splitlines()[-1]), process.stderr
+
+
+def parse_import_times(stderr: str) -> Dict[str, List[float]]:
+    """Return the time (in seconds) spent importing each top-level package at
+    boot and by the first requests, from -X importtime output.
+    """
+    packages = defaultdict(lambda: [0.0, 0.0])
+    deferred = False
+    for line in stderr.splitlines():
+        if line == '-- boot':
+            deferred = True
+            continue
+
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            package = match.group(2).split('.')[0]
+            packages[package][deferred] += int(match.group(1)) / 1e6
+    return dict(packages)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the startup time of a web worker, with and without preload.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=5, help='Number of runs per mode')
+        parser.add_argument('--top', type=int, default=15, help='Number of packages profiled')
+
+    def handle(self, *args, **options):
+        for mode, preload in [('lazy', False), ('preload', True)]:
+            runs = [run_script(preload)[0] for _ in range(options['number'])]
+            boot = min(run['boot'] for run in runs)
+            load = min(run['load'] for run in runs)
+            self.stdout.write(
+                f'{mode:<8} boot={1000 * boot:7.1f}ms first requests={1000 * load:7.1f}ms '
+                f'total={1000 * (boot + load):7.1f}ms'
+            )
+
+        _, stderr = run_script(False, '-X', 'importtime')
+        packages = sorted(parse_import_times(stderr).items(), key=lambda item: -sum(item[1]))
+        self.stdout.write('\nSlowest packages to import (lazy mode):')
+        for package, (boot, load) in packages[:options['top']]:
+            self.stdout.write(
+                f'  {package:<20} boot={1000 * boot:7.1f}ms first requests={1000 * load:7.1f}ms'
+            )
@@ -0,0 +1,108 @@
+"""Benchmark Transforms Command
+
+=== Module Description ===
+This module contains a benchmark of the raw data set transforms of the API
+(<Schema.records>) against the previous pandas path (DataFrame of the data
+set, <apply_schema>, then to_dict), on the data sets of the main views:
+  - box_score: player and team stats of a game
+  - game_summary: summary and line score of a game
+  - player_list: every league leader
+  - team_game_log: a season of games of a team
+  - team_detail: roster, coaches and info of a team
+
+For each data set it checks both paths give the same payload, then reports
+their time and peak memory allocated per run.
+
+The pandas path is kept in api/reference.py, as the reference the raw
+transforms are also checked against by api/tests.py.
+
+Usage:
+    python manage.py bench_transforms 0042000406 --number 200
+"""
+import timeit
+import tracemalloc
+from typing import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import endpoints, schema
+from api.cache import fetch
+from api.reference import apply_schema
+from api.renderers import NumpyJSONRenderer
+
+
+def peak_allocation(func: Callable) -> int:
+    """Return the peak memory allocated by a call of <func>, in bytes.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the raw data set transforms against the previous pandas path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('game_id', help='ID of the game to benchmark on')
+        parser.add_argument('--team-id', default='1610612749')
+        parser.add_argument('--season', default='2020-21')
+        parser.add_argument('--number', type=int, default=100, help='Number of runs per data set')
+
+    def handle(self, *args, **options):
+        game_id, team_id = options['game_id'], options['team_id']
+        box_score = fetch(endpoints.BoxScoreTraditionalV2, game_id)
+        summary = fetch(endpoints.BoxScoreSummaryV2, game_id)
+        roster = fetch(endpoints.CommonTeamRoster, team_id)
+        benchmarks = [
+            ('box_score', [
+                (schema.BOX_SCORE_PLAYER_STATS, box_score.player_stats),
+                (schema.BOX_SCORE_TEAM_STATS, box_score.team_stats)
+            ]),
+            ('game_summary', [
+                (schema.GAME_SUMMARY, summary.game_summary),
+                (schema.LINE_SCORE, summary.line_score),
+                (schema.INACTIVE_PLAYERS, summary.inactive_players)
+            ]),
+            ('player_list', [
+                (schema.PLAYER_LIST, fetch(endpoints.LeagueLeaders, per_mode48='PerGame').league_leaders)
+            ]),
+            ('team_game_log', [
+                (schema.TEAM_GAME_LOG, fetch(
+                    endpoints.TeamGameLog,
+                    team_id=team_id,
+                    season=options['season'],
+                    season_type_all_star='Regular Season'
+                ).team_game_log)
+            ]),
+            ('team_detail', [
+                (schema.TEAM_ROSTER, roster.common_team_roster),
+                (schema.TEAM_COACHES, roster.coaches),
+                (schema.TEAM_INFO, fetch(endpoints.TeamInfoCommon, team_id).team_info_common)
+            ])
+        ]
+
+        number = options['number']
+        renderer = NumpyJSONRenderer()
+        for name, data_sets in benchmarks:
+            def previous():
+                return [apply_schema(data_schema, data_set.get_data_frame()).to_dict(orient='records')
+                        for data_schema, data_set in data_sets]
+
+            def raw():
+                return [data_schema.records(data_set) for data_schema, data_set in data_sets]
+
+            if renderer.render(previous()) != renderer.render(raw()):
+                raise CommandError(f'{name}: the raw transforms do not match the pandas path.')
+
+            rows = sum(len(data_set.get_dict()['data']) for _, data_set in data_sets)
+            previous_time = timeit.timeit(previous, number=number) / number
+            raw_time = timeit.timeit(raw, number=number) / number
+            self.stdout.write(
+                f'{name:<14} {rows:4d} rows '
+                f'pandas={1000 * previous_time:7.3f}ms/{peak_allocation(previous) / 1024:7.1f}KB '
+                f'raw={1000 * raw_time:7.3f}ms/{peak_allocation(raw) / 1024:7.1f}KB '
+                f'speedup={previous_time / raw_time:5.1f}x'
+            )
@@ -0,0 +1,34 @@
+"""Warm Cache Command
+
+=== Module Description ===
+This module contains the command that runs the cache warmer (see
+api/warmer.py) in the foreground, or refreshes the hot datasets once.
+
+Usage:
+    python manage.py warm_cache
+    python manage.py warm_cache --once
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import warmer
+
+
+class Command(BaseCommand):
+    help = 'Keep the datasets of the hot pages warm in the nba_api cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Refresh once and exit')
+
+    def handle(self, *args, **options):
+        if not options['once']:
+            warmer.run()
+            return
+
+        start = time.monotonic()
+        live = warmer.warm(2 * settings.NBA_API_WARM_INTERVAL)
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed hot datasets in {time.monotonic() - start:.2f}s (live games: {live})'
+        ))
@@ -0,0 +1,171 @@
+"""API App Metrics Module
+
+=== Module Description ===
+This module contains the metrics of the process, exposed in the Prometheus
+text format at /metrics:
+  - request and per stage durations (see api/timing.py), as histograms
+  - cache lookups by cache and result (hit, miss, stale)
+  - upstream requests by endpoint class and outcome (success, error,
+    rejected by the rate limiter or circuit breaker)
+  - request coalescing counters and circuit breaker state
+
+Metrics are kept in memory per process, so with several workers each one
+exposes its own. They are only served to staff users and to scrapers sending
+the METRICS_TOKEN setting as bearer token; anyone else gets a 404.
+"""
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+from .upstream import OPEN, breaker
+
+# Histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def format_labels(labels: Labels) -> str:
+    """Return <labels> in Prometheus text format, e.g. {route="standings/"}.
+    """
+    if not labels:
+        return ''
+
+    values = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels
+    )
+    return f'{{{values}}}'
+
+
+class Counter:
+    """Counter metric, safe to share between threads.
+
+    === Attributes ===
+    name:
+        the metric name.
+    description:
+        the metric help text.
+    values:
+        the value of the counter for each set of labels.
+    """
+    name: str
+    description: str
+    values: Dict[Labels, float]
+    _lock: threading.Lock
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels) -> None:
+        """Increment the counter of given <labels> by <value>.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        """Return the lines of this metric in Prometheus text format.
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{format_labels(labels)} {value}')
+        return lines
+
+
+class Histogram:
+    """Histogram metric, safe to share between threads.
+
+    === Attributes ===
+    name:
+        the metric name.
+    description:
+        the metric help text.
+    buckets:
+        the upper bounds of the buckets.
+    values:
+        the bucket counts, sum and count of observations for each set of
+        labels.
+    """
+    name: str
+    description: str
+    buckets: Sequence[float]
+    values: Dict[Labels, Tuple[List[int], float, int]]
+    _lock: threading.Lock
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Record an observation of <value> with given <labels>.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        """Return the lines of this metric in Prometheus text format.
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    bucket_labels = labels + (('le', str(bound)),)
+                    lines.append(f'{self.name}_bucket{format_labels(bucket_labels)} {bucket_count}')
+                lines.append(f"{self.name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f'{self.name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{self.name}_count{format_labels(labels)} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'nba_daily_request_duration_seconds', 'Duration of requests by route.'
+)
+STAGE_DURATION = Histogram(
+    'nba_daily_stage_duration_seconds', 'Time spent per request in each stage.'
+)
+CACHE_REQUESTS = Counter(
+    'nba_daily_cache_requests_total', 'Cache lookups by cache and result.'
+)
+UPSTREAM_REQUESTS = Counter(
+    'nba_daily_upstream_requests_total', 'Requests to stats.nba.com by endpoint and outcome.'
+)
+
+
+def render() -> str:
+    """Return every metric in Prometheus text format.
+    """
+    # The cache module records metrics, so it is imported last
+    from .cache import flights
+
+    lines = []
+    for metric in [REQUEST_DURATION, STAGE_DURATION, CACHE_REQUESTS, UPSTREAM_REQUESTS]:
+        lines += metric.render()
+
+    lines += [
+        '# HELP nba_daily_single_flight_total Upstream calls and callers coalesced into them.',
+        '# TYPE nba_daily_single_flight_total counter'
+    ]
+    for counter, value in sorted(flights.counters.items()):
+        lines.append(f'nba_daily_single_flight_total{format_labels((("counter", counter),))} {value}')
+
+    lines += [
+        '# HELP nba_daily_circuit_breaker_open Whether the upstream circuit breaker is open.',
+        '# TYPE nba_daily_circuit_breaker_open gauge',
+        f'nba_daily_circuit_breaker_open {int(breaker.state == OPEN)}',
+        '# HELP nba_daily_circuit_breaker_trips_total Times the upstream circuit breaker opened.',
+        '# TYPE nba_daily_circuit_breaker_trips_total counter',
+        f'nba_daily_circuit_breaker_trips_total {breaker.trips}'
+    ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,74 @@
+"""API App Middleware Module
+
+=== Module Description ===
+This module contains the middleware of the site:
+  - <TimingMiddleware> times the stages of every request (see api/timing.py),
+    reports them in a Server-Timing header and records them in the request
+    and stage duration histograms of /metrics
+  - <UpstreamMiddleware> reports the state of upstream data to clients (see
+    api/upstream.py): responses built from stale upstream data get a
+    'Warning: 110 - "Response is Stale"' header, and requests failing with
+    UpstreamUnavailable get a 503 with a Retry-After header instead of a 500
+"""
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from . import timing
+from .metrics import REQUEST_DURATION, STAGE_DURATION
+from .upstream import UpstreamUnavailable, request_status
+
+STALE_WARNING = '110 - "Response is Stale"'
+
+
+class TimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.collect() as timings:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            total = time.perf_counter() - start
+
+        durations = dict(timings.durations)
+        match = request.resolver_match
+        REQUEST_DURATION.observe(total, route=match.route if match else 'unmatched')
+        for stage, duration in durations.items():
+            STAGE_DURATION.observe(duration, stage=stage)
+
+        metrics = [f'total;dur={1000 * total:.1f}'] + [
+            f'{stage};dur={1000 * duration:.1f}' for stage, duration in sorted(durations.items())
+        ]
+        response['Server-Timing'] = ', '.join(metrics)
+        return response
+
+
+class UpstreamMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        status = {'stale': False}
+        token = request_status.set(status)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_status.reset(token)
+
+        if status['stale']:
+            response['Warning'] = STALE_WARNING
+        return response
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, UpstreamUnavailable):
+            return None
+
+        message = 'stats.nba.com is unavailable, please retry later.'
+        if request.path.startswith('/api/'):
+            response = JsonResponse({'detail': message}, status=503)
+        else:
+            response = HttpResponse(message, status=503, content_type='text/plain')
+        response['Retry-After'] = str(settings.NBA_API_BREAKER_COOLDOWN)
+        return response
@@ -0,0 +1,96 @@
+# Generated by Django 3.2.12 on 2026-10-18 08:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Game',
+            fields=[
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('game_id', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('game_date', models.DateField(db_index=True)),
+                ('home_team_id', models.CharField(max_length=10)),
+                ('visitor_team_id', models.CharField(max_length=10)),
+                ('status_text', models.CharField(max_length=32)),
+                ('summary', models.JSONField()),
+                ('columns', models.JSONField(default=dict)),
+                ('inactive_players', models.JSONField(default=dict)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PlayerBio',
+            fields=[
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('player_id', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('data', models.JSONField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamGameLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('team_id', models.CharField(max_length=10)),
+                ('season', models.CharField(max_length=7)),
+                ('season_type', models.CharField(max_length=16)),
+                ('game_log', models.JSONField(default=dict)),
+            ],
+            options={
+                'unique_together': {('team_id', 'season', 'season_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamBoxScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team_id', models.CharField(max_length=10)),
+                ('values', models.JSONField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_box_scores', to='api.game')),
+            ],
+            options={
+                'unique_together': {('game', 'team_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PlayerBoxScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team_id', models.CharField(max_length=10)),
+                ('player_id', models.CharField(db_index=True, max_length=10)),
+                ('order', models.PositiveSmallIntegerField()),
+                ('values', models.JSONField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_box_scores', to='api.game')),
+            ],
+            options={
+                'ordering': ['order'],
+                'unique_together': {('game', 'player_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LineScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team_id', models.CharField(max_length=10)),
+                ('values', models.JSONField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_scores', to='api.game')),
+            ],
+            options={
+                'unique_together': {('game', 'team_id')},
+            },
+        ),
+    ]
@@ -1,3 +1,154 @@
+"""API App Models Module
+
+=== Module Description ===
+This module contains the models of the local store of data fetched from
+stats.nba.com. Each row keeps the indexed fields it is looked up by, and the
+record emitted by the API (after its column schema) as JSON. Tables of records
+are stored as a list of columns and lists of row values, so that the column
+order survives JSON backends that reorder object keys.
+
+A record is stale once it is older than its model <max_age>, except for
+records that can no longer change (finished games, game logs saved after the
+end of their season). Games are stale until they are final.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from .utils import is_final_status
+
+
+class StoredRecord(models.Model):
+    """Abstract base of every stored record.
+
+    === Attributes ===
+    max_age:
+        how long the record can be served before it is fetched again.
+    """
+    max_age = timedelta(hours=1)
+
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def is_final(self) -> bool:
+        """Return whether the record can no longer change upstream.
+        """
+        return False
+
+    def is_stale(self) -> bool:
+        """Return whether the record should be fetched again from upstream.
+        """
+        if self.is_final():
+            return False
+
+        return timezone.now() - self.updated > self.max_age
+
+
+class Game(StoredRecord):
+    """A single game with its box score summary.
+
+    === Attributes ===
+    columns:
+        the columns of the line score, team and player box score rows of the
+        game, by table name.
+    inactive_players:
+        the table of inactive players of the game.
+    """
+    game_id = models.CharField(max_length=10, primary_key=True)
+    game_date = models.DateField(db_index=True)
+    home_team_id = models.CharField(max_length=10)
+    visitor_team_id = models.CharField(max_length=10)
+    status_text = models.CharField(max_length=32)
+    summary = models.JSONField()
+    columns = models.JSONField(default=dict)
+    inactive_players = models.JSONField(default=dict)
+
+    def is_final(self) -> bool:
+        return is_final_status(self.status_text)
+
+    def is_stale(self) -> bool:
+        # Games in progress or scheduled change by the second, so only final
+        # games are served from the store
+        return not self.is_final()
+
+
+class LineScore(models.Model):
+    """Line score of one team in a game.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='line_scores')
+    team_id = models.CharField(max_length=10)
+    values = models.JSONField()
+
+    class Meta:
+        unique_together = ['game', 'team_id']
+
+
+class TeamBoxScore(models.Model):
+    """Box score row of one team in a game.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='team_box_scores')
+    team_id = models.CharField(max_length=10)
+    values = models.JSONField()
+
+    class Meta:
+        unique_together = ['game', 'team_id']
+
+
+class PlayerBoxScore(models.Model):
+    """Box score row of one player in a game.
+
+    === Attributes ===
+    order:
+        the position of the row in the upstream box score.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='player_box_scores')
+    team_id = models.CharField(max_length=10)
+    player_id = models.CharField(max_length=10, db_index=True)
+    order = models.PositiveSmallIntegerField()
+    values = models.JSONField()
+
+    class Meta:
+        ordering = ['order']
+        unique_together = ['game', 'player_id']
+
+
+class PlayerBio(StoredRecord):
+    """Bio of a player, as returned by CommonPlayerInfo.
+    """
+    max_age = timedelta(seconds=settings.NBA_API_PLAYER_BIO_TIMEOUT)
+
+    player_id = models.CharField(max_length=10, primary_key=True)
+    data = models.JSONField()
+
+
+def season_end(season: str) -> datetime:
+    """Return the time by which season <season> (e.g. '2020-21') is over,
+    playoffs included.
+
+    The latest Finals so far ended on October 11, 2020 (2019-20 season), so
+    every season is taken to end on November 1 of its second year.
+    """
+    return timezone.make_aware(datetime(int(season[:4]) + 1, 11, 1))
+
+
+class TeamGameLog(StoredRecord):
+    """Game log table of a team in one season and season type.
+
+    A game log is final once it was saved after the end of its season: one
+    saved during the season (e.g. Playoffs saved before the Finals) is still
+    fetched again once stale.
+    """
+    team_id = models.CharField(max_length=10)
+    season = models.CharField(max_length=7)
+    season_type = models.CharField(max_length=16)
+    game_log = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ['team_id', 'season', 'season_type']
 
-# Create your models here.
+    def is_final(self) -> bool:
+        return self.updated > season_end(self.season)
@@ -0,0 +1,89 @@
+"""API App Fetch Planner Module
+
+=== Module Description ===
+This module contains <Plan>, which runs the upstream calls a payload is built
+from concurrently, so that building it takes as long as its slowest chain of
+dependent calls instead of the sum of every call.
+
+Each step of a plan is a named function, that may depend on the results of
+other steps. A step starts as soon as the steps it depends on are done, in a
+bounded thread pool, and in a copy of the caller's context like
+<utils.map_concurrently>. Unlike the latter, a failed step fails the whole
+plan: its exception is raised once the running steps are done, and steps not
+started yet are cancelled.
+
+Example:
+    plan = Plan()
+    plan.add('roster', lambda: fetch(CommonTeamRoster, team_id))
+    plan.add('info', lambda: fetch(TeamInfoCommon, team_id))
+    plan.add('coach', lambda roster: get_coach(roster), after=['roster'])
+    results = plan.run()
+"""
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+
+class Plan:
+    """A set of steps, run concurrently once their dependencies are done.
+
+    === Attributes ===
+    steps:
+        the function of each step and the names of the steps it depends on,
+        by step name. The function of a step is called with the result of
+        each of its dependencies as keyword arguments.
+    """
+    steps: Dict[str, Tuple[Callable, List[str]]]
+
+    def __init__(self) -> None:
+        self.steps = {}
+
+    def add(self, name: str, func: Callable, after: Sequence[str] = ()) -> None:
+        """Add step <name>, calling <func> once the steps <after> are done.
+
+        Raise ValueError if <name> is already a step, or if a step of <after>
+        was not added yet (which also rules out cycles).
+        """
+        if name in self.steps:
+            raise ValueError(f'Step {name!r} is already in the plan.')
+        unknown = [dependency for dependency in after if dependency not in self.steps]
+        if unknown:
+            raise ValueError(f'Step {name!r} depends on unknown steps {unknown}.')
+
+        self.steps[name] = (func, list(after))
+
+    def run(self, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """Run every step and return their results, by step name.
+
+        === Attributes ===
+        max_workers:
+            the maximum number of concurrent steps, defaults to the
+            NBA_API_MAX_WORKERS setting.
+        """
+        results = {}
+        pending = dict(self.steps)
+        max_workers = max_workers or settings.NBA_API_MAX_WORKERS
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending) or 1)) as executor:
+            running = {}
+
+            def submit_ready() -> None:
+                for name, (func, after) in list(pending.items()):
+                    if all(dependency in results for dependency in after):
+                        kwargs = {dependency: results[dependency] for dependency in after}
+                        running[executor.submit(contextvars.copy_context().run, func, **kwargs)] = name
+                        del pending[name]
+
+            submit_ready()
+            try:
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[running.pop(future)] = future.result()
+                    submit_ready()
+            finally:
+                for future in running:
+                    future.cancel()
+
+        return results
@@ -0,0 +1,43 @@
+"""API App Preload Module
+
+=== Module Description ===
+This module contains the preload of the web process, run with the
+NBA_API_PRELOAD setting when the WSGI application is loaded (see
+nba_daily/wsgi.py).
+
+Web workers import pandas and the nba_api endpoints lazily, on the first
+request needing them (see api/endpoints.py), so they boot fast. In preload
+mode, gunicorn loads the application once in its master process before
+forking the workers (preload_app, see gunicorn.conf.py), and everything the
+workers would load on their first requests is loaded there instead. The
+workers then start warm, and share those modules with the master copy-on-write
+instead of each holding its own copy.
+"""
+import gc
+import logging
+import time
+
+from django.urls import get_resolver
+
+from . import endpoints, search
+
+logger = logging.getLogger(__name__)
+
+
+def preload() -> None:
+    """Load every module and index the workers need to serve requests, then
+    freeze the loaded objects out of garbage collection.
+
+    Collections in a worker would otherwise write to every preloaded object
+    (to track it), copying the memory pages the worker shares with the master.
+    """
+    start = time.perf_counter()
+    # The URLconf imports every view, and through them the services
+    get_resolver().url_patterns
+    endpoints.load_all()
+    search.build_indexes()
+    from nba_api.stats.library.parameters import Season  # noqa: F401
+
+    gc.collect()
+    gc.freeze()
+    logger.info('Preloaded the web process in %.0fms', 1000 * (time.perf_counter() - start))
@@ -0,0 +1,61 @@
+"""API App Pandas Reference Module
+
+=== Module Description ===
+This module contains the previous pandas implementations of the data set
+transforms of the API, kept as the reference the raw transforms of
+api/schema.py are checked against, by api/tests.py and by the bench_transforms
+command. Nothing else should import it: it imports pandas.
+"""
+from pandas import DataFrame
+from pandas.api.types import is_numeric_dtype
+
+from . import schema
+
+
+def apply_schema(data_schema: schema.Schema, df: DataFrame) -> DataFrame:
+    """Return a new DataFrame of <df> transformed by <data_schema>, the pandas
+    reference of <Schema.transform>.
+    """
+    selected, pct_keys, dtypes, names = data_schema.compile(tuple(df.columns))
+    result = df.reindex(columns=selected)
+    for key in pct_keys:
+        if is_numeric_dtype(result[key]):
+            result[key] = (100 * result[key]).round(1)
+
+    for key, dtype in dtypes.items():
+        result[key] = result[key].astype(dtype)
+
+    if data_schema.single_game:
+        clean_single_game_data(result)
+
+    result.columns = names
+    return result
+
+
+def clean_single_game_data(df: DataFrame) -> None:
+    """Zero out the stats of players that did not play (no MIN) and convert
+    counting stat fields to int, in place, the original row by row reference
+    of <schema.clean_single_game_columns>.
+    """
+    float_fields = ['FG_PCT', 'FG3_PCT', 'FT_PCT']
+    ignore_fields = [
+        'TEAM_ID', 'PLAYER_ID', 'PLAYER_NAME', 'START_POSITION', 'COMMENT',
+        'TEAM_NAME', 'TEAM_CITY'
+    ]
+    time_fields = ['MIN']
+    for index, row in df.iterrows():
+        if row['MIN'] is None:
+            for key, value in row.items():
+                if key in float_fields:
+                    row[key] = 0.0
+                elif key in time_fields:
+                    row[key] = '00:00'
+                elif key not in ignore_fields:
+                    row[key] = 0
+
+        df.iloc[index] = row
+
+    for col_type, key in zip(df.dtypes, df.keys()):
+        if key not in ignore_fields and key not in float_fields and \
+                key not in time_fields:
+            df[key] = df[key].astype(int)
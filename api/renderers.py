@@ -0,0 +1,105 @@
+"""API App Renderers Module
+
+=== Module Description ===
+This module contains the DRF renderer of every API response.
+
+Payloads are built from the raw data sets of stats.nba.com (see
+api/schema.py), whose float columns hold NaN for null, as pandas does.
+<NumpyJSONRenderer> encodes them in a single pass of the (C accelerated) json
+encoder, and only when that pass hits a NaN value does it encode again with
+simplejson, which renders NaN as null. The json encoder is faster than
+simplejson, and most payloads hold no NaN. numpy values (e.g. from the pandas
+reference in api/reference.py) are still converted.
+
+It also contains the helpers rendering streamed responses with the same
+encoding, as NDJSON (<stream_ndjson>) or as a JSON document sent in chunks
+(<stream_json>).
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+import simplejson
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+from .timing import SERIALIZE, timed
+from .utils import converter
+
+# Separators, as in rest_framework.renderers
+SHORT_SEPARATORS = (',', ':')
+LONG_SEPARATORS = (', ', ': ')
+INDENT_SEPARATORS = (',', ': ')
+
+
+class NumpyJSONRenderer(JSONRenderer):
+    """JSON renderer rendering NaN as null and handling numpy types.
+
+    Anything else that is not JSON serializable falls back to the DRF
+    encoder (dates, decimals, UUIDs...).
+    """
+    fallback_encoder = JSONEncoder()
+
+    def default(self, obj):
+        try:
+            return converter(obj)
+        except TypeError:
+            return self.fallback_encoder.default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        with timed(SERIALIZE):
+            renderer_context = renderer_context or {}
+            indent = self.get_indent(accepted_media_type, renderer_context)
+
+            if indent is None:
+                separators = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+            else:
+                separators = INDENT_SEPARATORS
+
+            try:
+                ret = json.dumps(
+                    data, default=self.default, allow_nan=False,
+                    indent=indent, ensure_ascii=self.ensure_ascii, separators=separators
+                )
+            except ValueError:
+                ret = simplejson.dumps(
+                    data, default=self.default, ignore_nan=True,
+                    indent=indent, ensure_ascii=self.ensure_ascii, separators=separators
+                )
+
+            # Escape \u2028 and \u2029 like DRF, so the output is a strict
+            # javascript subset
+            ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+            return ret.encode()
+
+
+def stream_ndjson(items: Iterable[Any]) -> Iterator[bytes]:
+    """Yield each of <items> rendered as a line of NDJSON.
+    """
+    renderer = NumpyJSONRenderer()
+    for item in items:
+        yield renderer.render(item) + b'\n'
+
+
+def stream_json(data: Dict[str, Any]) -> Iterator[bytes]:
+    """Yield <data> rendered as a JSON object, in chunks.
+
+    Values that are iterators are rendered as JSON arrays one item at a time,
+    and only consumed once every previous value was sent, so they are never
+    held in memory in full.
+    """
+    renderer = NumpyJSONRenderer()
+    for i, (key, value) in enumerate(data.items()):
+        yield (b'{' if i == 0 else b',') + renderer.render(key) + b':'
+        if not isinstance(value, Iterator):
+            yield renderer.render(value)
+            continue
+
+        yield b'['
+        for j, item in enumerate(value):
+            yield (b'' if j == 0 else b',') + renderer.render(item)
+        yield b']'
+
+    yield b'}' if data else b'{}'
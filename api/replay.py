@@ -0,0 +1,94 @@
+"""API App Record/Replay Module
+
+=== Module Description ===
+This module contains the record/replay adapter beneath every request sent to
+stats.nba.com (see <cache.send_request>), set by the NBA_API_FIXTURES
+setting:
+  - record: raw responses are saved to the NBA_API_FIXTURES_DIR directory,
+    one file per endpoint and request parameters
+  - replay: responses are served from that directory after
+    NBA_API_REPLAY_LATENCY seconds, and never sent upstream
+
+Recording a session (browsing the site, or running the warm_cache and
+backfill commands) then replaying it lets the whole site run deterministically
+on a machine with no network, e.g. for load tests and benchmarks.
+
+Usage:
+    NBA_API_FIXTURES=record python manage.py backfill --date-from 2021-06-01 --date-to 2021-06-30
+    NBA_API_FIXTURES=replay NBA_API_REPLAY_LATENCY=0.2 python manage.py runserver
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+from django.conf import settings
+
+from .upstream import UpstreamUnavailable
+
+# Modes
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class FixtureNotFound(UpstreamUnavailable):
+    """Raised in replay mode when no response was recorded for a request.
+    """
+    pass
+
+
+def is_replaying() -> bool:
+    """Return whether responses are served from fixtures.
+    """
+    return settings.NBA_API_FIXTURES == REPLAY
+
+
+def is_recording() -> bool:
+    """Return whether responses are saved to fixtures.
+    """
+    return settings.NBA_API_FIXTURES == RECORD
+
+
+def fixture_path(endpoint: str, parameters: Dict[str, Any]) -> str:
+    """Return the path of the fixture of a request to <endpoint> with given
+    <parameters>.
+    """
+    params = json.dumps(parameters, sort_keys=True, default=str)
+    digest = hashlib.md5(params.encode('utf-8')).hexdigest()
+    return os.path.join(settings.NBA_API_FIXTURES_DIR, endpoint, f'{digest}.json')
+
+
+def record(endpoint: str, parameters: Dict[str, Any], response: str) -> None:
+    """Save raw <response> of a request to <endpoint> with given <parameters>.
+    """
+    path = fixture_path(endpoint, parameters)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write then rename, so concurrent readers never see a partial fixture
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump({'endpoint': endpoint, 'parameters': parameters, 'response': response}, file, default=str)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def replay(endpoint: str, parameters: Dict[str, Any]) -> str:
+    """Return the recorded raw response of a request to <endpoint> with given
+    <parameters>, after the injected latency.
+
+    Raise FixtureNotFound if the request was never recorded.
+    """
+    if settings.NBA_API_REPLAY_LATENCY:
+        time.sleep(settings.NBA_API_REPLAY_LATENCY)
+
+    path = fixture_path(endpoint, parameters)
+    try:
+        with open(path) as file:
+            return json.load(file)['response']
+    except FileNotFoundError:
+        raise FixtureNotFound(f'No fixture recorded for {endpoint} {parameters} ({path})')
@@ -0,0 +1,375 @@
+"""API App Schema Module
+
+=== Module Description ===
+This module contains the column schema of every data set emitted by the API
+services, declared up front in one place.
+
+A schema lists which columns of an nba_api data set are kept or dropped, which
+are percentages to convert from 0.xxx to xx.x format, which ids are converted
+to strings, which columns are renamed for display and any other dtype
+conversions. A schema is compiled once per set of upstream columns.
+
+Schemas transform the raw headers and rows of nba_api data sets
+(<Schema.records>), with precomputed column indexes and without building a
+DataFrame, which costs more than the transform itself at these sizes. The
+values are those of the previous pandas transform, dtype inference included
+(see <Column>), so payloads did not change. That transform is kept as the
+reference of bench_transforms and of the tests.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .timing import TRANSFORM, timed
+
+# Default transforms
+PCT_FIELDS = [
+    'FG_PCT', 'FG3_PCT', 'FT_PCT', 'WIN_PCT', 'WinPCT', 'W_PCT', 'PCT'
+]
+ID_FIELDS = ['TEAM_ID', 'TeamID']
+DISPLAY_NAMES = {
+    'PLUS_MINUS': '+/-',
+    'FG_PCT': 'FG%',
+    'FG3_PCT': 'FG3%',
+    'FT_PCT': 'FT%',
+    'WIN_PCT': 'WIN%',
+    'W_PCT': 'WIN%',
+    'START_POSITION': 'P'
+}
+
+# Single game stats fields
+SINGLE_GAME_FLOAT_FIELDS = ['FG_PCT', 'FG3_PCT', 'FT_PCT']
+SINGLE_GAME_IGNORE_FIELDS = [
+    'TEAM_ID', 'PLAYER_ID', 'PLAYER_NAME', 'START_POSITION', 'COMMENT',
+    'TEAM_NAME', 'TEAM_CITY'
+]
+SINGLE_GAME_TIME_FIELDS = ['MIN']
+
+
+class Schema:
+    """Column schema of a data set emitted by the API.
+
+    === Attributes ===
+    keep:
+        the columns to keep, in output order. All columns are kept if None.
+    drop:
+        the columns to drop.
+    pct_fields:
+        the percentage columns to convert from 0.xxx to xx.x format.
+    id_fields:
+        the id columns to convert to strings.
+    display_names:
+        the mapping of columns to rename for display purpose.
+    dtypes:
+        the mapping of columns to any other dtype to convert them to.
+    single_game:
+        whether the data set holds single game stats to clean with
+        <clean_single_game_columns>.
+    """
+    keep: Optional[List[str]]
+    drop: List[str]
+    pct_fields: List[str]
+    id_fields: List[str]
+    display_names: Dict[str, str]
+    dtypes: Dict[str, Any]
+    single_game: bool
+    _compiled: Dict[Tuple[str, ...], Tuple[List[str], List[str], Dict[str, Any], List[str]]]
+    _indexes_cache: Dict[Tuple[str, ...], Dict[str, int]]
+
+    def __init__(self, keep: Optional[Sequence[str]] = None,
+                 drop: Sequence[str] = (),
+                 pct_fields: Sequence[str] = tuple(PCT_FIELDS),
+                 id_fields: Sequence[str] = tuple(ID_FIELDS),
+                 display_names: Optional[Dict[str, str]] = None,
+                 dtypes: Optional[Dict[str, Any]] = None,
+                 single_game: bool = False) -> None:
+        self.keep = list(keep) if keep is not None else None
+        self.drop = list(drop)
+        self.pct_fields = list(pct_fields)
+        self.id_fields = list(id_fields)
+        self.display_names = DISPLAY_NAMES if display_names is None else display_names
+        self.dtypes = dtypes or {}
+        self.single_game = single_game
+        self._compiled = {}
+        self._indexes_cache = {}
+
+    def compile(self, columns: Tuple[str, ...]) -> Tuple[List[str], List[str], Dict[str, Any], List[str]]:
+        """Return the selected columns, percentage columns, dtype conversions
+        and output column names of this schema for given upstream columns.
+
+        Raise KeyError if a kept or dropped column is missing upstream.
+        """
+        if columns in self._compiled:
+            return self._compiled[columns]
+
+        expected = self.keep if self.keep is not None else self.drop
+        missing = [key for key in expected if key not in columns]
+        if missing:
+            raise KeyError(f'{missing} not found in {list(columns)}')
+
+        if self.keep is not None:
+            selected = list(self.keep)
+        else:
+            selected = [key for key in columns if key not in self.drop]
+
+        pct_keys = [key for key in self.pct_fields if key in selected]
+        dtypes = {key: str for key in self.id_fields if key in selected}
+        dtypes.update({
+            key: dtype for key, dtype in self.dtypes.items() if key in selected
+        })
+        names = [self.display_names.get(key, key) for key in selected]
+
+        self._compiled[columns] = (selected, pct_keys, dtypes, names)
+        return self._compiled[columns]
+
+    def transform(self, data_set: Any) -> Tuple[List[str], List['Column']]:
+        """Return the output column names and the columns of nba_api
+        <data_set> transformed by this schema, without pandas.
+
+        Every column gets the type pandas would infer for it in the DataFrame
+        of <data_set>, so the result is the same as the previous pandas
+        transform (kept as the reference in bench_transforms).
+        """
+        with timed(TRANSFORM):
+            data = data_set.get_dict()
+            headers, rows = tuple(data['headers']), data['data']
+            selected, pct_keys, dtypes, names = self.compile(headers)
+            index = self._indexes(headers)
+
+            columns = {}
+            for key in selected:
+                i = index[key]
+                columns[key] = Column.infer([row[i] for row in rows])
+
+            for key in pct_keys:
+                columns[key].to_pct()
+
+            for key, dtype in dtypes.items():
+                columns[key].astype(dtype)
+
+            if self.single_game:
+                clean_single_game_columns(columns)
+
+            return names, [columns[key] for key in selected]
+
+    def columns(self, data_set: Any) -> Tuple[List[str], List[List]]:
+        """Return the output column names and the values of each column of
+        nba_api <data_set> transformed by this schema.
+        """
+        names, columns = self.transform(data_set)
+        return names, [column.values for column in columns]
+
+    def records(self, data_set: Any) -> List[Dict]:
+        """Return the records of nba_api <data_set> transformed by this
+        schema.
+        """
+        names, columns = self.transform(data_set)
+        return [dict(zip(names, values)) for values in zip(*[column.values for column in columns])]
+
+    def first_record(self, data_set: Any) -> Dict:
+        """Return the first record of nba_api <data_set> transformed by this
+        schema, or an empty dict if it has no rows.
+        """
+        names, columns = self.transform(data_set)
+        if not columns or not columns[0].values:
+            return {}
+
+        return {name: column.values[0] for name, column in zip(names, columns)}
+
+    def _indexes(self, headers: Tuple[str, ...]) -> Dict[str, int]:
+        """Return the index of each of <headers>, computed once per set of
+        upstream columns.
+        """
+        if headers not in self._indexes_cache:
+            self._indexes_cache[headers] = {key: i for i, key in enumerate(headers)}
+        return self._indexes_cache[headers]
+
+
+# Column kinds, as inferred by pandas from python values
+INT = 'int'
+FLOAT = 'float'
+BOOL = 'bool'
+OBJECT = 'object'
+
+# numpy cast of NaN to int64
+NAN_INT = -2 ** 63
+
+
+def is_null(value: Any) -> bool:
+    """Return whether <value> is null (None or NaN) for pandas.
+    """
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class Column:
+    """Values of a column, typed like the DataFrame column pandas would build
+    from them.
+
+    === Attributes ===
+    kind:
+        the kind of the column: INT, FLOAT or BOOL for the int64, float64
+        and bool dtypes, OBJECT otherwise.
+    values:
+        the values of the column, as python values of the column kind.
+    """
+    kind: str
+    values: List
+
+    def __init__(self, kind: str, values: List) -> None:
+        self.kind = kind
+        self.values = values
+
+    @classmethod
+    def infer(cls, values: List) -> 'Column':
+        """Return the column of <values>, with the kind pandas infers for
+        them: bool if every value is a bool, int if every value is an int,
+        float if every value is a number or null (nulls becoming NaN), and
+        object otherwise.
+        """
+        types = {type(value) for value in values}
+        if not values or types == {bool}:
+            return cls(BOOL if values else OBJECT, values)
+        if types == {int}:
+            return cls(INT, values)
+        if types <= {int, float, type(None)} and types & {int, float}:
+            return cls(FLOAT, [math.nan if value is None else float(value) for value in values])
+        return cls(OBJECT, values)
+
+    def to_pct(self) -> None:
+        """Convert numeric values from 0.xxx to xx.x format.
+        """
+        if self.kind == FLOAT:
+            # As numpy rounds: x * 10, to even, / 10
+            self.values = [value if math.isnan(value) else round(100 * value * 10) / 10 for value in self.values]
+        elif self.kind in (INT, BOOL):
+            self.kind = INT
+            self.values = [100 * int(value) for value in self.values]
+
+    def astype(self, dtype: Any) -> None:
+        """Convert every value to <dtype> (str, int or float).
+        """
+        if dtype is int and self.kind == FLOAT and any(math.isnan(value) for value in self.values):
+            raise ValueError('Cannot convert non-finite values (NA or inf) to integer')
+
+        self.values = [dtype(value) for value in self.values]
+        self.kind = {int: INT, float: FLOAT}.get(dtype, OBJECT)
+
+    def mask(self, rows: List[bool], value: Any) -> None:
+        """Replace the values of <rows> by <value>, changing the kind of the
+        column if it cannot hold <value>, as pandas does.
+        """
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if self.kind == INT and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif self.kind == INT and is_number:
+            self.kind, self.values = FLOAT, [float(v) for v in self.values]
+        elif self.kind == FLOAT and is_number:
+            value = float(value)
+        elif self.kind != OBJECT and not (self.kind == BOOL and isinstance(value, bool)):
+            self.kind = OBJECT
+
+        self.values = [value if masked else v for masked, v in zip(rows, self.values)]
+
+
+def clean_single_game_columns(columns: Dict[str, Column]) -> None:
+    """Zero out the stats of players that did not play (no MIN) and convert
+    counting stat fields to int, in place.
+    """
+    float_keys = [key for key in columns if key in SINGLE_GAME_FLOAT_FIELDS]
+    time_keys = [key for key in columns if key in SINGLE_GAME_TIME_FIELDS]
+    int_keys = [
+        key for key in columns
+        if key not in SINGLE_GAME_IGNORE_FIELDS and key not in SINGLE_GAME_FLOAT_FIELDS
+        and key not in SINGLE_GAME_TIME_FIELDS
+    ]
+
+    not_played = [is_null(value) for value in columns['MIN'].values]
+    if any(not_played):
+        for key in float_keys:
+            columns[key].mask(not_played, 0.0)
+        for key in time_keys:
+            columns[key].mask(not_played, '00:00')
+        for key in int_keys:
+            column = columns[key]
+            values = [
+                0.0 if masked else math.nan if value is None else float(value)
+                for masked, value in zip(not_played, column.values)
+            ]
+            column.kind = INT
+            column.values = [NAN_INT if math.isnan(value) else int(value) for value in values]
+    else:
+        for key in int_keys:
+            if columns[key].kind != INT:
+                columns[key].astype(int)
+
+
+# Standings
+STANDINGS = Schema(keep=[
+    'TeamID', 'TeamCity', 'TeamName', 'WinPCT', 'WINS', 'LOSSES', 'HOME',
+    'ROAD', 'L10', 'ConferenceRecord', 'CurrentStreak', 'Conference',
+    'PlayoffRank', 'PointsPG', 'OppPointsPG', 'DiffPointsPG'
+])
+
+# Teams
+TEAM_LIST = Schema(keep=[
+    'TEAM_ID', 'TEAM_NAME', 'GP', 'W', 'L', 'W_PCT', 'FGM', 'FGA', 'FG_PCT',
+    'FG3M', 'FG3A', 'FG3_PCT', 'FTM', 'FTA', 'FT_PCT', 'OREB', 'DREB',
+    'REB', 'AST', 'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD', 'PTS',
+    'PLUS_MINUS'
+])
+TEAM_ROSTER = Schema(
+    drop=['TeamID', 'SEASON', 'LeagueID', 'NICKNAME', 'PLAYER_SLUG'],
+    dtypes={'AGE': int}
+)
+TEAM_COACHES = Schema(drop=[
+    'TEAM_ID', 'SEASON', 'COACH_ID', 'SORT_SEQUENCE', 'SUB_SORT_SEQUENCE',
+    'IS_ASSISTANT', 'FIRST_NAME', 'LAST_NAME'
+])
+TEAM_INFO = Schema(drop=['SEASON_YEAR', 'TEAM_CODE', 'TEAM_SLUG'])
+TEAM_STATS = Schema(keep=[
+    'GP', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT', 'FTM', 'FTA',
+    'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'BLKA',
+    'PF', 'PFD', 'PTS', 'PLUS_MINUS'
+])
+TEAM_PLAYER_STATS = Schema(keep=[
+    'PLAYER_ID', 'PLAYER_NAME', 'GP', 'W', 'L', 'MIN', 'FGM', 'FGA',
+    'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT', 'FTM', 'FTA', 'FT_PCT', 'OREB',
+    'DREB', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD', 'PTS',
+    'PLUS_MINUS', 'DD2', 'TD3'
+])
+TEAM_GAME_LOG = Schema(drop=['Team_ID'])
+
+# Games
+LINE_SCORE = Schema(drop=[
+    'GAME_DATE_EST', 'GAME_SEQUENCE', 'TEAM_CITY_NAME', 'TEAM_NICKNAME',
+    'GAME_ID'
+])
+BROADCAST = Schema(
+    keep=['GAME_STATUS_TEXT', 'NATL_TV_BROADCASTER_ABBREVIATION', 'LIVE_PERIOD']
+)
+GAME_SUMMARY = Schema(
+    keep=[
+        'GAME_STATUS_TEXT', 'NATL_TV_BROADCASTER_ABBREVIATION', 'LIVE_PERIOD',
+        'HOME_TEAM_ID', 'VISITOR_TEAM_ID', 'GAME_DATE_EST'
+    ],
+    id_fields=['HOME_TEAM_ID', 'VISITOR_TEAM_ID']
+)
+INACTIVE_PLAYERS = Schema(drop=['TEAM_CITY', 'TEAM_NAME'])
+BOX_SCORE_PLAYER_STATS = Schema(
+    drop=['GAME_ID', 'TEAM_CITY', 'TEAM_ABBREVIATION', 'NICKNAME'],
+    single_game=True
+)
+BOX_SCORE_TEAM_STATS = Schema(
+    drop=['GAME_ID', 'TEAM_ABBREVIATION'],
+    single_game=True
+)
+
+# Players
+PLAYER_INFO = Schema(keep=[
+    'DISPLAY_FIRST_LAST', 'BIRTHDATE', 'SCHOOL', 'COUNTRY', 'HEIGHT',
+    'WEIGHT', 'SEASON_EXP', 'JERSEY', 'POSITION', 'TEAM_NAME', 'TEAM_CITY',
+    'FROM_YEAR', 'TEAM_ID', 'DRAFT_ROUND', 'DRAFT_NUMBER', 'PERSON_ID'
+])
+PLAYER_CAREER = Schema(drop=['PLAYER_ID', 'LEAGUE_ID', 'Team_ID'])
+PLAYER_SEASONS = Schema(drop=['PLAYER_ID', 'LEAGUE_ID', 'PLAYER_AGE'])
+PLAYER_GAME_LOG = Schema(drop=['SEASON_ID', 'Player_ID', 'VIDEO_AVAILABLE'])
+PLAYER_LIST = Schema()
@@ -0,0 +1,203 @@
+"""API App Search Index Module
+
+=== Module Description ===
+This module contains the in-memory search index over the static nba_api player
+and team lists used by the search API.
+
+The index is built once per process, on first use or in the background of web
+workers (<start_building>), and holds:
+  - normalized name tokens (lower case, accents and punctuation stripped)
+  - a prefix trie over those tokens
+  - a single deletion neighbourhood of every token for typo tolerance
+  - id and exact key (team abbreviation) hash maps
+
+Results are ranked exact name match first, then token prefix match, then
+typo match, and in static list order within each rank.
+"""
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+from nba_api.stats.static.players import get_players
+from nba_api.stats.static.teams import get_teams
+
+# Ranks
+EXACT = 0
+PREFIX = 1
+TYPO = 2
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def normalize(text: str) -> str:
+    """Return <text> in lower case with accents and punctuation removed.
+    """
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(TOKEN_PATTERN.findall(text.lower()))
+
+
+def deletions(token: str) -> Set[str]:
+    """Return every string obtained by deleting one character of <token>.
+    """
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class PrefixTrie:
+    """Prefix trie mapping every prefix of the inserted keys to the ids of
+    the entries holding a key with that prefix.
+
+    === Attributes ===
+    root:
+        the root node. Each node is a dict of child nodes by character, and
+        the ids of the entries under the node at key None.
+    """
+    root: Dict
+
+    def __init__(self) -> None:
+        self.root = {None: set()}
+
+    def insert(self, key: str, entry_id: int) -> None:
+        """Insert <key> of entry <entry_id>.
+        """
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {None: set()})
+            node[None].add(entry_id)
+
+    def find(self, prefix: str) -> Set[int]:
+        """Return the ids of the entries holding a key starting with <prefix>.
+        """
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+
+        return node[None]
+
+
+class SearchIndex:
+    """Search index over a list of players or teams.
+
+    === Attributes ===
+    entries:
+        the indexed player or team dicts, in static list order.
+    by_id:
+        the entries by id.
+    by_key:
+        the entry ids by normalized exact key, e.g. team abbreviation.
+    names:
+        the normalized searchable names of each entry.
+    trie:
+        the prefix trie over every name token of each entry.
+    typos:
+        the entry ids by single character deletion of each token.
+    """
+    entries: List[Dict]
+    by_id: Dict[int, Dict]
+    by_key: Dict[str, int]
+    names: List[Set[str]]
+    trie: PrefixTrie
+    typos: Dict[str, Set[int]]
+
+    def __init__(self, entries: List[Dict], fields: Iterable[str],
+                 key_fields: Iterable[str] = ()) -> None:
+        self.entries = entries
+        self.by_id = {entry['id']: entry for entry in entries}
+        self.by_key = {
+            normalize(entry[field]): entry_id
+            for entry_id, entry in enumerate(entries) for field in key_fields
+        }
+        self.names = []
+        self.trie = PrefixTrie()
+        self.typos = {}
+
+        fields = list(fields)
+        for entry_id, entry in enumerate(entries):
+            names = {normalize(entry[field]) for field in fields if entry.get(field)}
+            self.names.append(names)
+            for name in names:
+                for token in name.split():
+                    self.trie.insert(token, entry_id)
+                    for typo in deletions(token) | {token}:
+                        self.typos.setdefault(typo, set()).add(entry_id)
+
+    def _match_token(self, token: str) -> Dict[int, int]:
+        """Return the rank of every entry matching query token <token>.
+        """
+        matches = {entry_id: PREFIX for entry_id in self.trie.find(token)}
+        if not matches and len(token) > 2:
+            for typo in deletions(token) | {token}:
+                for entry_id in self.typos.get(typo, ()):
+                    matches[entry_id] = TYPO
+
+        return matches
+
+    def search(self, query: str) -> List[Dict]:
+        """Return the entries matching <query>, best match first.
+
+        Every token of <query> must match a token of the entry, either by
+        prefix or, failing that, with a single typo.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        ranks = None
+        for token in query.split():
+            matches = self._match_token(token)
+            if ranks is None:
+                ranks = matches
+            else:
+                ranks = {
+                    entry_id: max(rank, matches[entry_id])
+                    for entry_id, rank in ranks.items() if entry_id in matches
+                }
+
+        if query in self.by_key:
+            ranks[self.by_key[query]] = EXACT
+
+        result: List[Tuple[int, int]] = []
+        for entry_id, rank in ranks.items():
+            names = self.names[entry_id]
+            if rank == PREFIX and (query in names or any(query in name.split() for name in names)):
+                rank = EXACT
+            result.append((rank, entry_id))
+
+        return [self.entries[entry_id] for _, entry_id in sorted(result)]
+
+
+@lru_cache(maxsize=None)
+def player_index() -> SearchIndex:
+    """Return the player search index, building it on first use.
+    """
+    return SearchIndex(get_players(), ['full_name', 'first_name', 'last_name'])
+
+
+@lru_cache(maxsize=None)
+def team_index() -> SearchIndex:
+    """Return the team search index, building it on first use.
+    """
+    return SearchIndex(
+        get_teams(),
+        ['full_name', 'city', 'state', 'nickname', 'abbreviation'],
+        key_fields=['abbreviation']
+    )
+
+
+def build_indexes() -> None:
+    """Build the player and team search indexes, if not built yet.
+    """
+    player_index()
+    team_index()
+
+
+def start_building() -> threading.Thread:
+    """Build the search indexes in a background daemon thread and return it.
+    """
+    thread = threading.Thread(target=build_indexes, name='nba-api-search-index', daemon=True)
+    thread.start()
+    return thread
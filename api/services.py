@@ -0,0 +1,532 @@
+"""API App Services Module
+
+=== Module Description ===
+This module contains the functions that build every API payload from nba_api
+endpoint data. They are called directly by both the DRF views in the API app
+and the HTML views in the main app, so pages never call the API over HTTP.
+"""
+import logging
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from dateutil import parser
+from django.conf import settings
+
+from . import bios, endpoints, schema, store, search as search_index
+from .cache import fetch, game_timeout, get_or_build, get_timeout
+from .planner import Plan
+from .tables import Table
+from .utils import iter_concurrently, map_concurrently, start_concurrently
+
+logger = logging.getLogger(__name__)
+
+# Constants
+SEASON_TYPES = {
+    'Regular': 'Regular Season',
+    'Post': 'Playoffs'
+}
+# Number of player search results whose bios are prefetched
+SEARCH_PREFETCH_SIZE = 5
+SEASON_PATTERN = re.compile(r'\d{4}-\d{2}')
+
+
+def get_standings() -> List[Dict]:
+    """Return the league standings.
+    """
+    return schema.STANDINGS.records(fetch(endpoints.LeagueStandings).standings)
+
+
+def get_team_list(ordering: Sequence[str] = (), fields: Optional[Sequence[str]] = None) -> List[Dict]:
+    """Return per game stats of every team, sorted by <ordering> and with
+    only <fields> (see <Table.rows>).
+    """
+    return get_team_table().rows(ordering, fields)[:]
+
+
+def get_team_table() -> Table:
+    """Return per game stats of every team, as a table.
+    """
+    def build() -> Table:
+        data = fetch(endpoints.LeagueDashTeamStats, per_mode_detailed='PerGame').league_dash_team_stats
+        return Table.from_columns(*schema.TEAM_LIST.columns(data))
+
+    return get_or_build('table:team_list', build, lambda table: get_timeout(endpoints.LeagueDashTeamStats))
+
+
+def get_team_detail(team_id: str) -> Dict:
+    """Return roster, coaches, info and stats of team <team_id>.
+    """
+    plan = Plan()
+    plan.add('roster', lambda: fetch(endpoints.CommonTeamRoster, team_id))
+    plan.add('info', lambda: fetch(endpoints.TeamInfoCommon, team_id))
+    plan.add('dashboard', lambda: fetch(endpoints.TeamPlayerDashboard, team_id, per_mode_detailed='PerGame'))
+    data = plan.run()
+
+    players = schema.TEAM_ROSTER.records(data['roster'].common_team_roster)
+    coaches = schema.TEAM_COACHES.records(data['roster'].coaches)
+
+    team_info = schema.TEAM_INFO.records(data['info'].team_info_common)
+
+    team_stats = schema.TEAM_STATS.records(data['dashboard'].team_overall)
+    player_stats = schema.TEAM_PLAYER_STATS.records(data['dashboard'].players_season_totals)
+
+    # Visitors often open players of the roster next
+    bios.prefetch(player['PLAYER_ID'] for player in players)
+
+    result = {
+        'players': players,
+        'coaches': coaches,
+        'team_info': team_info[0],
+        'team_stats': team_stats[0],
+        'player_stats': player_stats
+    }
+    return result
+
+
+def get_games_by_date(date: str) -> Dict:
+    """Return line score and broadcast info of every game on <date>.
+    """
+    parsed_date = parser.parse(date).strftime('%m/%d/%Y')
+    data = fetch(
+        endpoints.LeagueGameFinder,
+        league_id_nullable='00',
+        date_to_nullable=parsed_date,
+        date_from_nullable=parsed_date
+    )
+
+    def game_summary(game_id: str) -> Dict:
+        box_score = fetch(endpoints.BoxScoreSummaryV2, game_id, timeout=settings.NBA_API_TIMEOUT)
+        return {
+            'line_score': schema.LINE_SCORE.records(box_score.line_score),
+            'broadcast': schema.BROADCAST.records(box_score.game_summary)[0]
+        }
+
+    # Games that fail to load are left out rather than failing the whole day
+    games = data.league_game_finder_results.get_dict()
+    game_id_index = games['headers'].index('GAME_ID')
+    return map_concurrently(game_summary, dict.fromkeys(row[game_id_index] for row in games['data']))
+
+
+def fetch_game(game_id: str) -> Dict:
+    """Return the box score records of game <game_id> fetched upstream.
+    """
+    plan = Plan()
+    plan.add('summary', lambda: fetch(endpoints.BoxScoreSummaryV2, game_id))
+    plan.add('traditional', lambda: fetch(endpoints.BoxScoreTraditionalV2, game_id))
+    data = plan.run()
+
+    # Get box score summary
+    box_score = data['summary']
+    summary = schema.GAME_SUMMARY.records(box_score.game_summary)[0]
+    line_score = schema.LINE_SCORE.records(box_score.line_score)
+    inactive_players = schema.INACTIVE_PLAYERS.records(box_score.inactive_players)
+
+    # Get traditional box score data
+    box_score_trad = data['traditional']
+    player_stats = schema.BOX_SCORE_PLAYER_STATS.records(box_score_trad.player_stats)
+    team_stats = schema.BOX_SCORE_TEAM_STATS.records(box_score_trad.team_stats)
+
+    return {
+        'summary': summary,
+        'line_score': line_score,
+        'inactive_players': inactive_players,
+        'player_stats': player_stats,
+        'team_stats': team_stats
+    }
+
+
+def get_game(game_id: str) -> Dict:
+    """Return box score of game <game_id>.
+
+    The payload is cached for as long as the game status allows (see
+    <cache.game_timeout>).
+    """
+    return get_or_build(
+        f'game:{game_id}',
+        lambda: build_game(game_id),
+        lambda result: game_timeout(result['summary'])
+    )
+
+
+def get_games(game_ids: Iterable[str]) -> Dict:
+    """Return box scores of games <game_ids>, keyed by game ID.
+
+    Games that fail to load are listed under 'failed' rather than failing the
+    whole batch.
+    """
+    game_ids = list(game_ids)
+    games = dict(iter_games(game_ids))
+    return {
+        'games': {game_id: games[game_id] for game_id in game_ids if game_id in games},
+        'failed': [game_id for game_id in game_ids if game_id not in games]
+    }
+
+
+def iter_games(game_ids: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+    """Yield the ID and box score of each of games <game_ids>, as soon as it
+    is ready. Games that fail to load are logged and skipped.
+
+    Games missing from the local store are fetched upstream concurrently,
+    while the stored ones are loaded, but saved from this thread as SQLite
+    only allows one writer at a time.
+    """
+    game_ids = list(game_ids)
+    stored = store.stored_games(game_ids)
+    fetched = start_concurrently(fetch_game, [game_id for game_id in game_ids if game_id not in stored])
+    try:
+        for game_id in game_ids:
+            if game_id in stored:
+                game = load_game(game_id)
+                if game is not None:
+                    yield game_id, game
+
+        for game_id, records in fetched:
+            game = load_game(game_id, records)
+            if game is not None:
+                yield game_id, game
+    finally:
+        fetched.close()
+
+
+def load_game(game_id: str, records: Optional[Dict] = None) -> Optional[Dict]:
+    """Return box score of game <game_id>, after saving its fetched <records>
+    if any, or None if it fails to load.
+    """
+    try:
+        if records is not None:
+            store.save_game(game_id, records)
+        return get_game(game_id)
+    except Exception:
+        logger.exception('Failed to load game %s', game_id)
+        return None
+
+
+def find_team_row(rows: List[Dict], team_id) -> Dict:
+    """Return the row of team <team_id> in <rows>.
+
+    Raise ValueError if there is none, e.g. in an incomplete box score.
+    """
+    row = next((row for row in rows if row['TEAM_ID'] == team_id), None)
+    if row is None:
+        raise ValueError(f'No row of team {team_id}')
+    return row
+
+
+def build_game(game_id: str) -> Dict:
+    """Return box score of game <game_id>, built from the local store.
+
+    Only final games are read from the local store: the box score of a game
+    in progress or scheduled is fetched upstream, through endpoint responses
+    cached for the live game TTL, and saved.
+    """
+    records = store.load_game(game_id)
+    if records is None:
+        records = store.save_game(game_id, fetch_game(game_id))
+
+    summary = dict(records['summary'])
+    line_score = records['line_score']
+    team_stats = records['team_stats']
+
+    # Split data to two teams
+    overtime_keys = [
+        f'PTS_OT{i}' for i in range(1, 11)
+    ]
+
+    def team_data(team_id: str) -> Dict:
+        return {
+            'player_stats': [],
+            'line_score': find_team_row(line_score, team_id),
+            'team_stats': find_team_row(team_stats, team_id)
+        }
+
+    home_team_id = summary['HOME_TEAM_ID']
+    home_team_data = team_data(home_team_id)
+    home_line_score = home_team_data['line_score']
+
+    away_team_id = summary['VISITOR_TEAM_ID']
+    away_team_data = team_data(away_team_id)
+    away_line_score = away_team_data['line_score']
+
+    for row in records['player_stats']:
+        if row.get('TEAM_ID') == home_team_id:
+            home_team_data['player_stats'].append(row)
+        elif row.get('TEAM_ID') == away_team_id:
+            away_team_data['player_stats'].append(row)
+
+    overtime = {
+        i: {
+            'flag': False if i > summary['LIVE_PERIOD'] - 4 else True,
+            'home': home_line_score[f'PTS_OT{i}'],
+            'away': away_line_score[f'PTS_OT{i}']
+        }
+        for i in range(1, 11)
+    }
+    for data in [home_team_data, away_team_data]:
+        data['line_score'] = {
+            key: value for key, value in data['line_score'].items() if key not in overtime_keys
+        }
+
+    # Return JSON response
+    date = parser.parse(summary['GAME_DATE_EST'])
+    summary['GAME_DATE_EST'] = date.strftime('%B %d, %Y')
+    summary['HOME_WON'] = bool(home_line_score['PTS'] > away_line_score['PTS'])
+
+    result = {
+        'summary': summary,
+        'inactive_players': records['inactive_players'],
+        'overtime': overtime,
+        'home_team': home_team_data,
+        'away_team': away_team_data
+    }
+    return result
+
+
+def get_player_info(player_id: str) -> Dict:
+    """Return bio of player <player_id> (see <bios.get_bio>).
+    """
+    return bios.profile(player_id, bios.get_bio(player_id))
+
+
+def get_player_detail(player_id: str) -> Dict:
+    """Return bio and career stats of player <player_id>.
+    """
+    player_info = get_player_info(player_id)
+
+    career_stats = fetch(endpoints.PlayerCareerStats, player_id, per_mode36='PerGame')
+    career_regular_season = schema.PLAYER_CAREER.first_record(career_stats.career_totals_regular_season)
+    career_post_season = schema.PLAYER_CAREER.first_record(career_stats.career_totals_post_season)
+    regular_season = schema.PLAYER_SEASONS.records(career_stats.season_totals_regular_season)
+    post_season = schema.PLAYER_SEASONS.records(career_stats.season_totals_post_season)
+
+    result = {
+        'player_info': player_info,
+        'stats': {
+            'regular_season': {
+                'display_name': "Regular",
+                'season': regular_season[::-1],
+                'career': career_regular_season
+            },
+            'post_season': {
+                'display_name': "Post",
+                'season': post_season[::-1],
+                'career': career_post_season
+            }
+        }
+    }
+    return result
+
+
+def fetch_player_game_log(player_id: str, season: str, season_type: str) -> List[Dict]:
+    """Return the game log records of player <player_id> in given season
+    fetched upstream.
+    """
+    data = fetch(
+        endpoints.PlayerGameLog,
+        player_id=player_id,
+        season=season,
+        season_type_all_star=SEASON_TYPES[season_type]
+    )
+    return schema.PLAYER_GAME_LOG.records(data.player_game_log)
+
+
+def get_player_game_log(player_id: str, season: str, season_type: str) -> Dict:
+    """Return game log of player <player_id> in given season.
+    """
+    return {
+        'player_info': get_player_info(player_id),
+        'season_type': season_type,
+        'game_log': fetch_player_game_log(player_id, season, season_type)
+    }
+
+
+def get_player_game_logs(player_id: str, seasons: List[str], season_types: List[str]) -> Dict:
+    """Return game logs of player <player_id> in every one of <seasons> and
+    <season_types> (see <get_game_logs>).
+    """
+    return {
+        'player_info': get_player_info(player_id),
+        **get_game_logs(
+            lambda season, season_type: fetch_player_game_log(player_id, season, season_type),
+            seasons,
+            season_types
+        )
+    }
+
+
+def fetch_team_game_log(team_id: str, season: str, season_type: str) -> List[Dict]:
+    """Return the game log records of team <team_id> in given season fetched
+    upstream.
+    """
+    data = fetch(
+        endpoints.TeamGameLog,
+        team_id=team_id,
+        season=season,
+        season_type_all_star=SEASON_TYPES[season_type]
+    )
+    return schema.TEAM_GAME_LOG.records(data.team_game_log)
+
+
+def get_team_game_log(team_id: str, season: str, season_type: str) -> Dict:
+    """Return game log of team <team_id> in given season.
+    """
+    return {
+        'team_info': get_team_info(team_id),
+        'season': season,
+        'season_type': season_type,
+        'game_log': get_team_season_game_log(team_id, season, season_type)
+    }
+
+
+def get_team_game_logs(team_id: str, seasons: List[str], season_types: List[str]) -> Dict:
+    """Return game logs of team <team_id> in every one of <seasons> and
+    <season_types> (see <get_game_logs>).
+
+    Game logs in the local store are read from it, the others are fetched
+    upstream concurrently, but saved from this thread as SQLite only allows
+    one writer at a time. A season that fails to be read or saved is logged
+    and reported as failed, like one that fails to be fetched.
+    """
+    stored = store.stored_team_game_logs(team_id, seasons, season_types)
+
+    def game_logs() -> Iterator[Tuple[Tuple[str, str], List[Dict]]]:
+        requested = [(season, season_type) for season in seasons for season_type in season_types]
+        fetched = iter_concurrently(
+            lambda key: fetch_team_game_log(team_id, *key),
+            [key for key in requested if key not in stored]
+        )
+        for key in requested:
+            if key in stored:
+                try:
+                    game_log = get_team_season_game_log(team_id, *key)
+                except Exception:
+                    logger.exception('Failed to load %r', key)
+                    continue
+                yield key, game_log
+
+        for (season, season_type), game_log in fetched:
+            try:
+                game_log = store.save_team_game_log(team_id, season, season_type, game_log)
+            except Exception:
+                logger.exception('Failed to save %r', (season, season_type))
+                continue
+            yield (season, season_type), game_log
+
+    return {
+        'team_info': get_team_info(team_id),
+        **iter_game_logs(game_logs(), seasons, season_types)
+    }
+
+
+def get_team_info(team_id: str) -> Dict:
+    """Return info of team <team_id>.
+    """
+    return schema.TEAM_INFO.records(fetch(endpoints.TeamInfoCommon, team_id).team_info_common)[0]
+
+
+def get_team_season_game_log(team_id: str, season: str, season_type: str) -> List[Dict]:
+    """Return the game log records of team <team_id> in given season.
+
+    The game log is read from the local store, and only fetched upstream when
+    it is missing or stale.
+    """
+    game_log = store.load_team_game_log(team_id, season, season_type)
+    if game_log is None:
+        game_log = store.save_team_game_log(
+            team_id, season, season_type, fetch_team_game_log(team_id, season, season_type)
+        )
+    return game_log
+
+
+def get_game_logs(fetch_game_log: Callable[[str, str], List[Dict]],
+                  seasons: List[str], season_types: List[str]) -> Dict:
+    """Return the game logs fetched with <fetch_game_log>(season, season_type)
+    in every one of <seasons> and <season_types>, fetched concurrently.
+
+    See <iter_game_logs> for the returned iterators.
+    """
+    requested = [(season, season_type) for season in seasons for season_type in season_types]
+    game_logs = iter_concurrently(lambda key: fetch_game_log(*key), requested)
+    return iter_game_logs(game_logs, seasons, season_types)
+
+
+def iter_game_logs(game_logs: Iterator[Tuple[Tuple[str, str], List[Dict]]],
+                   seasons: List[str], season_types: List[str]) -> Dict:
+    """Return <game_logs>, pairs of (season, season type) and game log, as:
+      - 'game_logs': an iterator of the season, season type and game log of
+        each season as soon as it is ready, in no particular order
+      - 'failed': an iterator of the season and season type of each season
+        that failed to load, only complete once 'game_logs' is consumed
+
+    Nothing is fetched until 'game_logs' is consumed, and only a few seasons
+    are held in memory at once, so whole careers can be streamed.
+    """
+    loaded = set()
+
+    def iter_loaded() -> Iterator[Dict]:
+        for (season, season_type), game_log in game_logs:
+            loaded.add((season, season_type))
+            yield {'season': season, 'season_type': season_type, 'game_log': game_log}
+
+    return {
+        'game_logs': iter_loaded(),
+        # Lazy, so it is only evaluated after every game log was loaded
+        'failed': (
+            {'season': season, 'season_type': season_type}
+            for season in seasons for season_type in season_types
+            if (season, season_type) not in loaded
+        )
+    }
+
+
+def get_seasons(first_season: str, last_season: str) -> List[str]:
+    """Return every season from <first_season> to <last_season>, e.g.
+    ['2018-19', '2019-20', '2020-21'] from '2018-19' to '2020-21'.
+
+    Raise ValueError if a season is invalid or <last_season> is before
+    <first_season>.
+    """
+    def start_year(season: str) -> int:
+        if not SEASON_PATTERN.fullmatch(season) or (int(season[:4]) + 1) % 100 != int(season[5:]):
+            raise ValueError(f'Invalid season {season!r}, expected e.g. 2020-21.')
+        return int(season[:4])
+
+    first_year, last_year = start_year(first_season), start_year(last_season)
+    if last_year < first_year:
+        raise ValueError(f'{last_season} is before {first_season}.')
+
+    return [f'{year}-{(year + 1) % 100:02d}' for year in range(first_year, last_year + 1)]
+
+
+def get_player_list(ordering: Sequence[str] = (), fields: Optional[Sequence[str]] = None) -> List[Dict]:
+    """Return per game stats of every league leader, sorted by <ordering> and
+    with only <fields> (see <Table.rows>).
+    """
+    return get_player_table().rows(ordering, fields)[:]
+
+
+def get_player_table() -> Table:
+    """Return per game stats of every league leader, as a table.
+    """
+    def build() -> Table:
+        data = fetch(endpoints.LeagueLeaders, per_mode48='PerGame').league_leaders
+        return Table.from_columns(*schema.PLAYER_LIST.columns(data))
+
+    return get_or_build('table:player_list', build, lambda table: get_timeout(endpoints.LeagueLeaders))
+
+
+def search(search_type: str, name: str) -> Dict:
+    """Return players or teams matching <name>, best match first.
+    """
+    if search_type == 'player':
+        index = search_index.player_index()
+    else:
+        index = search_index.team_index()
+
+    if name.isnumeric():
+        entry = index.by_id.get(int(name))
+        return {'result': [entry] if entry is not None else [], 'type': search_type}
+
+    result = index.search(name)
+    if search_type == 'player':
+        bios.prefetch(entry['id'] for entry in result[:SEARCH_PREFETCH_SIZE])
+    return {'result': result, 'type': search_type}
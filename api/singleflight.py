@@ -0,0 +1,97 @@
+"""API App Single Flight Module
+
+=== Module Description ===
+This module contains the request coalescing used by <cache.fetch>: concurrent
+callers asking for the same key share a single in-flight call and its result
+(or exception), instead of each sending their own request upstream.
+
+Calls are coalesced across the threads of a process. <SingleFlight.counters>
+tracks how many calls were made and how many were coalesced.
+"""
+import threading
+from typing import Any, Callable, Dict
+
+
+class Flight:
+    """A call in progress, shared by every caller of the same key.
+
+    === Attributes ===
+    done:
+        set once the call returned or raised.
+    result:
+        the value returned by the call.
+    error:
+        the exception raised by the call, if any.
+    """
+    done: threading.Event
+    result: Any
+    error: Any
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls made with the same key.
+
+    === Attributes ===
+    counters:
+        the number of calls made ('calls'), of callers that shared the call
+        of another ('coalesced'), and any other count recorded with
+        <increment>.
+    """
+    counters: Dict[str, int]
+    _flights: Dict[str, Flight]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self.counters = {'calls': 0, 'coalesced': 0}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str) -> None:
+        """Increment <counter> by one.
+        """
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + 1
+
+    def in_flight(self, key: str) -> bool:
+        """Return whether a call for <key> is in flight.
+        """
+        with self._lock:
+            return key in self._flights
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Return the result of <func>(), or of the call already in flight
+        for <key> if there is one.
+
+        An exception raised by the call is raised to every caller sharing it.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.counters['calls'] += 1
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result
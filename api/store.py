@@ -0,0 +1,195 @@
+"""API App Local Store Module
+
+=== Module Description ===
+This module contains the functions that read and write the records of the API
+services to the local store (see api/models.py).
+
+Every load function returns None when the record is missing or stale, in which
+case the service fetches it upstream and saves it with the matching save
+function. Saves are idempotent upserts.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dateutil import parser
+from django.db import transaction
+
+from .models import Game, LineScore, TeamBoxScore, PlayerBoxScore, PlayerBio, TeamGameLog
+from .schema import is_null
+
+
+# Helper functions
+def without_nan(record: Dict) -> Dict:
+    """Return <record> with its NaN values (the nulls of float columns) as
+    None, so it can be stored as JSON.
+    """
+    return {key: None if is_null(value) else value for key, value in record.items()}
+
+
+def to_table(records: List[Dict], columns: Optional[List[str]] = None) -> Dict:
+    """Return <records> as a table of columns and lists of row values.
+    """
+    if columns is None:
+        columns = list(records[0].keys()) if records else []
+
+    return {
+        'columns': columns,
+        'rows': [[record.get(key) for key in columns] for record in records]
+    }
+
+
+def from_table(table: Dict) -> List[Dict]:
+    """Return the records of <table>.
+    """
+    columns = table.get('columns', [])
+    return [dict(zip(columns, row)) for row in table.get('rows', [])]
+
+
+# Games
+def load_game(game_id: str) -> Optional[Dict]:
+    """Return the stored box score records of game <game_id>.
+    """
+    game = Game.objects.filter(pk=game_id).prefetch_related(
+        'line_scores', 'team_box_scores', 'player_box_scores'
+    ).first()
+    if game is None or game.is_stale():
+        return None
+
+    def records(rows, table: str) -> List[Dict]:
+        columns = game.columns[table]
+        return [dict(zip(columns, row.values)) for row in rows]
+
+    return {
+        'summary': game.summary,
+        'line_score': records(game.line_scores.all(), 'line_score'),
+        'inactive_players': from_table(game.inactive_players),
+        'player_stats': records(game.player_box_scores.all(), 'player_stats'),
+        'team_stats': records(game.team_box_scores.all(), 'team_stats')
+    }
+
+
+def stored_games(game_ids: Iterable[str]) -> Set[str]:
+    """Return which of games <game_ids> are stored and not stale.
+    """
+    return {game.game_id for game in Game.objects.filter(pk__in=list(game_ids)) if not game.is_stale()}
+
+
+@transaction.atomic
+def save_game(game_id: str, records: Dict) -> Dict:
+    """Store the box score <records> of game <game_id> and return them in
+    their stored form, without NaN values.
+    """
+    records = {
+        table: without_nan(value) if table == 'summary' else [without_nan(record) for record in value]
+        for table, value in records.items()
+    }
+    summary = records['summary']
+    tables = {
+        table: to_table(records[table])
+        for table in ['line_score', 'player_stats', 'team_stats']
+    }
+
+    game, _ = Game.objects.update_or_create(
+        game_id=game_id,
+        defaults={
+            'game_date': parser.parse(summary['GAME_DATE_EST']).date(),
+            'home_team_id': summary['HOME_TEAM_ID'],
+            'visitor_team_id': summary['VISITOR_TEAM_ID'],
+            'status_text': summary['GAME_STATUS_TEXT'] or '',
+            'summary': summary,
+            'columns': {table: data['columns'] for table, data in tables.items()},
+            'inactive_players': to_table(records['inactive_players'])
+        }
+    )
+
+    game.line_scores.all().delete()
+    LineScore.objects.bulk_create([
+        LineScore(game=game, team_id=record['TEAM_ID'], values=row)
+        for record, row in zip(records['line_score'], tables['line_score']['rows'])
+    ])
+    game.team_box_scores.all().delete()
+    TeamBoxScore.objects.bulk_create([
+        TeamBoxScore(game=game, team_id=record['TEAM_ID'], values=row)
+        for record, row in zip(records['team_stats'], tables['team_stats']['rows'])
+    ])
+    game.player_box_scores.all().delete()
+    PlayerBoxScore.objects.bulk_create([
+        PlayerBoxScore(
+            game=game,
+            team_id=record['TEAM_ID'],
+            player_id=record['PLAYER_ID'],
+            order=order,
+            values=row
+        )
+        for order, (record, row) in enumerate(zip(records['player_stats'], tables['player_stats']['rows']))
+    ])
+
+    return records
+
+
+# Players
+def load_player_bio(player_id: str) -> Optional[Dict]:
+    """Return the stored bio of player <player_id>.
+    """
+    bio = PlayerBio.objects.filter(pk=player_id).first()
+    if bio is None or bio.is_stale():
+        return None
+
+    return bio.data
+
+
+def load_player_bios(player_ids: Iterable[str]) -> Dict[str, Dict]:
+    """Return the stored bios of players <player_ids>, by player ID. Missing
+    and stale bios are left out.
+    """
+    bios = PlayerBio.objects.filter(pk__in=list(player_ids))
+    return {bio.player_id: bio.data for bio in bios if not bio.is_stale()}
+
+
+def save_player_bio(player_id: str, data: Dict) -> Dict:
+    """Store the bio <data> of player <player_id> and return it in its stored
+    form, without NaN values.
+    """
+    data = without_nan(data)
+    PlayerBio.objects.update_or_create(player_id=player_id, defaults={'data': data})
+    return data
+
+
+# Teams
+def load_team_game_log(team_id: str, season: str, season_type: str) -> Optional[List[Dict]]:
+    """Return the stored game log of team <team_id> in given season.
+    """
+    game_log = TeamGameLog.objects.filter(
+        team_id=team_id, season=season, season_type=season_type
+    ).first()
+    if game_log is None or game_log.is_stale():
+        return None
+
+    return from_table(game_log.game_log)
+
+
+def stored_team_game_logs(team_id: str, seasons: List[str],
+                          season_types: List[str]) -> Set[Tuple[str, str]]:
+    """Return the season and season type of every game log of team <team_id>
+    in given seasons that is stored and not stale.
+    """
+    game_logs = TeamGameLog.objects.filter(
+        team_id=team_id, season__in=seasons, season_type__in=season_types
+    ).defer('game_log')
+    return {
+        (game_log.season, game_log.season_type) for game_log in game_logs if not game_log.is_stale()
+    }
+
+
+def save_team_game_log(team_id: str, season: str, season_type: str,
+                       game_log: List[Dict]) -> List[Dict]:
+    """Store the <game_log> of team <team_id> in given season and return it in
+    its stored form, without NaN values.
+    """
+    game_log = [without_nan(record) for record in game_log]
+    TeamGameLog.objects.update_or_create(
+        team_id=team_id,
+        season=season,
+        season_type=season_type,
+        defaults={'game_log': to_table(game_log)}
+    )
+    return game_log
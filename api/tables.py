@@ -0,0 +1,114 @@
+"""API App Tables Module
+
+=== Module Description ===
+This module contains <Table>, the columnar copy of a list dataset (player and
+team lists) kept in the nba_api cache, from which requests build only the
+rows they return.
+
+A request sorts the row indices of the table by the requested columns,
+slices them, and builds the rows of that slice with the requested fields
+only, so a sorted top 25 of the player list never builds (or serializes) the
+hundreds of other rows.
+"""
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional
+
+from .schema import is_null
+from .utils import dataset_version
+
+
+class Table:
+    """Columnar copy of a dataset.
+
+    === Attributes ===
+    columns:
+        the column names, in order.
+    data:
+        the values of each column, by column name.
+    version:
+        the dataset version of the table (see <utils.dataset_version>).
+    """
+    columns: List[str]
+    data: Dict[str, List]
+    version: str
+
+    def __init__(self, columns: List[str], data: Dict[str, List]) -> None:
+        self.columns = columns
+        self.data = data
+        self.version = dataset_version([columns, data])
+
+    @classmethod
+    def from_columns(cls, names: List[str], columns: List[List]) -> 'Table':
+        """Return the table of <columns> named <names>, as returned by
+        <Schema.columns>.
+        """
+        return cls(list(names), dict(zip(names, columns)))
+
+    def __len__(self) -> int:
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    def rows(self, ordering: Sequence = (), fields: Optional[Sequence] = None) -> 'Rows':
+        """Return the rows of the table sorted by <ordering>, with only
+        <fields> (in table order), or every column if None.
+
+        <ordering> is a list of column names, each prefixed with '-' for a
+        descending order. Raise ValueError on unknown columns, or if <fields>
+        is empty.
+        """
+        if fields is not None and not fields:
+            raise ValueError(f'At least one field is required, expected any of {self.columns}.')
+        unknown = [
+            name for name in [key.lstrip('-') for key in ordering] + list(fields or [])
+            if name not in self.data
+        ]
+        if unknown:
+            raise ValueError(f'Unknown fields {unknown}, expected any of {self.columns}.')
+
+        order = list(range(len(self)))
+        # Sort by the last key first, as sorts are stable. Missing values
+        # always go last.
+        for key in reversed(ordering):
+            values = self.data[key.lstrip('-')]
+            present = [i for i in order if not is_null(values[i])]
+            present.sort(key=values.__getitem__, reverse=key.startswith('-'))
+            order = present + [i for i in order if is_null(values[i])]
+
+        if fields is None:
+            columns = self.columns
+        else:
+            columns = [column for column in self.columns if column in fields]
+        return Rows(self, order, columns)
+
+
+class Rows(Sequence):
+    """Sorted and projected rows of a <Table>, built only when accessed.
+
+    === Attributes ===
+    table:
+        the table of the rows.
+    order:
+        the index in <table> of each row, in order.
+    columns:
+        the columns of each row.
+    """
+    table: Table
+    order: List[int]
+    columns: List[str]
+
+    def __init__(self, table: Table, order: List[int], columns: List[str]) -> None:
+        self.table = table
+        self.order = order
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in self.order[index]]
+        return self.row(self.order[index])
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """Return row <i> of the table, with the selected columns only.
+        """
+        return {column: self.table.data[column][i] for column in self.columns}
@@ -0,0 +1,34 @@
+"""API App Templating Module
+
+=== Module Description ===
+This module contains the template backend of the site: the Django template
+backend, with the rendering of every template timed as the template stage of
+the request (see api/timing.py).
+"""
+from django.template.backends.django import DjangoTemplates
+
+from .timing import TEMPLATE, timed
+
+
+class TimedTemplate:
+    """Template whose rendering is timed.
+    """
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed(TEMPLATE):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend timing the rendering of its templates.
+    """
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
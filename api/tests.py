@@ -1,3 +1,1114 @@
-from django.test import TestCase
+"""API App Tests
 
-# Create your tests here.
+=== Module Description ===
+This module contains the tests of the API app. Upstream requests are never
+sent: they are replaced by fake endpoints and patched responses.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+from unittest import mock
+
+import pytz
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from nba_api.stats.endpoints._base import Endpoint
+from nba_api.stats.library.http import NBAStatsResponse
+
+from . import bios, cache, replay, schema, search, services, upstream, warmer
+from .management.commands import backfill
+from .planner import Plan
+from .reference import apply_schema, clean_single_game_data
+from .renderers import NumpyJSONRenderer, stream_json, stream_ndjson
+from .singleflight import SingleFlight
+from .tables import Table
+from .utils import map_concurrently
+from .upstream import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, TokenBucket, UpstreamUnavailable, request_status
+)
+
+
+class FakeEndpoint:
+    """A minimal nba_api endpoint, loaded from a fake raw response.
+    """
+    endpoint = 'fakeendpoint'
+
+    def __init__(self, value, get_request=True, timeout=30):
+        self.parameters = {'Value': value}
+        self.proxy = None
+        self.headers = None
+        self.timeout = timeout
+
+    def load_response(self):
+        self.data = self.nba_response.get_dict()
+
+
+def fake_response(value) -> str:
+    return json.dumps({'value': value})
+
+
+def make_data_set(headers, rows):
+    return Endpoint.DataSet({'headers': headers, 'data': rows})
+
+
+BOX_SCORE_HEADERS = [
+    'GAME_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'TEAM_CITY', 'PLAYER_ID', 'PLAYER_NAME', 'NICKNAME',
+    'START_POSITION', 'COMMENT', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'PTS', 'PLUS_MINUS'
+]
+BOX_SCORE_ROWS = [
+    ['0042000406', 1610612749, 'MIL', 'Milwaukee', 203507, 'Giannis Antetokounmpo', 'Giannis',
+     'F', '', '42:36', 16, 25, 0.64, 50, 13.0],
+    ['0042000406', 1610612749, 'MIL', 'Milwaukee', 201572, 'Brook Lopez', 'Brook',
+     'C', '', '32:10', 4, 6, 0.667, 10, -2.0],
+    ['0042000406', 1610612749, 'MIL', 'Milwaukee', 1629670, 'Jordan Nwora', 'Jordan',
+     '', 'DNP - Coach\'s Decision', None, None, None, None, None, None]
+]
+
+
+def patch_objects(test_case, *patches) -> None:
+    """Replace each (target, attribute, value) of <patches> for the duration
+    of <test_case>.
+    """
+    for target, attribute, value in patches:
+        patcher = mock.patch.object(target, attribute, value)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+
+def make_game_records(status_text: str = 'Final', live_period: int = 4) -> Dict:
+    """Return the box score records of a game between teams '1' (home) and
+    '2', as fetched by <services.fetch_game>.
+    """
+    line_score = {f'PTS_OT{i}': None for i in range(1, 11)}
+    return {
+        'summary': {
+            'GAME_STATUS_TEXT': status_text,
+            'NATL_TV_BROADCASTER_ABBREVIATION': None,
+            'LIVE_PERIOD': live_period,
+            'HOME_TEAM_ID': '1',
+            'VISITOR_TEAM_ID': '2',
+            'GAME_DATE_EST': '2021-07-20T00:00:00'
+        },
+        'line_score': [{'TEAM_ID': '1', **line_score, 'PTS': 105}, {'TEAM_ID': '2', **line_score, 'PTS': 98}],
+        'inactive_players': [],
+        'player_stats': [
+            {'TEAM_ID': '1', 'PLAYER_ID': 10, 'PTS': 50},
+            {'TEAM_ID': '2', 'PLAYER_ID': 20, 'PTS': 30}
+        ],
+        'team_stats': [{'TEAM_ID': '1', 'PTS': 105}, {'TEAM_ID': '2', 'PTS': 98}]
+    }
+
+
+class CacheTestCase(SimpleTestCase):
+    def setUp(self):
+        caches[cache.CACHE_ALIAS].clear()
+        self.addCleanup(caches[cache.CACHE_ALIAS].clear)
+
+
+class SingleFlightTests(CacheTestCase):
+    def test_concurrent_calls_are_coalesced(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flights.do('key', call))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while flights.counters['coalesced'] < 4:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(flights.counters, {'calls': 1, 'coalesced': 4})
+        self.assertFalse(flights.in_flight('key'))
+
+    def test_error_is_raised_to_every_caller(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def call():
+            release.wait(5)
+            raise ValueError('upstream failed')
+
+        errors = []
+
+        def caller():
+            try:
+                flights.do('key', call)
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=caller) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while flights.counters['coalesced'] < 2:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3)
+        self.assertIs(errors[0], errors[1])
+
+    def test_fetch_sends_one_request_for_concurrent_identical_calls(self):
+        release = threading.Event()
+        sent = []
+
+        def send_request(endpoint_cls, value, **kwargs):
+            sent.append(value)
+            release.wait(5)
+            return fake_response(value)
+
+        results = []
+        with mock.patch.object(cache, 'send_request', send_request), \
+                mock.patch.object(cache, 'flights', SingleFlight()) as flights:
+            threads = [
+                threading.Thread(target=lambda: results.append(cache.fetch(FakeEndpoint, 'a').data))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            while flights.counters['coalesced'] < 3:
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(sent, ['a'])
+            self.assertEqual(results, [{'value': 'a'}] * 4)
+            # Cached afterwards
+            self.assertEqual(cache.fetch(FakeEndpoint, 'a').data, {'value': 'a'})
+            self.assertEqual(sent, ['a'])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_failures(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=60)
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow())
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertGreater(breaker.retry_after(), 0)
+        self.assertEqual(breaker.trips, 1)
+
+    def test_half_open_after_cooldown(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=60)
+        with mock.patch('api.upstream.time.monotonic', return_value=1000):
+            breaker.record_failure()
+        with mock.patch('api.upstream.time.monotonic', return_value=1061):
+            self.assertEqual(breaker.retry_after(), 0)
+            # A single trial request goes through
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state, HALF_OPEN)
+            self.assertFalse(breaker.allow())
+
+            breaker.record_failure()
+            self.assertEqual(breaker.state, OPEN)
+            self.assertEqual(breaker.trips, 2)
+
+        with mock.patch('api.upstream.time.monotonic', return_value=1122):
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CLOSED)
+            self.assertTrue(breaker.allow())
+
+
+class UpstreamErrorTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.breaker = CircuitBreaker(threshold=2, cooldown=60)
+        patch_objects(
+            self,
+            (cache, 'breaker', self.breaker),
+            (cache, 'limiter', TokenBucket(rate=100, capacity=100)),
+            (cache, 'flights', SingleFlight())
+        )
+
+    def respond(self, response: str, status_code: int = 200):
+        return mock.patch.object(
+            cache.NBAStatsHTTP, 'send_api_request',
+            return_value=NBAStatsResponse(response=response, status_code=status_code, url=None)
+        )
+
+    def test_error_responses_are_failures_and_not_cached(self):
+        for response, status_code in [('{"message": "Unavailable"}', 503), ('<html>Access Denied</html>', 200)]:
+            with self.subTest(status_code=status_code), self.respond(response, status_code):
+                with self.assertRaises(UpstreamUnavailable):
+                    cache.fetch(FakeEndpoint, 'a')
+
+        key = cache.make_key(FakeEndpoint, ('a',), {})
+        self.assertIsNone(caches[cache.CACHE_ALIAS].get(key))
+        self.assertIsNone(caches[cache.CACHE_ALIAS].get(f'stale:{key}'))
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_stale_response_is_served_on_server_error(self):
+        with self.respond(fake_response('good')):
+            cache.fetch(FakeEndpoint, 'a')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        key = cache.make_key(FakeEndpoint, ('a',), {})
+        caches[cache.CACHE_ALIAS].delete(key)
+        token = request_status.set({'stale': False})
+        self.addCleanup(request_status.reset, token)
+        with self.respond('<html>Internal Server Error</html>', 500):
+            self.assertEqual(cache.fetch(FakeEndpoint, 'a').data, {'value': 'good'})
+
+        self.assertTrue(request_status.get()['stale'])
+        self.assertEqual(self.breaker.failures, 1)
+        self.assertIsNone(caches[cache.CACHE_ALIAS].get(key))
+        self.assertEqual(caches[cache.CACHE_ALIAS].get(f'stale:{key}'), fake_response('good'))
+
+    def test_stale_response_is_served_while_breaker_open(self):
+        with self.respond(fake_response('good')):
+            cache.fetch(FakeEndpoint, 'a')
+        for _ in range(2):
+            self.breaker.record_failure()
+
+        caches[cache.CACHE_ALIAS].delete(cache.make_key(FakeEndpoint, ('a',), {}))
+        with self.respond(fake_response('new')) as send_api_request:
+            self.assertEqual(cache.fetch(FakeEndpoint, 'a').data, {'value': 'good'})
+            with self.assertRaises(UpstreamUnavailable):
+                cache.fetch(FakeEndpoint, 'b')
+
+        send_api_request.assert_not_called()
+
+    @override_settings(NBA_API_TIMEOUT=0)
+    def test_rate_limited_trial_request_is_given_back(self):
+        self.breaker.cooldown = 0
+        for _ in range(2):
+            self.breaker.record_failure()
+
+        empty_limiter = TokenBucket(rate=0.001, capacity=1)
+        empty_limiter.acquire()
+        with mock.patch.object(cache, 'limiter', empty_limiter), self.respond(fake_response('a')):
+            with self.assertRaises(UpstreamUnavailable):
+                cache.fetch(FakeEndpoint, 'a')
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.retry_after(), 0)
+
+        # The next request is the trial, and closes the breaker
+        with self.respond(fake_response('a')):
+            self.assertEqual(cache.fetch(FakeEndpoint, 'a').data, {'value': 'a'})
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsViewTests(TestCase):
+    def get(self, **extra):
+        return self.client.get('/metrics', HTTP_HOST='localhost', **extra)
+
+    def test_anonymous_requests_are_not_found(self):
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+
+    def test_scrapers_with_token_are_allowed(self):
+        response = self.get(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE', response.content)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_configured(self):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+
+    def test_staff_users_are_allowed(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.get().status_code, 200)
+
+
+class ConditionalTests(CacheTestCase):
+    def get(self, path='/api/standings/', **extra):
+        return self.client.get(path, HTTP_HOST='localhost', **extra)
+
+    def test_responses_have_validators(self):
+        with mock.patch.object(services, 'get_standings', return_value=[{'TeamID': 1}]):
+            response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{hashlib.sha1(response.content).hexdigest()}"')
+        self.assertIn('Last-Modified', response)
+
+    def test_conditional_requests_skip_the_service(self):
+        with mock.patch.object(services, 'get_standings', return_value=[{'TeamID': 1}]) as get_standings:
+            response = self.get()
+            not_modified = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+            not_modified_since = self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            modified = self.get(HTTP_IF_NONE_MATCH='"other"')
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified_since.status_code, 304)
+        self.assertEqual(modified.status_code, 200)
+        self.assertEqual(get_standings.call_count, 2)
+
+    def test_expired_validators_are_checked_against_the_payload(self):
+        with mock.patch.object(services, 'get_standings', return_value=[{'TeamID': 1}]) as get_standings:
+            etag = self.get()['ETag']
+            caches[cache.CACHE_ALIAS].clear()
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            get_standings.return_value = [{'TeamID': 2}]
+            caches[cache.CACHE_ALIAS].clear()
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(get_standings.call_count, 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(NBA_API_LIVE_GAME_TIMEOUT=7)
+    def test_game_validators_last_as_long_as_the_game_payload(self):
+        validity = {}
+        for status_text, live_period in [('Final ', 4), ('Q2 1:00', 2)]:
+            game = {'summary': {'GAME_STATUS_TEXT': status_text, 'LIVE_PERIOD': live_period}}
+            with mock.patch.object(services, 'get_game', return_value=game), \
+                    mock.patch.object(caches[cache.CACHE_ALIAS], 'set') as cache_set:
+                self.get(f'/api/games/{live_period}')
+
+            key, _, timeout = cache_set.call_args.args
+            self.assertTrue(key.startswith('etag:'))
+            validity[status_text] = timeout
+
+        self.assertEqual(validity, {'Final ': None, 'Q2 1:00': 7})
+
+
+class IterGamesTests(SimpleTestCase):
+    def setUp(self):
+        self.fetch_started = threading.Event()
+        patch_objects(
+            self,
+            (services.store, 'stored_games', lambda game_ids: {'stored1', 'stored2'}),
+            (services.store, 'save_game', lambda game_id, records: records),
+            (services, 'fetch_game', self.fetch_game),
+            (services, 'get_game', self.get_game)
+        )
+
+    def fetch_game(self, game_id):
+        self.fetch_started.set()
+        if game_id == 'broken_upstream':
+            raise ValueError('upstream failed')
+        return {'game_id': game_id}
+
+    def get_game(self, game_id):
+        if game_id == 'stored2':
+            raise ValueError('incomplete box score')
+        return {'game_id': game_id}
+
+    def test_fetches_start_before_stored_games_are_yielded(self):
+        games = services.iter_games(['stored1', 'missing'])
+        self.assertEqual(next(games), ('stored1', {'game_id': 'stored1'}))
+        self.assertTrue(self.fetch_started.wait(5))
+        self.assertEqual(list(games), [('missing', {'game_id': 'missing'})])
+
+    def test_failed_games_are_skipped(self):
+        game_ids = ['stored1', 'stored2', 'missing', 'broken_upstream']
+        with self.assertLogs('api', 'ERROR'):
+            games = services.get_games(game_ids)
+
+        self.assertEqual(sorted(games['games']), ['missing', 'stored1'])
+        self.assertEqual(games['failed'], ['stored2', 'broken_upstream'])
+
+    def test_incomplete_box_score_raises_value_error(self):
+        with mock.patch.object(services.store, 'load_game', return_value={
+            'summary': {'HOME_TEAM_ID': 1, 'VISITOR_TEAM_ID': 2},
+            'line_score': [{'TEAM_ID': 1}],
+            'team_stats': [{'TEAM_ID': 1}, {'TEAM_ID': 2}],
+            'player_stats': []
+        }):
+            with self.assertRaisesMessage(ValueError, 'No row of team 2'):
+                services.build_game('game')
+
+
+class TableTests(SimpleTestCase):
+    def setUp(self):
+        self.table = Table(['PLAYER', 'PTS', 'AST'], {
+            'PLAYER': ['A', 'B', 'C'],
+            'PTS': [10.0, float('nan'), 30.0],
+            'AST': [5, 7, None]
+        })
+
+    def test_rows_are_sorted_with_missing_values_last(self):
+        rows = self.table.rows(['-PTS'], ['PLAYER', 'PTS'])
+        self.assertEqual([row['PLAYER'] for row in rows], ['C', 'A', 'B'])
+        self.assertEqual(rows[0], {'PLAYER': 'C', 'PTS': 30.0})
+
+    def test_unknown_or_empty_fields_are_rejected(self):
+        for fields in [['REB'], []]:
+            with self.subTest(fields=fields), self.assertRaises(ValueError):
+                self.table.rows(fields=fields)
+
+    def test_empty_fields_parameter_is_a_bad_request(self):
+        with mock.patch.object(services, 'get_player_table', return_value=self.table):
+            for query in ['', ',', ' , ']:
+                with self.subTest(query=query):
+                    response = self.client.get('/api/player_list', {'fields': query}, HTTP_HOST='localhost')
+                    self.assertEqual(response.status_code, 400)
+
+            response = self.client.get('/api/player_list', {'fields': 'PLAYER'}, HTTP_HOST='localhost')
+            self.assertEqual(response.status_code, 200)
+
+
+@override_settings(NBA_API_PREFETCH_BIOS=True, NBA_API_PREFETCH_QUEUE_SIZE=3)
+class PrefetchTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.prefetcher = mock.Mock()
+        patch_objects(
+            self,
+            (bios, '_prefetcher', self.prefetcher),
+            (bios, '_queued', set())
+        )
+
+    def submitted(self):
+        return [call.args[1] for call in self.prefetcher.submit.call_args_list]
+
+    def test_queued_and_cached_players_are_skipped(self):
+        caches[cache.CACHE_ALIAS].set(bios.make_key('3'), {'PERSON_ID': 3})
+        bios.prefetch(['1', '2', '2', '3'])
+        bios.prefetch(['1', '4'])
+        self.assertEqual(self.submitted(), [['1', '2'], ['4']])
+
+    def test_queue_is_capped(self):
+        bios.prefetch(['1', '2'])
+        bios.prefetch(['3', '4', '5'])
+        bios.prefetch(['6'])
+        self.assertEqual(self.submitted(), [['1', '2'], ['3']])
+
+    @override_settings(NBA_API_PREFETCH_BIOS=False)
+    def test_disabled(self):
+        bios.prefetch(['1'])
+        self.prefetcher.submit.assert_not_called()
+
+    def test_prefetches_are_low_priority_and_leave_the_queue(self):
+        bios.prefetch(['1', '2'])
+        priorities = []
+
+        def fetch_bio(player_id):
+            priorities.append(upstream.low_priority.get())
+            return {'PERSON_ID': player_id}
+
+        with mock.patch.object(bios, 'fetch_bio', fetch_bio), \
+                mock.patch.object(bios.store, 'load_player_bios', return_value={}):
+            bios.run_prefetch(['1', '2'])
+
+        self.assertEqual(priorities, [True, True])
+        self.assertFalse(upstream.low_priority.get())
+        self.assertEqual(bios._queued, set())
+        self.assertIsNotNone(caches[cache.CACHE_ALIAS].get(bios.make_key('1')))
+
+    def test_prefetches_close_their_connection(self):
+        with mock.patch.object(bios, 'get_bios', side_effect=ValueError), \
+                mock.patch.object(bios, 'connection') as connection, \
+                self.assertLogs('api', 'ERROR'):
+            bios.run_prefetch(['1'])
+
+        connection.close.assert_called_once_with()
+
+    def test_deferred_prefetches_are_not_errors(self):
+        with mock.patch.object(bios, 'fetch_bio', side_effect=UpstreamUnavailable('deferred')), \
+                mock.patch.object(bios.store, 'load_player_bios', return_value={}), \
+                self.assertLogs('api', 'DEBUG') as logs:
+            bios.run_prefetch(['1', '2'])
+
+        self.assertEqual({record.levelname for record in logs.records}, {'DEBUG'})
+        self.assertIsNone(caches[cache.CACHE_ALIAS].get(bios.make_key('1')))
+
+
+class LowPriorityTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.breaker = CircuitBreaker(threshold=1, cooldown=60)
+        self.limiter = TokenBucket(rate=0.001, capacity=4)
+        patch_objects(
+            self,
+            (upstream, 'breaker', self.breaker),
+            (upstream, 'limiter', self.limiter),
+            (upstream, 'low_priority_limiter', TokenBucket(rate=1000, capacity=1))
+        )
+
+    def test_reserve_of_the_burst_is_left_to_visitors(self):
+        self.assertTrue(upstream.allow_low_priority())
+        self.assertTrue(upstream.allow_low_priority())
+        self.assertFalse(upstream.allow_low_priority())
+        self.assertTrue(self.limiter.acquire())
+
+    def test_not_sent_unless_breaker_closed(self):
+        self.breaker.record_failure()
+        self.assertFalse(upstream.allow_low_priority())
+
+    def test_rejected_before_joining_requests_in_flight(self):
+        self.breaker.record_failure()
+        token = upstream.low_priority.set(True)
+        self.addCleanup(upstream.low_priority.reset, token)
+        with mock.patch.object(cache, 'flights') as flights:
+            with self.assertRaises(UpstreamUnavailable):
+                cache.fetch(FakeEndpoint, 'a')
+        flights.do.assert_not_called()
+
+
+class SchemaTests(SimpleTestCase):
+    def assertMatchesPandas(self, data_schema, data_set):
+        renderer = NumpyJSONRenderer()
+        expected = apply_schema(data_schema, data_set.get_data_frame()).to_dict(orient='records')
+        self.assertEqual(renderer.render(data_schema.records(data_set)), renderer.render(expected))
+
+    def test_records_match_pandas_reference(self):
+        cases = [
+            (schema.BOX_SCORE_PLAYER_STATS, make_data_set(BOX_SCORE_HEADERS, BOX_SCORE_ROWS)),
+            (schema.BOX_SCORE_PLAYER_STATS, make_data_set(BOX_SCORE_HEADERS, BOX_SCORE_ROWS[:2])),
+            (schema.TEAM_ROSTER, make_data_set(
+                ['TeamID', 'SEASON', 'LeagueID', 'PLAYER', 'NICKNAME', 'PLAYER_SLUG', 'AGE', 'PLAYER_ID'],
+                [[1, '2020-21', '00', 'A', 'a', 'a', 26.0, 1], [1, '2020-21', '00', 'B', 'b', 'b', 31.0, 2]]
+            )),
+            (schema.LINE_SCORE, make_data_set(
+                ['GAME_DATE_EST', 'GAME_SEQUENCE', 'GAME_ID', 'TEAM_ID', 'TEAM_CITY_NAME', 'TEAM_NICKNAME',
+                 'PTS_QTR1', 'PTS_OT1', 'PTS'],
+                [['2021-07-20', 1, '1', 1, 'a', 'b', 30, None, 105], ['2021-07-20', 1, '1', 2, 'c', 'd', 25, 0, 98]]
+            )),
+            (schema.PLAYER_LIST, make_data_set(['PLAYER_ID', 'PLAYER'], []))
+        ]
+        for data_schema, data_set in cases:
+            with self.subTest(headers=data_set.get_dict()['headers']):
+                self.assertMatchesPandas(data_schema, data_set)
+
+    def test_players_that_did_not_play_are_zeroed(self):
+        records = schema.BOX_SCORE_PLAYER_STATS.records(make_data_set(BOX_SCORE_HEADERS, BOX_SCORE_ROWS))
+        self.assertEqual(records[2]['MIN'], '00:00')
+        self.assertEqual(records[2]['PTS'], 0)
+        self.assertEqual(records[2]['FG%'], 0.0)
+        self.assertEqual(records[0]['FG%'], 64.0)
+        self.assertIsInstance(records[0]['+/-'], int)
+
+    def test_first_record_keeps_column_types(self):
+        data_set = make_data_set(
+            ['PLAYER_ID', 'LEAGUE_ID', 'Team_ID', 'GP', 'GS', 'MIN', 'PTS', 'FG_PCT'],
+            [[201939, '00', 0, 800, 799, 27380.0, 19211.0, 0.477]]
+        )
+        record = schema.PLAYER_CAREER.first_record(data_set)
+        self.assertEqual(record, schema.PLAYER_CAREER.records(data_set)[0])
+        self.assertEqual(record['GP'], 800)
+        self.assertIsInstance(record['GP'], int)
+        self.assertEqual(record['FG%'], 47.7)
+        self.assertEqual(schema.PLAYER_CAREER.first_record(make_data_set(data_set.get_dict()['headers'], [])), {})
+
+
+class CleanSingleGameDataTests(SimpleTestCase):
+    def frames(self):
+        drop_keys = ['GAME_ID', 'TEAM_CITY', 'TEAM_ABBREVIATION', 'NICKNAME']
+        for rows in [BOX_SCORE_ROWS, BOX_SCORE_ROWS[:2]]:
+            data_set = make_data_set(BOX_SCORE_HEADERS, rows)
+            yield data_set, data_set.get_data_frame().drop(drop_keys, axis=1)
+
+    def test_records_match_original_implementation(self):
+        renderer = NumpyJSONRenderer()
+        for data_set, frame in self.frames():
+            clean_single_game_data(frame)
+            selected, _, _, names = schema.BOX_SCORE_PLAYER_STATS.compile(tuple(data_set.get_dict()['headers']))
+            frame = frame.reindex(columns=selected)
+            frame['FG_PCT'] = (100 * frame['FG_PCT']).round(1)
+            frame['TEAM_ID'] = frame['TEAM_ID'].astype(str)
+            frame.columns = names
+            self.assertEqual(
+                renderer.render(schema.BOX_SCORE_PLAYER_STATS.records(data_set)),
+                renderer.render(frame.to_dict(orient='records'))
+            )
+
+
+def make_player(player_id, first_name, last_name):
+    return {
+        'id': player_id, 'full_name': f'{first_name} {last_name}',
+        'first_name': first_name, 'last_name': last_name
+    }
+
+
+class SearchIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = search.SearchIndex(
+            [
+                make_player(1, 'Louis', 'King'),
+                make_player(2, 'Kevin', 'Durant'),
+                make_player(3, 'Lou', 'Williams'),
+                make_player(4, 'Nikola', 'Jokić'),
+                make_player(5, 'Kevin', 'Love')
+            ],
+            ['full_name', 'first_name', 'last_name']
+        )
+
+    def ids(self, query):
+        return [entry['id'] for entry in self.index.search(query)]
+
+    def test_exact_before_prefix_before_list_order(self):
+        self.assertEqual(self.ids('lou'), [3, 1])
+        self.assertEqual(self.ids('Kevin'), [2, 5])
+        self.assertEqual(self.ids('kevin lo'), [5])
+
+    def test_typo_only_without_prefix_match(self):
+        self.assertEqual(self.ids('durnat'), [2])
+        self.assertEqual(self.ids('lvoe'), [5])
+        # 'kev' is a prefix of both Kevins, so no typo match is tried
+        self.assertEqual(self.ids('kev'), [2, 5])
+
+    def test_accents_and_punctuation_are_ignored(self):
+        self.assertEqual(self.ids('JOKIC'), [4])
+        self.assertEqual(self.ids('  nikola,  jokic! '), [4])
+        self.assertEqual(self.ids('!!'), [])
+
+    def test_team_abbreviation_is_an_exact_match(self):
+        index = search.team_index()
+        self.assertEqual(index.search('LAL')[0]['nickname'], 'Lakers')
+        self.assertEqual(index.search('gsw')[0]['nickname'], 'Warriors')
+        self.assertEqual(index.search('Boston')[0]['abbreviation'], 'BOS')
+
+    @override_settings(NBA_API_PREFETCH_BIOS=False)
+    def test_search_by_id(self):
+        self.assertEqual(services.search('player', '201939')['result'][0]['full_name'], 'Stephen Curry')
+        self.assertEqual(services.search('team', '0')['result'], [])
+
+
+@override_settings(NBA_API_LIVE_GAME_TIMEOUT=5)
+class GameTimeoutTests(SimpleTestCase):
+    def summary(self, status_text, live_period=0, date='2021-07-20T00:00:00'):
+        return {'GAME_STATUS_TEXT': status_text, 'LIVE_PERIOD': live_period, 'GAME_DATE_EST': date}
+
+    def test_final_games_are_cached_forever(self):
+        self.assertIsNone(cache.game_timeout(self.summary('Final', 4)))
+        self.assertIsNone(cache.game_timeout(self.summary('Final       ', 5)))
+
+    def test_live_games_get_the_live_timeout(self):
+        self.assertEqual(cache.game_timeout(self.summary('  Q3 5:21   ', 3)), 5)
+        self.assertEqual(cache.game_timeout(self.summary('Halftime ', 2)), 5)
+
+    def test_scheduled_games_are_cached_until_tip_off(self):
+        tip_off = datetime.now(cache.UPSTREAM_TIMEZONE).replace(second=0, microsecond=0) + timedelta(hours=2)
+        summary = self.summary(
+            tip_off.strftime('%I:%M %p').lstrip('0').lower() + ' ET ', date=tip_off.strftime('%Y-%m-%dT00:00:00')
+        )
+        timeout = cache.game_timeout(summary)
+        self.assertAlmostEqual(timeout, (tip_off - datetime.now(pytz.utc)).total_seconds(), delta=5)
+
+        # Past tip-off, but not live yet
+        self.assertEqual(cache.game_timeout(self.summary('7:30 pm ET')), 5)
+        self.assertEqual(cache.game_timeout(self.summary('PPD', date='not a date')), cache.DEFAULT_TIMEOUT)
+        self.assertEqual(cache.game_timeout(self.summary('PPD')), cache.DEFAULT_TIMEOUT)
+
+    def test_box_score_endpoints_get_the_live_timeout(self):
+        self.assertEqual(cache.get_timeout(services.endpoints.BoxScoreSummaryV2), 5)
+        self.assertEqual(cache.get_timeout(services.endpoints.BoxScoreTraditionalV2), 5)
+
+
+class BuildGameTests(TestCase):
+    def test_only_final_games_are_read_from_the_store(self):
+        services.store.save_game('final', make_game_records('Final'))
+        services.store.save_game('live', make_game_records('Q3 5:21', 3))
+
+        with mock.patch.object(services, 'fetch_game', return_value=make_game_records('Q3 4:02', 3)) as fetch_game:
+            self.assertEqual(services.build_game('final')['summary']['GAME_STATUS_TEXT'], 'Final')
+            fetch_game.assert_not_called()
+
+            self.assertEqual(services.build_game('live')['summary']['GAME_STATUS_TEXT'], 'Q3 4:02')
+            fetch_game.assert_called_once_with('live')
+
+        self.assertEqual(services.store.stored_games(['final', 'live']), {'final'})
+
+
+class StoreTests(TestCase):
+    def test_save_game_replaces_the_box_score_rows(self):
+        store = services.store
+        store.save_game('1', make_game_records('Q4 1:00', 4))
+        records = make_game_records('Final')
+        records['player_stats'] = [{'TEAM_ID': '2', 'PLAYER_ID': 21, 'PTS': 31}]
+        records['line_score'][0]['PTS'] = 107
+        store.save_game('1', records)
+
+        game = store.Game.objects.get(pk='1')
+        self.assertEqual(game.status_text, 'Final')
+        self.assertEqual(game.line_scores.count(), 2)
+        self.assertEqual(game.team_box_scores.count(), 2)
+        self.assertEqual(list(game.player_box_scores.values_list('player_id', flat=True)), ['21'])
+        self.assertEqual(store.load_game('1'), records)
+
+    def test_nan_values_are_stored_as_null(self):
+        store = services.store
+        records = make_game_records()
+        records['player_stats'][0]['FG_PCT'] = float('nan')
+        self.assertIsNone(store.save_game('1', records)['player_stats'][0]['FG_PCT'])
+        self.assertIsNone(store.load_game('1')['player_stats'][0]['FG_PCT'])
+        self.assertEqual(store.save_player_bio('1', {'PERSON_ID': 1, 'DRAFT_YEAR': float('nan')}), {
+            'PERSON_ID': 1, 'DRAFT_YEAR': None
+        })
+
+    def test_games_are_stale_until_final(self):
+        store = services.store
+        store.save_game('final', make_game_records('Final       '))
+        store.save_game('live', make_game_records('Q3 5:21', 3))
+        store.save_game('scheduled', make_game_records('7:30 pm ET', 0))
+
+        self.assertIsNotNone(store.load_game('final'))
+        self.assertIsNone(store.load_game('live'))
+        self.assertIsNone(store.load_game('scheduled'))
+        self.assertIsNone(store.load_game('missing'))
+
+    def test_game_logs_are_final_once_saved_after_the_season(self):
+        store = services.store
+        game_log = [{'GAME_ID': '0042000406', 'WL': 'W'}]
+        store.save_team_game_log('1', '2020-21', 'Playoffs', game_log)
+        saved = store.TeamGameLog.objects.filter(team_id='1')
+
+        # Saved before the Finals, over the max age ago
+        saved.update(updated=pytz.utc.localize(datetime(2021, 7, 10)))
+        self.assertIsNone(store.load_team_game_log('1', '2020-21', 'Playoffs'))
+        self.assertEqual(store.stored_team_game_logs('1', ['2020-21'], ['Playoffs']), set())
+
+        # Saved after the season, however long ago
+        saved.update(updated=pytz.utc.localize(datetime(2021, 11, 2)))
+        self.assertEqual(store.load_team_game_log('1', '2020-21', 'Playoffs'), game_log)
+        self.assertEqual(store.stored_team_game_logs('1', ['2020-21'], ['Playoffs']), {('2020-21', 'Playoffs')})
+
+        # Saved during the season, within the max age
+        store.save_team_game_log('1', '2026-27', 'Regular Season', game_log)
+        self.assertEqual(store.load_team_game_log('1', '2026-27', 'Regular Season'), game_log)
+
+
+class ConcurrencyTests(SimpleTestCase):
+    @staticmethod
+    def square(item):
+        if item % 3 == 0:
+            raise UpstreamUnavailable(f'failed {item}')
+        return item * item
+
+    def test_failed_items_are_logged_and_left_out(self):
+        with self.assertLogs('api', 'ERROR') as logs:
+            results = map_concurrently(self.square, range(1, 8), max_workers=2)
+
+        self.assertEqual(list(results.items()), [(1, 1), (2, 4), (4, 16), (5, 25), (7, 49)])
+        self.assertEqual(len(logs.records), 2)
+
+    def test_calls_run_in_the_context_of_the_caller(self):
+        token = upstream.low_priority.set(True)
+        try:
+            results = map_concurrently(lambda item: upstream.low_priority.get(), ['a', 'b'])
+        finally:
+            upstream.low_priority.reset(token)
+
+        self.assertEqual(results, {'a': True, 'b': True})
+
+
+class BackfillTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, 'checkpoint.json')
+
+        games = mock.Mock()
+        games.league_game_finder_results.get_dict.return_value = {
+            'headers': ['GAME_ID', 'TEAM_ID'],
+            'data': [['0042000406', 1], ['0042000406', 2], ['0012000001', 1], ['0022000123', 2]]
+        }
+        self.saved = []
+
+        def fetch_game(game_id):
+            if game_id == '0012000001':
+                raise UpstreamUnavailable('failed')
+            return {'game': game_id}
+
+        patch_objects(
+            self,
+            (backfill, 'fetch', mock.Mock(return_value=games)),
+            (services, 'fetch_game', fetch_game),
+            (services, 'fetch_team_game_log', lambda *item: list(item)),
+            (backfill.store, 'save_game', lambda *args: self.saved.append(args)),
+            (backfill.store, 'save_team_game_log', lambda *args: self.saved.append(args))
+        )
+
+    def backfill(self):
+        call_command(
+            'backfill', season='2020-21', checkpoint=self.checkpoint, workers=2,
+            stdout=io.StringIO(), stderr=io.StringIO()
+        )
+        with open(self.checkpoint) as file:
+            return json.load(file)
+
+    def test_parse_game_id(self):
+        self.assertEqual(backfill.parse_game_id('0022000123'), ('2020-21', 'Regular'))
+        self.assertEqual(backfill.parse_game_id('0049900001'), ('1999-00', 'Post'))
+        self.assertEqual(backfill.parse_game_id('0014600001'), ('1946-47', None))
+
+    def test_failed_items_are_left_for_the_next_run(self):
+        self.assertEqual(self.backfill(), [
+            'game:0022000123',
+            'game:0042000406',
+            'team:1:2020-21:Post',
+            'team:2:2020-21:Post',
+            'team:2:2020-21:Regular'
+        ])
+        self.assertIn(('0042000406', {'game': '0042000406'}), self.saved)
+        self.assertIn(('2', '2020-21', 'Regular', ['2', '2020-21', 'Regular']), self.saved)
+        self.assertEqual(len(self.saved), 5)
+
+        # Resumed runs only retry the failed game
+        self.saved.clear()
+        self.backfill()
+        self.assertEqual(self.saved, [])
+
+    def test_requires_a_range(self):
+        with self.assertRaises(backfill.CommandError):
+            call_command('backfill', stdout=io.StringIO())
+
+
+class WarmerTests(SimpleTestCase):
+    def game(self, status_text, live_period=0):
+        return {'broadcast': {'GAME_STATUS_TEXT': status_text, 'LIVE_PERIOD': live_period}}
+
+    def test_is_live(self):
+        now = datetime.now(cache.UPSTREAM_TIMEZONE)
+        tip_off = now + timedelta(hours=1)
+        scheduled = self.game(tip_off.strftime('%I:%M %p ET'))
+
+        self.assertFalse(warmer.is_live({}, now.date()))
+        self.assertFalse(warmer.is_live({'1': self.game('Final   ', 4)}, now.date(), 3600 * 24))
+        self.assertTrue(warmer.is_live({'1': self.game('Final', 4), '2': self.game('Q1 8:00', 1)}, now.date()))
+        self.assertFalse(warmer.is_live({'1': scheduled}, tip_off.date(), 1800))
+        self.assertTrue(warmer.is_live({'1': scheduled}, tip_off.date(), 7200))
+
+    def test_failed_jobs_keep_their_cached_value(self):
+        timeouts = []
+
+        def job(result):
+            timeouts.append(cache._refresh_timeout.get())
+            return result
+
+        def failed_job():
+            raise UpstreamUnavailable('failed')
+
+        jobs = [
+            ('score', lambda: job({'1': self.game('Q4 0:30', 4)})),
+            ('standings', failed_job),
+            ('team_list', lambda: job([]))
+        ]
+        with mock.patch.object(warmer, 'get_jobs', return_value=jobs), \
+                self.assertLogs('api', 'ERROR') as logs:
+            self.assertTrue(warmer.warm(120))
+
+        self.assertEqual(timeouts, [120, 120])
+        self.assertIsNone(cache._refresh_timeout.get())
+        self.assertIn('standings', logs.output[0])
+
+    @override_settings(NBA_API_WARM_INTERVAL=300, NBA_API_WARM_LIVE_INTERVAL=30)
+    def test_refreshes_are_faster_while_live(self):
+        stop = mock.Mock()
+        stop.is_set.side_effect = [False, False, False, True]
+        warm = mock.Mock(side_effect=[True, False, True])
+
+        with mock.patch.object(warmer, 'warm', warm):
+            warmer.run(stop)
+
+        # The first refresh uses the live interval
+        self.assertEqual([call.args[0] for call in warm.call_args_list], [60, 60, 600])
+        self.assertEqual([call.args[0] for call in stop.wait.call_args_list], [30, 300, 30])
+
+
+class RendererTests(SimpleTestCase):
+    def setUp(self):
+        self.renderer = NumpyJSONRenderer()
+
+    def render(self, data):
+        return json.loads(self.renderer.render(data))
+
+    def test_nan_is_rendered_as_null(self):
+        self.assertEqual(self.render({'PTS': float('nan'), 'AST': 1.5}), {'PTS': None, 'AST': 1.5})
+        self.assertEqual(self.render([float('inf'), 'Final']), [None, 'Final'])
+
+    def test_numpy_values_are_converted(self):
+        import numpy as np
+
+        data = {'PTS': np.int64(30), 'FG_PCT': np.float64(0.5), 'STARTER': np.bool_(True), 'ROW': np.arange(2)}
+        self.assertEqual(self.render(data), {'PTS': 30, 'FG_PCT': 0.5, 'STARTER': True, 'ROW': [0, 1]})
+        self.assertEqual(self.render({'PTS': np.float64('nan'), 'AST': np.int64(3)}), {'PTS': None, 'AST': 3})
+
+    def test_other_values_fall_back_to_the_drf_encoder(self):
+        self.assertEqual(self.render({'date': datetime(2021, 7, 20).date()}), {'date': '2021-07-20'})
+        with self.assertRaises(TypeError):
+            self.renderer.render({'value': object()})
+
+    def test_streams(self):
+        lines = b''.join(stream_ndjson([{'PTS': float('nan')}, {'PTS': 1}])).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'PTS': None}, {'PTS': 1}])
+
+        streamed = b''.join(stream_json({'count': 2, 'items': iter([{'PTS': float('nan')}, {'PTS': 1}])}))
+        self.assertEqual(json.loads(streamed), {'count': 2, 'items': [{'PTS': None}, {'PTS': 1}]})
+        self.assertEqual(b''.join(stream_json({})), b'{}')
+
+
+class ReplayTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.settings = override_settings(NBA_API_FIXTURES_DIR=self.directory, NBA_API_REPLAY_LATENCY=0)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def send(self, mode, value, response=None):
+        with override_settings(NBA_API_FIXTURES=mode), mock.patch.object(
+            cache.NBAStatsHTTP, 'send_api_request',
+            return_value=NBAStatsResponse(response=response, status_code=200, url=None)
+        ) as send_api_request:
+            return cache.send_request(FakeEndpoint, value), send_api_request
+
+    def test_recorded_responses_are_replayed(self):
+        response, _ = self.send(replay.RECORD, 'a', fake_response('a'))
+        self.assertEqual(response, fake_response('a'))
+
+        response, send_api_request = self.send(replay.REPLAY, 'a')
+        self.assertEqual(response, fake_response('a'))
+        send_api_request.assert_not_called()
+
+        with self.assertRaises(replay.FixtureNotFound):
+            self.send(replay.REPLAY, 'b')
+
+    def test_responses_are_not_recorded_by_default(self):
+        self.send('', 'a', fake_response('a'))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, FakeEndpoint.endpoint)))
+
+    def test_failed_records_keep_the_previous_fixture(self):
+        replay.record('endpoint', {'Value': 'a'}, fake_response('a'))
+        with mock.patch.object(replay.json, 'dump', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                replay.record('endpoint', {'Value': 'a'}, fake_response('b'))
+
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'endpoint')), [
+            os.path.basename(replay.fixture_path('endpoint', {'Value': 'a'}))
+        ])
+        self.assertEqual(replay.replay('endpoint', {'Value': 'a'}), fake_response('a'))
+
+
+class GameLogStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.game_log = [{'GAME_ID': '0022000123', 'WL': 'W'}]
+        self.save = mock.Mock(side_effect=lambda team_id, season, season_type, game_log: game_log)
+        patch_objects(
+            self,
+            (services, 'get_team_info', lambda team_id: {'TEAM_ID': team_id}),
+            (services, 'fetch_team_game_log', lambda team_id, season, season_type: self.game_log),
+            (services.store, 'stored_team_game_logs', lambda *args: {('2019-20', 'Regular')}),
+            (services.store, 'save_team_game_log', self.save)
+        )
+
+    def get(self, stream='1', **params):
+        params = {'start': '2019-20', 'end': '2020-21', 'season_types': 'Regular', 'stream': stream, **params}
+        return self.client.get('/api/teams/1/game_logs', params, HTTP_HOST='localhost')
+
+    def lines(self, response):
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_get_seasons(self):
+        self.assertEqual(services.get_seasons('1999-00', '2001-02'), ['1999-00', '2000-01', '2001-02'])
+        self.assertEqual(services.get_seasons('2020-21', '2020-21'), ['2020-21'])
+        for first_season, last_season in [('2020-22', '2020-22'), ('2020', '2020'), ('2020-21', '2019-20')]:
+            with self.subTest(first_season=first_season), self.assertRaises(ValueError):
+                services.get_seasons(first_season, last_season)
+
+    @override_settings(NBA_API_MAX_SEASONS=2)
+    def test_invalid_requests(self):
+        for params in [{'start': '2019-21'}, {'end': '2021-22'}, {'season_types': 'Regular,All'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+    def test_failed_reads_are_reported_last(self):
+        with mock.patch.object(services, 'get_team_season_game_log', side_effect=UpstreamUnavailable('failed')), \
+                self.assertLogs('api', 'ERROR'):
+            lines = self.lines(self.get())
+
+        self.assertEqual(lines, [
+            {'team_info': {'TEAM_ID': '1'}},
+            {'season': '2020-21', 'season_type': 'Regular', 'game_log': self.game_log},
+            {'failed': [{'season': '2019-20', 'season_type': 'Regular'}]}
+        ])
+
+    def test_failed_saves_are_reported(self):
+        self.save.side_effect = ValueError('database is locked')
+        with mock.patch.object(services, 'get_team_season_game_log', return_value=self.game_log), \
+                self.assertLogs('api', 'ERROR'):
+            lines = self.lines(self.get())
+            document = json.loads(b''.join(self.get(stream='0').streaming_content))
+
+        self.assertEqual(lines[1:], [
+            {'season': '2019-20', 'season_type': 'Regular', 'game_log': self.game_log},
+            {'failed': [{'season': '2020-21', 'season_type': 'Regular'}]}
+        ])
+        self.assertEqual(document, {
+            'team_info': {'TEAM_ID': '1'},
+            'game_logs': [{'season': '2019-20', 'season_type': 'Regular', 'game_log': self.game_log}],
+            'failed': [{'season': '2020-21', 'season_type': 'Regular'}]
+        })
+
+
+class PlanTests(SimpleTestCase):
+    def test_steps_get_the_results_of_their_dependencies(self):
+        plan = Plan()
+        plan.add('summary', lambda: {'HOME_TEAM_ID': 1})
+        plan.add('box_score', lambda: [1, 2])
+        plan.add(
+            'game', lambda summary, box_score: (summary['HOME_TEAM_ID'], len(box_score)), after=['summary', 'box_score']
+        )
+
+        self.assertEqual(plan.run(), {'summary': {'HOME_TEAM_ID': 1}, 'box_score': [1, 2], 'game': (1, 2)})
+
+    def test_independent_steps_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        plan = Plan()
+        plan.add('a', barrier.wait)
+        plan.add('b', barrier.wait)
+        self.assertEqual(set(plan.run(max_workers=2)), {'a', 'b'})
+
+    def test_steps_run_in_the_context_of_the_caller(self):
+        plan = Plan()
+        plan.add('priority', upstream.low_priority.get)
+        token = upstream.low_priority.set(True)
+        try:
+            self.assertEqual(plan.run(), {'priority': True})
+        finally:
+            upstream.low_priority.reset(token)
+
+    def test_failed_steps_stop_the_plan(self):
+        called = []
+        plan = Plan()
+        plan.add('summary', mock.Mock(side_effect=UpstreamUnavailable('failed')))
+        plan.add('game', lambda summary: called.append(summary), after=['summary'])
+
+        with self.assertRaises(UpstreamUnavailable):
+            plan.run()
+        self.assertEqual(called, [])
+
+    def test_invalid_steps(self):
+        plan = Plan()
+        plan.add('a', lambda: 1)
+        with self.assertRaises(ValueError):
+            plan.add('a', lambda: 2)
+        with self.assertRaises(ValueError):
+            plan.add('b', lambda c: c, after=['c'])
+        self.assertEqual(Plan().run(), {})
@@ -0,0 +1,90 @@
+"""API App Timing Module
+
+=== Module Description ===
+This module contains the instrumentation recording where time goes while
+serving a request, split in phases:
+  - upstream: requests sent to stats.nba.com (or replayed from fixtures)
+  - parse: decoding of the raw upstream responses
+  - transform: transforms of the upstream data sets (column schemas,
+    including the cleaning of single game stats)
+  - serialize: JSON rendering of the API payload
+  - template: rendering of the HTML templates of the main app
+
+Phases are timed with <timed> and summed into the <Timings> of the current
+<collect> block, including from the worker threads of map_concurrently.
+Phases that overlap in worker threads can add up to more than the wall time.
+A phase can also be labelled, e.g. upstream calls by endpoint class, in which
+case its time is also summed under '<phase>.<label>'.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# Phases
+UPSTREAM = 'upstream'
+PARSE = 'parse'
+TRANSFORM = 'transform'
+SERIALIZE = 'serialize'
+TEMPLATE = 'template'
+
+
+class Timings:
+    """Time spent in each phase, safe to share between threads.
+
+    === Attributes ===
+    durations:
+        the total time spent in each phase (and labelled phase), in seconds.
+    counts:
+        the number of times each phase (and labelled phase) was entered.
+    """
+    durations: Dict[str, float]
+    counts: Dict[str, int]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self.durations = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, duration: float, label: Optional[str] = None) -> None:
+        """Add <duration> seconds to <phase>, and to its <label> if any.
+        """
+        keys = [phase] if label is None else [phase, f'{phase}.{label}']
+        with self._lock:
+            for key in keys:
+                self.durations[key] = self.durations.get(key, 0) + duration
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+
+_timings: ContextVar[Optional[Timings]] = ContextVar('timings', default=None)
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """Context collecting the time spent in each phase into a new Timings,
+    or into the Timings of the enclosing <collect> block if there is one.
+    """
+    timings = _timings.get() or Timings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def timed(phase: str, label: Optional[str] = None) -> Iterator[None]:
+    """Context timing a phase, if inside a <collect> block.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start, label)
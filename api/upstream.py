@@ -0,0 +1,199 @@
+"""API App Upstream Guard Module
+
+=== Module Description ===
+This module contains the guards put in front of every request sent to
+stats.nba.com by <cache.fetch>:
+  - a token bucket limiting the rate of outgoing requests of the process
+  - a circuit breaker that stops sending requests for a cooldown period after
+    repeated failures
+  - the per-request status recording whether a stale response was served, so
+    it can be flagged to the client (see api/middleware.py)
+  - a lower priority for background requests (e.g. the bio prefetches of
+    api/bios.py): they are limited by their own token bucket, only sent while
+    the breaker is closed, and never take the part of the shared burst
+    reserved for the requests of visitors
+
+When a request cannot be sent, or fails, the last good response is served
+stale if there is one, otherwise <UpstreamUnavailable> is raised.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+# Share of the burst of the shared token bucket that low priority requests
+# cannot take
+LOW_PRIORITY_RESERVE = 0.5
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when stats.nba.com cannot be reached and no stale response is
+    available.
+    """
+    pass
+
+
+class TokenBucket:
+    """Token bucket rate limiter, safe to share between threads.
+
+    === Attributes ===
+    rate:
+        the number of tokens added per second.
+    capacity:
+        the maximum number of tokens, i.e. the largest burst of requests.
+    """
+    rate: float
+    capacity: float
+    _tokens: float
+    _updated: float
+    _lock: threading.Lock
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = 0, reserve: float = 0) -> bool:
+        """Take a token, waiting up to <timeout> seconds for one to be
+        available, and return whether one was taken.
+
+        With a <reserve>, a token is only taken if at least <reserve> tokens
+        are left afterwards.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1 + reserve:
+                    self._tokens -= 1
+                    return True
+
+                wait = (1 + reserve - self._tokens) / self.rate
+
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Circuit breaker, safe to share between threads.
+
+    The breaker opens after <threshold> consecutive failures. Once open, it
+    rejects every request for <cooldown> seconds, then lets a single trial
+    request through (half open): the breaker closes if it succeeds and opens
+    again if it fails.
+
+    === Attributes ===
+    threshold:
+        the number of consecutive failures opening the breaker.
+    cooldown:
+        how long, in seconds, the breaker stays open.
+    state:
+        the breaker state, one of CLOSED, OPEN and HALF_OPEN.
+    failures:
+        the number of consecutive failures.
+    trips:
+        the number of times the breaker opened.
+    """
+    threshold: int
+    cooldown: float
+    state: str
+    failures: int
+    trips: int
+    _opened: float
+    _lock: threading.Lock
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a request can be sent now.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened >= self.cooldown:
+                self.state = HALF_OPEN
+                return True
+
+            return self.state == CLOSED
+
+    def release(self) -> None:
+        """Give back the trial request let through by <allow> while half
+        open, when it could not be sent after all, so that the next request
+        becomes the trial.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+
+    def retry_after(self) -> float:
+        """Return how long, in seconds, until the breaker lets a request
+        through again (0 if it is not open).
+        """
+        with self._lock:
+            if self.state != OPEN:
+                return 0
+            return max(self.cooldown - (time.monotonic() - self._opened), 0)
+
+    def record_success(self) -> None:
+        """Record a successful request.
+        """
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        """Record a failed request.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self._opened = time.monotonic()
+
+
+limiter = TokenBucket(settings.NBA_API_RATE_LIMIT, settings.NBA_API_RATE_BURST)
+breaker = CircuitBreaker(settings.NBA_API_BREAKER_THRESHOLD, settings.NBA_API_BREAKER_COOLDOWN)
+low_priority_limiter = TokenBucket(settings.NBA_API_PREFETCH_RATE, 1)
+
+# Whether the requests sent from the current context are low priority
+low_priority: ContextVar[bool] = ContextVar('low_priority', default=False)
+
+# Status of the request being served, None outside of a request
+request_status: ContextVar[Optional[Dict[str, bool]]] = ContextVar('request_status', default=None)
+
+
+def allow_low_priority() -> bool:
+    """Return whether a low priority request can be sent now, taking a token
+    from both token buckets if so.
+    """
+    return (
+        breaker.state == CLOSED
+        and low_priority_limiter.acquire(timeout=settings.NBA_API_TIMEOUT)
+        and limiter.acquire(reserve=LOW_PRIORITY_RESERVE * limiter.capacity)
+    )
+
+
+def mark_stale() -> None:
+    """Record that the request being served got a stale response.
+    """
+    status = request_status.get()
+    if status is not None:
+        status['stale'] = True
@@ -15,9 +15,12 @@ urlpatterns = [
     path('team_list/', views.team_list_api),
     path('player_list', views.player_list_api),
     path('score/<str:date>', views.game_by_date_api),
+    path('games', views.games_api),
     path('games/<str:game_id>', views.game_by_id_api),
     path('teams/<str:team_id>', views.team_detail_api),
+    path('teams/<str:team_id>/game_logs', views.team_game_logs_api),
     path('teams/<str:team_id>/<str:season>/<str:season_type>', views.team_game_log_api),
     path('players/<str:player_id>', views.player_detail_api),
+    path('players/<str:player_id>/game_logs', views.player_game_logs_api),
     path('players/<str:player_id>/<str:season>/<str:season_type>', views.player_game_log_api)
 ]
@@ -0,0 +1,135 @@
+"""API App Utility Module
+
+=== Module Description ===
+This module contains the JSON encoder, dataset versions, game status and
+concurrency helpers shared by the API services.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Encoder
+def converter(obj):
+    # numpy is imported lazily (with pandas), so there are no numpy values to
+    # convert until it is
+    np = sys.modules.get('numpy')
+    if np is not None:
+        if isinstance(obj, np.integer):
+            return int(obj)
+        elif isinstance(obj, np.floating):
+            return float(obj)
+        elif isinstance(obj, np.bool_):
+            return bool(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+
+    raise TypeError(repr(obj) + " is not JSON serializable")
+
+
+def dataset_version(data: Any) -> str:
+    """Return the version of dataset <data>: a digest of its content, which
+    changes whenever the content does.
+    """
+    serialized = json.dumps(data, default=converter, separators=(',', ':'))
+    return hashlib.md5(serialized.encode('utf-8')).hexdigest()
+
+
+# Game status
+def is_final_status(status_text: Optional[str]) -> bool:
+    """Return whether a game with given <status_text> is over.
+
+    Upstream pads status texts with spaces, e.g. 'Final     '.
+    """
+    return (status_text or '').strip() == 'Final'
+
+
+# Concurrency
+def map_concurrently(func: Callable, items: Iterable,
+                     max_workers: Optional[int] = None) -> Dict[Any, Any]:
+    """Call <func> on every item of <items> in a bounded thread pool and
+    return a dict mapping each item to its result, in the order of <items>.
+
+    Items whose call raised are logged and left out of the result, so one
+    failed upstream request does not fail the whole batch. Each call runs in a
+    copy of the caller's context, so context variables carry over.
+
+    === Attributes ===
+    max_workers:
+        the maximum number of concurrent calls, defaults to the
+        NBA_API_MAX_WORKERS setting.
+    """
+    items = list(items)
+    results = dict(iter_concurrently(func, items, max_workers))
+    return {item: results[item] for item in items if item in results}
+
+
+def iter_concurrently(func: Callable, items: Iterable,
+                      max_workers: Optional[int] = None) -> Iterator[Tuple[Any, Any]]:
+    """Call <func> on every item of <items> in a bounded thread pool and
+    yield each item with its result as soon as it is ready.
+
+    Like <map_concurrently>, items whose call raised are logged and skipped.
+    Items are taken from <items> as calls complete, so at most <max_workers>
+    results are held at once however many items there are. Nothing is called
+    until the iteration starts, and calls not started yet are cancelled if it
+    is stopped early.
+    """
+    results = run_concurrently(func, items, max_workers)
+    next(results)
+    yield from results
+
+
+def start_concurrently(func: Callable, items: Iterable,
+                       max_workers: Optional[int] = None) -> Iterator[Tuple[Any, Any]]:
+    """Like <iter_concurrently>, but the first calls start right away, before
+    the iteration does, so the caller can do other work in the meantime.
+    """
+    results = run_concurrently(func, items, max_workers)
+    next(results)
+    return results
+
+
+def run_concurrently(func: Callable, items: Iterable,
+                     max_workers: Optional[int] = None) -> Iterator[Optional[Tuple[Any, Any]]]:
+    """Generator behind <iter_concurrently> and <start_concurrently>: it
+    yields None once the first calls are submitted, then each item with its
+    result.
+    """
+    items = iter(items)
+    max_workers = max_workers or settings.NBA_API_MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+
+        def submit(count: int) -> None:
+            for item in islice(items, count):
+                futures[executor.submit(contextvars.copy_context().run, func, item)] = item
+
+        try:
+            submit(max_workers)
+            yield None
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                # Keep the pool busy while the results are handled
+                submit(len(done))
+                for future in done:
+                    item = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception:
+                        logger.exception('Failed to load %r', item)
+                        continue
+
+                    yield item, result
+        finally:
+            for future in futures:
+                future.cancel()
@@ -1,132 +1,26 @@
-from datetime import datetime
-from typing import List, Dict
-
-import numpy as np
-import simplejson
-from dateutil import parser
-from nba_api.stats.endpoints.boxscoresummaryv2 import BoxScoreSummaryV2
-from nba_api.stats.endpoints.boxscoretraditionalv2 import BoxScoreTraditionalV2
-from nba_api.stats.endpoints.commonplayerinfo import CommonPlayerInfo
-from nba_api.stats.endpoints.commonteamroster import CommonTeamRoster
-from nba_api.stats.endpoints.leaguedashteamstats import LeagueDashTeamStats
-from nba_api.stats.endpoints.leaguegamefinder import LeagueGameFinder
-from nba_api.stats.endpoints.leagueleaders import LeagueLeaders
-from nba_api.stats.endpoints.leaguestandings import LeagueStandings
-from nba_api.stats.endpoints.playercareerstats import PlayerCareerStats
-from nba_api.stats.endpoints.playergamelog import PlayerGameLog
-from nba_api.stats.endpoints.teamgamelog import TeamGameLog
-from nba_api.stats.endpoints.teaminfocommon import TeamInfoCommon
-from nba_api.stats.endpoints.teamplayerdashboard import TeamPlayerDashboard
-from nba_api.stats.static.players import *
-from nba_api.stats.static.teams import *
-from pandas import DataFrame
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-
-# Constants
-PLAYER_PHOTO_LINK = "https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{player_id}.png"
-SEASON_TYPES = {
-    'Regular': 'Regular Season',
-    'Post': 'Playoffs'
-}
-
-
-# Encoder
-def converter(obj):
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-
-    raise TypeError(repr(obj) + " is not JSON serializable")
+"""API App Views Module
 
+=== Module Description ===
+This module contains the DRF views of the API app. Payloads are built by the
+functions in <api.services>.
+"""
+import hmac
 
-# Util functions
-def update_fields(df: DataFrame, single_game: bool = False) -> DataFrame:
-    """Convert pct fields from 0.xxx to xx.x format and update certain keys
-    names to display names.
-    """
-    # Update percentage fields
-    keys = [
-        'FG_PCT', 'FG3_PCT', 'FT_PCT', 'WIN_PCT', 'WinPCT', 'W_PCT', 'PCT'
-    ]
-    result = df.copy()
-    for key in keys:
-        if key in df.keys():
-            try:
-                if result[key][0] is not None:
-                    result[key] = round(100 * result[key], 1)
-            except (IndexError, ValueError):
-                result[key] = round(100 * result[key], 1)
-
-    # Change team id type to string
-    team_id_keys = ['TEAM_ID', 'TeamID']
-    for key in team_id_keys:
-        if key in df.keys():
-            result[key] = result[key].astype(str)
-
-    # Update single game stat fields if enabled
-    if single_game:
-        clean_single_game_data(result)
-
-    # Rename fields for display purpose
-    mapping = {
-        'PLUS_MINUS': '+/-',
-        'FG_PCT': 'FG%',
-        'FG3_PCT': 'FG3%',
-        'FT_PCT': 'FT%',
-        'WIN_PCT': 'WIN%',
-        'W_PCT': 'WIN%',
-        'START_POSITION': 'P'
-    }
-    for key, value in mapping.items():
-        if key in df.keys():
-            result.rename({key: value}, axis=1, inplace=True)
-
-    return result
-
-
-def clean_single_game_data(df: DataFrame) -> None:
-    float_fields = ['FG_PCT', 'FG3_PCT', 'FT_PCT']
-    ignore_fields = [
-        'TEAM_ID', 'PLAYER_ID', 'PLAYER_NAME', 'START_POSITION', 'COMMENT',
-        'TEAM_NAME', 'TEAM_CITY'
-    ]
-    time_fields = ['MIN']
-    for index, row in df.iterrows():
-        if row['MIN'] is None:
-            for key, value in row.items():
-                if key in float_fields:
-                    row[key] = 0.0
-                elif key in time_fields:
-                    row[key] = '00:00'
-                elif key not in ignore_fields:
-                    row[key] = 0
-
-        df.iloc[index] = row
-
-    for col_type, key in zip(df.dtypes, df.keys()):
-        if key not in ignore_fields and key not in float_fields and \
-                key not in time_fields:
-            df[key] = df[key].astype(int)
-
-
-def remove_duplicate(lst: List[Dict]) -> List[Dict]:
-    """Returns a list free of duplicates of given list
-    """
-    seen_ids = []
-    result = []
-    for item in lst:
-        if item['id'] not in seen_ids:
-            result.append(item)
-            seen_ids.append(item['id'])
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
 
-    return result
+from . import metrics, services
+from .cache import game_timeout
+from .conditional import conditional
+from .renderers import stream_json, stream_ndjson
+from .tables import Table
 
 
-# API views
+@conditional()
 @api_view(['GET'])
 def standings_api(request):
     """
@@ -142,16 +36,10 @@ def standings_api(request):
         road_record, last_ten, conference_record, curr_streak, conference, rank,
         points_pg, opp_points_pg, diff_points_pg
     """
-    keys = [
-        'TeamID', 'TeamCity', 'TeamName', 'WinPCT', 'WINS', 'LOSSES', 'HOME',
-        'ROAD', 'L10', 'ConferenceRecord', 'CurrentStreak', 'Conference',
-        'PlayoffRank', 'PointsPG', 'OppPointsPG', 'DiffPointsPG'
-    ]
-    standings = update_fields(LeagueStandings().standings.get_data_frame()[keys])
-
-    return Response(standings.to_dict(orient='records'))
+    return Response(services.get_standings())
 
 
+@conditional()
 @api_view(['GET'])
 def team_list_api(request):
     """
@@ -161,17 +49,13 @@ def team_list_api(request):
         TEAM_ID, TEAM_NAME, GP, W, L, W_PCT, FGM, FGA, FG_PCT, FG3M, FG3A,
         FG3_PCT, FTM, FTA, FT_PCT, OREB, DREB, REB, AST, TOV, STL, BLK, BLKA,
         PF, PFD, PTS, PLUS_MINUS
+
+    See <list_response> for the attributes.
     """
-    keys = [
-        'TEAM_ID', 'TEAM_NAME', 'GP', 'W', 'L', 'W_PCT', 'FGM', 'FGA', 'FG_PCT',
-        'FG3M', 'FG3A', 'FG3_PCT', 'FTM', 'FTA', 'FT_PCT', 'OREB', 'DREB',
-        'REB', 'AST', 'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD', 'PTS',
-        'PLUS_MINUS'
-    ]
-    data = update_fields(LeagueDashTeamStats(per_mode_detailed='PerGame').league_dash_team_stats.get_data_frame()[keys])
-    return Response(data.to_dict(orient='records'))
+    return list_response(request, services.get_team_table())
 
 
+@conditional()
 @api_view(['GET'])
 def team_detail_api(request, team_id):
     """
@@ -188,49 +72,10 @@ def team_detail_api(request, team_id):
         TEAM_ID, "TEAM_CITY", TEAM_NAME, TEAM_ABBREVIATION, TEAM_CONFERENCE,
         TEAM_DIVISION, W, L, PCT, CONF_RANK, DIV_RANK, MIN_YEAR, MAX_YEAR
     """
-    players_drop_keys = [
-        'TeamID', 'SEASON', 'LeagueID', 'NICKNAME', 'PLAYER_SLUG'
-    ]
-    coaches_drop_keys = [
-        'TEAM_ID', 'SEASON', 'COACH_ID', 'SORT_SEQUENCE', 'SUB_SORT_SEQUENCE',
-        'IS_ASSISTANT', 'FIRST_NAME', 'LAST_NAME'
-    ]
-    roster_data = CommonTeamRoster(team_id)
-    players = roster_data.common_team_roster.get_data_frame().drop(players_drop_keys, axis=1)
-    players['AGE'] = players['AGE'].astype(int)
-    coaches = roster_data.coaches.get_data_frame().drop(coaches_drop_keys, axis=1)
-
-    team_info_drop_keys = [
-        'SEASON_YEAR', 'TEAM_CODE', 'TEAM_SLUG'
-    ]
-    team_info = TeamInfoCommon(team_id).team_info_common.get_data_frame().drop(team_info_drop_keys, axis=1)
-    team_info = update_fields(team_info)
-
-    team_stats_keys = [
-        "GP", "FGM", "FGA", "FG_PCT", "FG3M", "FG3A", "FG3_PCT", "FTM", "FTA",
-        "FT_PCT", "OREB", "DREB", "REB", "AST", "TOV", "STL", "BLK", "BLKA",
-        "PF", "PFD", "PTS", "PLUS_MINUS"
-    ]
-    player_stats_keys = [
-        "PLAYER_ID", "PLAYER_NAME", "GP", "W", "L", "MIN", "FGM", "FGA",
-        "FG_PCT", "FG3M", "FG3A", "FG3_PCT", "FTM", "FTA", "FT_PCT", "OREB",
-        "DREB", "REB", "AST", "TOV", "STL", "BLK", "BLKA", "PF", "PFD", "PTS",
-        "PLUS_MINUS", "DD2", "TD3"
-    ]
-    team_stats, player_stats = TeamPlayerDashboard(team_id, per_mode_detailed='PerGame').get_data_frames()
-    team_stats = update_fields(team_stats[team_stats_keys])
-    player_stats = update_fields(player_stats[player_stats_keys])
-
-    result = {
-        'players': players.to_dict(orient='records'),
-        'coaches': coaches.to_dict(orient='records'),
-        'team_info': team_info.to_dict(orient='records')[0],
-        'team_stats': team_stats.to_dict(orient='records')[0],
-        'player_stats': player_stats.to_dict(orient='records')
-    }
-    return Response(result)
+    return Response(services.get_team_detail(team_id))
 
 
+@conditional()
 @api_view(['GET'])
 def game_by_date_api(request, date):
     """
@@ -243,186 +88,57 @@ def game_by_date_api(request, date):
 
     Date format: 2021-06-24 (%Y-%m-%d)
     """
-    line_score_drop_keys = [
-        'GAME_DATE_EST', 'GAME_SEQUENCE', 'TEAM_CITY_NAME', 'TEAM_NICKNAME',
-        'GAME_ID'
-    ]
-    broadcast_keys = [
-        'GAME_STATUS_TEXT', 'NATL_TV_BROADCASTER_ABBREVIATION', 'LIVE_PERIOD'
-    ]
-
-    parsed_date = parser.parse(date).strftime('%m/%d/%Y')
-    data = LeagueGameFinder(
-        league_id_nullable='00',
-        date_to_nullable=parsed_date,
-        date_from_nullable=parsed_date
-    )
-
-    games = data.league_game_finder_results.get_data_frame()
-    games_summary = {}
-    for game_id in set(games['GAME_ID']):
-        box_score = BoxScoreSummaryV2(game_id)
-        line_score = box_score.line_score.get_data_frame().drop(line_score_drop_keys, axis=1)
-        line_score['TEAM_ID'] = line_score['TEAM_ID'].astype(str)
-        broadcast = box_score.game_summary.get_data_frame()[broadcast_keys]
-        games_summary[game_id] = {
-            'line_score': line_score.to_dict(orient='records'),
-            'broadcast': broadcast.iloc[0].to_dict()
-        }
-
-    return Response(games_summary)
+    return Response(services.get_games_by_date(date))
 
 
+@conditional(timeout=lambda data: game_timeout(data['summary']))
 @api_view(['GET'])
 def game_by_id_api(request, game_id):
     """
     Endpoint class: BoxScoreTraditionalV2(), BoxScoreSummaryV2()
     """
-    # Get box score summary
-    line_score_drop_keys = [
-        'GAME_DATE_EST', 'GAME_SEQUENCE', 'TEAM_CITY_NAME', 'TEAM_NICKNAME',
-        'GAME_ID'
-    ]
-    summary_keys = [
-        'GAME_STATUS_TEXT', 'NATL_TV_BROADCASTER_ABBREVIATION', 'LIVE_PERIOD',
-        'HOME_TEAM_ID', 'VISITOR_TEAM_ID', 'GAME_DATE_EST'
-    ]
-    inactive_drop_keys = [
-        'TEAM_CITY', 'TEAM_NAME'
-    ]
-    box_score = BoxScoreSummaryV2(game_id)
-    summary = box_score.game_summary.get_data_frame()[summary_keys].iloc[0]
-    summary['HOME_TEAM_ID'] = summary['HOME_TEAM_ID'].astype(str)
-    summary['VISITOR_TEAM_ID'] = summary['VISITOR_TEAM_ID'].astype(str)
-
-    line_score = update_fields(box_score.line_score.get_data_frame().drop(line_score_drop_keys, axis=1))
-    inactive_players = update_fields(box_score.inactive_players.get_data_frame().drop(inactive_drop_keys, axis=1))
-
-    # Get traditional box score data
-    player_stats_drop_keys = [
-        'GAME_ID', 'TEAM_CITY', 'TEAM_ABBREVIATION', 'NICKNAME'
-    ]
-    team_stats_drop_keys = [
-        'GAME_ID', 'TEAM_ABBREVIATION'
-    ]
-    box_score_trad = BoxScoreTraditionalV2(game_id)
-    player_stats = update_fields(
-        box_score_trad.player_stats.get_data_frame().drop(player_stats_drop_keys, axis=1),
-        single_game=True
-    )
-    team_stats = update_fields(
-        box_score_trad.team_stats.get_data_frame().drop(team_stats_drop_keys, axis=1),
-        single_game=True
-    )
-
-    # Split data to two teams
-    overtime_keys = [
-        f'PTS_OT{i}' for i in range(1, 11)
-    ]
-    home_team_id = summary['HOME_TEAM_ID']
-    home_line_score = line_score[line_score['TEAM_ID'] == home_team_id].iloc[0]
-    home_team_data = {
-        'player_stats': [],
-        'line_score': home_line_score.drop(overtime_keys).to_dict(),
-        'team_stats': team_stats[team_stats['TEAM_ID'] == home_team_id].iloc[0].to_dict()
-    }
-
-    away_team_id = summary['VISITOR_TEAM_ID']
-    away_line_score = line_score[line_score['TEAM_ID'] == away_team_id].iloc[0]
-    away_team_data = {
-        'player_stats': [],
-        'line_score': away_line_score.drop(overtime_keys).to_dict(),
-        'team_stats': team_stats[team_stats['TEAM_ID'] == away_team_id].iloc[0].to_dict()
-    }
-
-    for _, row in player_stats.iterrows():
-        if row.get('TEAM_ID') == home_team_id:
-            home_team_data['player_stats'].append(row.to_dict())
-        elif row.get('TEAM_ID') == away_team_id:
-            away_team_data['player_stats'].append(row.to_dict())
-
-    overtime = {
-        i: {
-            'flag': False if i > summary['LIVE_PERIOD'] - 4 else True,
-            'home': home_line_score[overtime_keys].iloc[i - 1],
-            'away': away_line_score[overtime_keys].iloc[i - 1]
-        }
-        for i in range(1, 11)
-    }
-
-    # Return JSON response
-    result = {
-        'summary': summary.to_dict(),
-        'inactive_players': inactive_players.to_dict(orient='records'),
-        'overtime': overtime,
-        'home_team': home_team_data,
-        'away_team': away_team_data
-    }
-    date = parser.parse(result['summary']['GAME_DATE_EST'])
-    result['summary']['GAME_DATE_EST'] = date.strftime('%B %d, %Y')
-
-    home_pts = line_score[line_score['TEAM_ID'] == home_team_id].iloc[0]['PTS']
-    away_pts = line_score[line_score['TEAM_ID'] == away_team_id].iloc[0]['PTS']
-    result['summary']['HOME_WON'] = bool(home_pts > away_pts)
-
-    serialized = simplejson.dumps(result, ignore_nan=True, default=converter)
-    return Response(simplejson.loads(serialized))
+    return Response(services.get_game(game_id))
 
 
+@conditional()
+@api_view(['GET'])
+def games_api(request):
+    """
+    Endpoint class: BoxScoreTraditionalV2(), BoxScoreSummaryV2()
+
+    ids attribute: comma separated game IDs (e.g. 0042000406,0042000405)
+    stream attribute: if 1, stream each game as a line of NDJSON
+        ({"game_id": ..., "game": ...}) as soon as it is ready, in no
+        particular order, instead of returning them all at once
+    """
+    game_ids = list(dict.fromkeys(
+        game_id.strip() for game_id in request.query_params.get('ids', '').split(',') if game_id.strip()
+    ))
+    if not game_ids:
+        return Response({'detail': 'The ids parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(game_ids) > settings.NBA_API_MAX_BATCH_SIZE:
+        return Response(
+            {'detail': f'At most {settings.NBA_API_MAX_BATCH_SIZE} games can be requested at once.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if request.query_params.get('stream') == '1':
+        games = ({'game_id': game_id, 'game': game} for game_id, game in services.iter_games(game_ids))
+        return StreamingHttpResponse(stream_ndjson(games), content_type='application/x-ndjson')
+
+    return Response(services.get_games(game_ids))
+
+
+@conditional()
 @api_view(['GET'])
 def player_detail_api(request, player_id):
     """
     Endpoint class: CommonPlayerInfo(), PlayerCareerStats()
     """
-    player_info_keys = [
-        'DISPLAY_FIRST_LAST', 'BIRTHDATE', 'SCHOOL', 'COUNTRY', 'HEIGHT',
-        'WEIGHT', 'SEASON_EXP', 'JERSEY', 'POSITION', 'TEAM_NAME', 'TEAM_CITY',
-        'FROM_YEAR', 'TEAM_ID', 'DRAFT_ROUND', 'DRAFT_NUMBER', 'PERSON_ID'
-    ]
-    player_info = CommonPlayerInfo(player_id).common_player_info.get_data_frame().iloc[0][player_info_keys]
-    player_info['BIRTHDATE'] = parser.parse(player_info['BIRTHDATE']).strftime('%Y-%m-%d')
-    player_info['PHOTO_URL'] = PLAYER_PHOTO_LINK.format(player_id=player_id)
-    player_info['AGE'] = datetime.today().year - parser.parse(player_info['BIRTHDATE']).year
-    player_info = update_fields(player_info)
-
-    career_drop_keys = [
-        'PLAYER_ID', 'LEAGUE_ID', 'Team_ID'
-    ]
-    season_drop_keys = [
-        'PLAYER_ID', 'LEAGUE_ID', 'PLAYER_AGE'
-    ]
-    career_stats = PlayerCareerStats(player_id, per_mode36='PerGame')
-    career_regular_season = career_stats.career_totals_regular_season.get_data_frame()
-    if not career_regular_season.empty:
-        career_regular_season = career_regular_season.iloc[0].drop(career_drop_keys)
-        career_regular_season = update_fields(career_regular_season)
-    career_post_season = career_stats.career_totals_post_season.get_data_frame()
-    if not career_post_season.empty:
-        career_post_season = career_post_season.iloc[0].drop(career_drop_keys)
-        career_post_season = update_fields(career_post_season)
-    regular_season = career_stats.season_totals_regular_season.get_data_frame().drop(season_drop_keys, axis=1)
-    regular_season = update_fields(regular_season)
-    post_season = career_stats.season_totals_post_season.get_data_frame().drop(season_drop_keys, axis=1)
-    post_season = update_fields(post_season)
-
-    result = {
-        'player_info': player_info.to_dict(),
-        'stats': {
-            'regular_season': {
-                'display_name': "Regular",
-                'season': regular_season.iloc[::-1].to_dict(orient='records'),
-                'career': career_regular_season.to_dict()
-            },
-            'post_season': {
-                'display_name': "Post",
-                'season': post_season.iloc[::-1].to_dict(orient='records'),
-                'career': career_post_season.to_dict()
-            }
-        }
-    }
-    return Response(result)
+    return Response(services.get_player_detail(player_id))
 
 
+@conditional()
 @api_view(['GET'])
 def player_game_log_api(request, player_id, season, season_type):
     """
@@ -431,72 +147,131 @@ def player_game_log_api(request, player_id, season, season_type):
     season attribute examples: 2020-21, 2019-20
     season_type attribute: ['Regular', 'Post']
     """
-    player_info_keys = [
-        'DISPLAY_FIRST_LAST', 'BIRTHDATE', 'SCHOOL', 'COUNTRY', 'HEIGHT',
-        'WEIGHT', 'SEASON_EXP', 'JERSEY', 'POSITION', 'TEAM_NAME', 'TEAM_CITY',
-        'FROM_YEAR', 'TEAM_ID', 'DRAFT_ROUND', 'DRAFT_NUMBER', 'PERSON_ID'
-    ]
-    player_info = CommonPlayerInfo(player_id).common_player_info.get_data_frame().iloc[0][player_info_keys]
-    player_info['BIRTHDATE'] = parser.parse(player_info['BIRTHDATE']).strftime('%Y-%m-%d')
-    player_info['PHOTO_URL'] = PLAYER_PHOTO_LINK.format(player_id=player_id)
-    player_info['AGE'] = datetime.today().year - parser.parse(player_info['BIRTHDATE']).year
-    player_info = update_fields(player_info)
-
-    game_log_drop_keys = [
-        'SEASON_ID', 'Player_ID', 'VIDEO_AVAILABLE'
-    ]
-    data = PlayerGameLog(
-        player_id=player_id,
-        season=season,
-        season_type_all_star=SEASON_TYPES[season_type]
-    )
-    game_log = update_fields(data.player_game_log.get_data_frame().drop(game_log_drop_keys, axis=1))
-
-    return Response({
-        'player_info': player_info.to_dict(),
-        'season_type': season_type,
-        'game_log': game_log.to_dict(orient='records')
-    })
+    return Response(services.get_player_game_log(player_id, season, season_type))
 
 
+@conditional()
 @api_view(['GET'])
 def team_game_log_api(request, team_id, season, season_type):
     """
     Endpoint classes: TeamGameLog()
     """
-    team_info_drop_keys = [
-        'SEASON_YEAR', 'TEAM_CODE', 'TEAM_SLUG'
-    ]
-    team_info = TeamInfoCommon(team_id).team_info_common.get_data_frame().drop(team_info_drop_keys, axis=1)
-    team_info = update_fields(team_info)
-
-    game_log_drop_keys = [
-        'Team_ID'
-    ]
-    data = TeamGameLog(
-        team_id=team_id,
-        season=season,
-        season_type_all_star=SEASON_TYPES[season_type]
-    )
-    game_log = update_fields(data.team_game_log.get_data_frame().drop(game_log_drop_keys, axis=1))
-
-    return Response({
-        'team_info': team_info.to_dict(orient='records')[0],
-        'season': season,
-        'season_type': season_type,
-        'game_log': game_log.to_dict(orient='records')
-    })
+    return Response(services.get_team_game_log(team_id, season, season_type))
 
 
+@api_view(['GET'])
+def player_game_logs_api(request, player_id):
+    """
+    Endpoint classes: CommonPlayerInfo(), PlayerGameLog()
+
+    See <stream_game_logs> for the attributes and the response format.
+    """
+    return stream_game_logs(request, lambda seasons, season_types: services.get_player_game_logs(
+        player_id, seasons, season_types
+    ))
+
+
+@api_view(['GET'])
+def team_game_logs_api(request, team_id):
+    """
+    Endpoint classes: TeamInfoCommon(), TeamGameLog()
+
+    See <stream_game_logs> for the attributes and the response format.
+    """
+    return stream_game_logs(request, lambda seasons, season_types: services.get_team_game_logs(
+        team_id, seasons, season_types
+    ))
+
+
+def stream_game_logs(request, get_game_logs):
+    """Return the game logs returned by <get_game_logs>(seasons, season_types)
+    for the seasons requested, streamed as they are fetched.
+
+    start attribute: first season (e.g. 2015-16)
+    end attribute: last season, defaults to the first one
+    season_types attribute: comma separated season types, defaults to
+        Regular,Post
+    stream attribute: if 1, stream NDJSON: a line with the player or team
+        info, then a line per season and season type as soon as it is ready
+        ({"season": ..., "season_type": ..., "game_log": [...]}), and a last
+        line with the seasons that failed to load ({"failed": [...]}).
+        Otherwise stream a single JSON document with the info, the same game
+        logs under 'game_logs' and the failed seasons under 'failed'.
+    """
+    params = request.query_params
+    season_types = list(dict.fromkeys(
+        season_type.strip() for season_type in params.get('season_types', 'Regular,Post').split(',')
+    ))
+    try:
+        seasons = services.get_seasons(params.get('start', ''), params.get('end', params.get('start', '')))
+    except ValueError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    if len(seasons) > settings.NBA_API_MAX_SEASONS:
+        return Response(
+            {'detail': f'At most {settings.NBA_API_MAX_SEASONS} seasons can be requested at once.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    invalid = [season_type for season_type in season_types if season_type not in services.SEASON_TYPES]
+    if invalid:
+        return Response(
+            {'detail': f"Invalid season types {invalid}, expected {list(services.SEASON_TYPES)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    data = get_game_logs(seasons, season_types)
+    if params.get('stream') == '1':
+        def lines():
+            yield {key: value for key, value in data.items() if key not in ['game_logs', 'failed']}
+            yield from data['game_logs']
+            # The failed seasons are only known once every game log was loaded
+            yield {'failed': list(data['failed'])}
+
+        return StreamingHttpResponse(stream_ndjson(lines()), content_type='application/x-ndjson')
+
+    return StreamingHttpResponse(stream_json(data), content_type='application/json')
+
+
+@conditional()
 @api_view(['GET'])
 def player_list_api(request):
     """
     Endpoint classes: LeagueLeaders()
+
+    See <list_response> for the attributes.
     """
-    data = update_fields(LeagueLeaders(per_mode48='PerGame').league_leaders.get_data_frame())
-    return Response(data.to_dict(orient='records'))
+    return list_response(request, services.get_player_table())
 
 
+def list_response(request, table: Table) -> Response:
+    """Return the rows of <table>, sorted, projected and paginated as
+    requested.
+
+    ordering attribute: comma separated fields to sort by, each prefixed with
+        '-' for a descending order (e.g. -PTS,PLAYER)
+    fields attribute: comma separated fields of each row (e.g.
+        PLAYER_ID,PLAYER,PTS), defaults to every field
+    limit / offset attributes: return only <limit> rows from <offset>, with
+        the total count and next / previous links (e.g. limit=25)
+    """
+    params = request.query_params
+    ordering = [key.strip() for key in params.get('ordering', '').split(',') if key.strip()]
+    fields = params.get('fields')
+    if fields is not None:
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+
+    try:
+        rows = table.rows(ordering, fields)
+    except ValueError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = LimitOffsetPagination()
+    page = paginator.paginate_queryset(rows, request)
+    if page is None:
+        return Response(rows[:])
+    return paginator.get_paginated_response(page)
+
+
+@conditional()
 @api_view(['GET'])
 def search_api(request, search_type: str, name: str):
     """
@@ -513,35 +288,25 @@ def search_api(request, search_type: str, name: str):
             - Team State (e.g. "Ohio")
             - Team ID (e.g. 1610612737)
     """
-    if search_type == 'player':
-        if name.isnumeric():
-            player = find_player_by_id(int(name))
-            return Response({'result': [player], 'type': search_type})
-
-        split_name = name.split(" ", 1)
-        result = []
-        if len(split_name) == 1:
-            result.extend(find_players_by_first_name(split_name[0]))
-            result.extend(find_players_by_last_name(split_name[0]))
-        else:
-            result.extend(find_players_by_full_name(name))
-
-        return Response({'result': remove_duplicate(result), 'type': search_type})
-    else:
-        if name.isnumeric():
-            team = find_team_name_by_id(int(name))
-            return Response({'result': [team], 'type': search_type})
-
-        split_name = name.split(" ", 1)
-        result = []
-        if len(split_name) == 1:
-            result.extend(find_teams_by_city(split_name[0]))
-            result.extend(find_teams_by_state(split_name[0]))
-            result.extend(find_teams_by_nickname(split_name[0]))
-            by_abb = find_team_by_abbreviation(split_name[0])
-            if by_abb is not None:
-                result.append(by_abb)
-        else:
-            result.extend(find_teams_by_full_name(name))
-
-        return Response({'result': remove_duplicate(result), 'type': search_type})
+    return Response(services.search(search_type, name))
+
+
+def can_read_metrics(request) -> bool:
+    """Return whether <request> may read the metrics of the process.
+    """
+    if request.user.is_staff:
+        return True
+
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+
+
+def metrics_view(request):
+    """
+    Metrics of the process in Prometheus text format, for staff users and
+    scrapers sending the METRICS_TOKEN setting as bearer token only
+    """
+    if not can_read_metrics(request):
+        raise Http404
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,104 @@
+"""API App Cache Warmer Module
+
+=== Module Description ===
+This module contains the cache warmer that refreshes the datasets behind the
+hot pages (today's scores, standings, team list and player list) before they
+expire, so visitors never wait on stats.nba.com for them.
+
+The warmer refreshes every NBA_API_WARM_INTERVAL seconds, or every
+NBA_API_WARM_LIVE_INTERVAL seconds while a game of today is live or tips off
+before the next idle refresh. Refreshed responses are cached for at least
+twice the current interval, so they never expire between two refreshes. The
+first refresh uses the live interval, as the scoreboard is not known yet.
+
+It runs either in a background thread of each web worker (NBA_API_WARMER
+setting, started by gunicorn.conf.py, or by api/apps.py under runserver) or
+in the foreground with `manage.py warm_cache`.
+The latter only helps the web processes if the nba_api cache is shared, e.g.
+memcached or redis instead of the default in-memory cache.
+"""
+import logging
+import threading
+from datetime import date as date_type, datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from . import services
+from .cache import refreshing, seconds_until_tip_off
+from .utils import is_final_status
+
+logger = logging.getLogger(__name__)
+
+
+def get_jobs(today: date_type) -> List[Tuple[str, Callable]]:
+    """Return the name and service call of every dataset to keep warm, with
+    the scores of day <today>.
+    """
+    return [
+        ('score', lambda: services.get_games_by_date(today.strftime('%Y-%m-%d'))),
+        ('standings', services.get_standings),
+        ('team_list', services.get_team_list),
+        ('player_list', services.get_player_list)
+    ]
+
+
+def is_live(games: Dict, date: date_type, horizon: float = 0) -> bool:
+    """Return whether any of <games> of <date> (as returned by
+    get_games_by_date) is in progress, or tips off within <horizon> seconds.
+    """
+    for game in games.values():
+        status = game['broadcast']['GAME_STATUS_TEXT'] or ''
+        if is_final_status(status):
+            continue
+        if (game['broadcast']['LIVE_PERIOD'] or 0) > 0:
+            return True
+
+        until_tip_off = seconds_until_tip_off(status, date)
+        if until_tip_off is not None and until_tip_off <= horizon:
+            return True
+
+    return False
+
+
+def warm(min_timeout: int) -> bool:
+    """Refresh every hot dataset, cached for at least <min_timeout> seconds,
+    and return whether a game of today is live or tips off before the next
+    idle refresh.
+
+    A dataset that fails to refresh is logged and keeps its cached value.
+    """
+    live = False
+    today = datetime.today().date()
+    with refreshing(min_timeout):
+        for name, job in get_jobs(today):
+            try:
+                result = job()
+            except Exception:
+                logger.exception('Failed to warm %s', name)
+                continue
+
+            if name == 'score':
+                live = is_live(result, today, settings.NBA_API_WARM_INTERVAL)
+
+    return live
+
+
+def run(stop: Optional[threading.Event] = None) -> None:
+    """Warm the hot datasets until <stop> is set.
+    """
+    stop = stop or threading.Event()
+    interval = settings.NBA_API_WARM_LIVE_INTERVAL
+    while not stop.is_set():
+        live = warm(2 * interval)
+        interval = settings.NBA_API_WARM_LIVE_INTERVAL if live else settings.NBA_API_WARM_INTERVAL
+        logger.info('Warmed hot datasets, next refresh in %ss (live: %s)', interval, live)
+        stop.wait(interval)
+
+
+def start() -> threading.Thread:
+    """Start the warmer in a background daemon thread and return it.
+    """
+    thread = threading.Thread(target=run, name='nba-api-cache-warmer', daemon=True)
+    thread.start()
+    return thread
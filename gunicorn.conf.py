@@ -0,0 +1,24 @@
+"""Gunicorn configuration, loaded by `gunicorn nba_daily.wsgi` (see Procfile).
+
+With NBA_API_PRELOAD=1, the application is loaded (and preloaded, see
+api/preload.py) in the master process before the workers are forked.
+
+Without preload, each worker builds the search indexes (see api/search.py) in
+the background once it has loaded the application. With NBA_API_WARMER=1,
+each worker also starts the cache warmer (see api/warmer.py). Threads do not
+survive the fork, so neither can be started in the master.
+"""
+import os
+
+preload_app = os.environ.get('NBA_API_PRELOAD', '') == '1'
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    if not settings.NBA_API_PRELOAD:
+        from api.search import start_building
+        start_building()
+    if settings.NBA_API_WARMER:
+        from api.warmer import start
+        start()
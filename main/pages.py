@@ -0,0 +1,198 @@
+"""Main App Page Cache Module
+
+=== Module Description ===
+This module contains the cache of the rendered HTML pages of the main app.
+
+The list pages render hundreds of rows through custom template filters, by far
+their largest CPU cost once the upstream data is cached. With <render_page>, a
+page is only rendered once per URL and version of the dataset it shows (see
+api.utils.dataset_version), and then served from the <pages> cache until that
+dataset changes.
+
+The only part of a page that differs between visitors is the CSRF token of
+its forms. Pages are cached with the token values cut out, as the raw deflate
+blocks of each remaining part, compressed once and ending on a sync flush so
+they can be spliced together. Responses put the visitor's token back as an
+uncompressed (stored) block between the parts, so clients accepting gzip or
+deflate get the cached blocks as is, without compressing anything per
+request, in a gzip or zlib container. The checksum of the page (CRC-32 for
+gzip, Adler-32 for zlib) is combined from the checksums of its parts. Other
+clients get the page decompressed.
+"""
+import hashlib
+import re
+import struct
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+
+from api.metrics import CACHE_REQUESTS
+
+# Constants
+PAGE_CACHE_ALIAS = 'pages'
+CONTENT_TYPE = 'text/html; charset=utf-8'
+# Value of the hidden CSRF token input rendered by {% csrf_token %}
+CSRF_TOKEN_PATTERN = re.compile(rb'(?<=name="csrfmiddlewaretoken" value=")[^"]*')
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+ACCEPTS_DEFLATE = re.compile(r'\bdeflate\b')
+ZLIB_HEADER = b'\x78\x9c'
+# Header of a gzip member: deflate, no flags, no modification time, unknown OS
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+# Final empty block of a deflate stream
+FINAL_BLOCK = b'\x03\x00'
+ADLER_BASE = 65521
+
+
+class CachedPage(NamedTuple):
+    """A rendered page, split around its CSRF tokens.
+
+    === Attributes ===
+    blocks:
+        the raw deflate blocks of each part of the page.
+    checksums:
+        the Adler-32 checksum of each part.
+    crcs:
+        the CRC-32 of each part.
+    sizes:
+        the length of each part.
+    """
+    blocks: List[bytes]
+    checksums: List[int]
+    crcs: List[int]
+    sizes: List[int]
+
+
+def make_key(request, template_name: str, version: str) -> str:
+    """Return the cache key of the page of <request> rendered with
+    <template_name> from dataset <version>.
+    """
+    params = f'{template_name}|{version}|{request.get_full_path()}'
+    return f"page:{hashlib.md5(params.encode('utf-8')).hexdigest()}"
+
+
+def compress_page(content: bytes) -> CachedPage:
+    """Return the cached page of rendered <content>.
+    """
+    parts = CSRF_TOKEN_PATTERN.split(content)
+    blocks = []
+    for part in parts:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        blocks.append(compressor.compress(part) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+    return CachedPage(
+        blocks,
+        [zlib.adler32(part) for part in parts],
+        [zlib.crc32(part) for part in parts],
+        [len(part) for part in parts]
+    )
+
+
+def adler32_combine(checksum1: int, checksum2: int, size2: int) -> int:
+    """Return the Adler-32 checksum of the concatenation of two byte strings,
+    from their checksums <checksum1> and <checksum2>, and the length <size2>
+    of the second one (as adler32_combine of zlib).
+    """
+    remainder = size2 % ADLER_BASE
+    sum1 = checksum1 & 0xffff
+    sum2 = (remainder * sum1) % ADLER_BASE
+    sum1 = (sum1 + (checksum2 & 0xffff) + ADLER_BASE - 1) % ADLER_BASE
+    sum2 = (sum2 + (checksum1 >> 16) + (checksum2 >> 16) + ADLER_BASE - remainder) % ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def crc32_combine(crc1: int, crc2: int, size2: int) -> int:
+    """Return the CRC-32 of the concatenation of two byte strings, from their
+    CRCs <crc1> and <crc2>, and the length <size2> of the second one.
+
+    CRC-32 is affine in its input, so appending the second string to the first
+    differs from appending it to nothing by as much as appending <size2> zero
+    bytes does.
+    """
+    zeros = bytes(size2)
+    return crc2 ^ zlib.crc32(zeros, crc1) ^ zlib.crc32(zeros)
+
+
+def page_checksum(checksums: List[int], sizes: List[int], token: bytes,
+                  checksum: Callable, combine: Callable) -> int:
+    """Return the checksum of the page with parts of given <checksums> and
+    <sizes>, joined by <token>, using <checksum> (e.g. zlib.adler32) and its
+    <combine> function.
+    """
+    token_checksum = checksum(token)
+    result = checksums[0]
+    for part_checksum, size in zip(checksums[1:], sizes[1:]):
+        result = combine(result, token_checksum, len(token))
+        result = combine(result, part_checksum, size)
+
+    return result
+
+
+def accepted_encoding(request) -> Optional[str]:
+    """Return the content encoding of the cached pages served to <request>:
+    gzip or deflate if it accepts them (gzip first), None otherwise.
+    """
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if ACCEPTS_GZIP.search(accept_encoding):
+        return 'gzip'
+    if ACCEPTS_DEFLATE.search(accept_encoding):
+        return 'deflate'
+    return None
+
+
+def stored_block(data: bytes) -> bytes:
+    """Return <data> as an uncompressed, non-final deflate block.
+    """
+    return struct.pack('<BHH', 0, len(data), len(data) ^ 0xffff) + data
+
+
+def serve(request, page: CachedPage) -> HttpResponse:
+    """Return the response of cached <page> for <request>, with the CSRF token
+    of <request>.
+    """
+    token = get_token(request).encode('ascii')
+    encoding = accepted_encoding(request)
+    if encoding is None:
+        parts = [zlib.decompressobj(-zlib.MAX_WBITS).decompress(block) for block in page.blocks]
+        response = HttpResponse(token.join(parts), content_type=CONTENT_TYPE)
+    else:
+        blocks = stored_block(token).join(page.blocks) + FINAL_BLOCK
+        if encoding == 'gzip':
+            crc = page_checksum(page.crcs, page.sizes, token, zlib.crc32, crc32_combine)
+            size = sum(page.sizes) + len(token) * (len(page.sizes) - 1)
+            content = GZIP_HEADER + blocks + struct.pack('<II', crc, size & 0xffffffff)
+        else:
+            checksum = page_checksum(page.checksums, page.sizes, token, zlib.adler32, adler32_combine)
+            content = ZLIB_HEADER + blocks + struct.pack('>I', checksum)
+        response = HttpResponse(content, content_type=CONTENT_TYPE)
+        response['Content-Encoding'] = encoding
+
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def render_page(request, template_name: str, context: Dict, version: str) -> HttpResponse:
+    """Return the response of <template_name> rendered with <context>, the
+    context of version <version> of the dataset of the page.
+
+    The page is rendered only if it is not cached yet for this version, and is
+    then cached for PAGE_CACHE_TIMEOUT seconds. Only GET and HEAD requests are
+    served from the cache.
+    """
+    if request.method not in ('GET', 'HEAD') or not settings.PAGE_CACHE_TIMEOUT:
+        return render(request, template_name, context)
+
+    cache = caches[PAGE_CACHE_ALIAS]
+    key = make_key(request, template_name, version)
+    page = cache.get(key)
+    CACHE_REQUESTS.inc(cache=PAGE_CACHE_ALIAS, result='miss' if page is None else 'hit')
+    if page is None:
+        page = compress_page(render(request, template_name, context).content)
+        cache.set(key, page, settings.PAGE_CACHE_TIMEOUT)
+
+    return serve(request, page)
@@ -1,3 +1,77 @@
-from django.test import TestCase
+import gzip
+import zlib
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api import services
+from . import pages
+
+SCORE_PAGE = '/score/06-24-2021'
+
+
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches[pages.PAGE_CACHE_ALIAS].clear()
+        patcher = mock.patch.object(services, 'get_games_by_date', return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, encoding: str = ''):
+        return self.client.get(SCORE_PAGE, HTTP_HOST='localhost', HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_compressed_pages_decompress_to_the_identity_page(self):
+        with mock.patch.object(pages, 'get_token', return_value='token'):
+            identity = self.get()
+            deflate = self.get('deflate')
+            gzipped = self.get('gzip, deflate, br')
+
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertEqual(deflate['Content-Encoding'], 'deflate')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        # The page has a CSRF token in the search form and in the date form
+        self.assertEqual(identity.content.count(b'value="token"'), 2)
+        self.assertEqual(zlib.decompress(deflate.content), identity.content)
+        self.assertEqual(gzip.decompress(gzipped.content), identity.content)
+
+        with override_settings(PAGE_CACHE_TIMEOUT=0):
+            rendered = self.get()
+        self.assertEqual(
+            pages.CSRF_TOKEN_PATTERN.sub(b'', rendered.content), pages.CSRF_TOKEN_PATTERN.sub(b'', identity.content)
+        )
+
+    def test_pages_carry_the_token_of_the_request(self):
+        tokens = []
+
+        def record_token(request):
+            tokens.append(get_token(request))
+            return tokens[-1]
+
+        with mock.patch.object(pages, 'get_token', record_token):
+            contents = [self.get().content, zlib.decompress(self.get('deflate').content)]
+
+        self.assertNotEqual(tokens[0], tokens[1])
+        for content, token in zip(contents, tokens):
+            self.assertEqual(pages.CSRF_TOKEN_PATTERN.findall(content), [token.encode('ascii')] * 2)
+
+    def test_responses_vary_on_encoding_and_cookie(self):
+        for encoding in ['', 'deflate', 'gzip']:
+            vary = {header.strip() for header in self.get(encoding)['Vary'].split(',')}
+            self.assertLessEqual({'Accept-Encoding', 'Cookie'}, vary)
+
+    def test_pages_are_cached_per_dataset_version(self):
+        request = RequestFactory().get(SCORE_PAGE)
+        self.assertNotEqual(
+            pages.make_key(request, 'main/score.html', '1'), pages.make_key(request, 'main/score.html', '2')
+        )
+
+        with mock.patch.object(pages, 'render', wraps=pages.render) as render:
+            self.get()
+            self.get('gzip')
+            self.assertEqual(render.call_count, 1)
+
+            with mock.patch('main.views.dataset_version', return_value='2'):
+                self.get()
+            self.assertEqual(render.call_count, 2)
@@ -6,13 +6,18 @@
 
 from datetime import datetime
 
-import requests
 from dateutil import parser
+from django.core.paginator import Paginator
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_POST
 
+from api import services
+from api.utils import dataset_version
 from .forms import DateForm
+from .pages import render_page
+
+PLAYER_LIST_PAGE_SIZE = 30
 
 
 # ==============================================================================
@@ -36,7 +41,7 @@ def score(request, date: str):
 def render_score_page(request, page: str, date: datetime.date, title: str):
     """Render generic score page.
     """
-    games = requests.get(f'http://{request.get_host()}/api/score/{date}').json()
+    games = services.get_games_by_date(date.strftime('%Y-%m-%d'))
 
     # Validate date input
     if request.method == 'POST':
@@ -51,7 +56,7 @@ def render_score_page(request, page: str, date: datetime.date, title: str):
         'date': date.strftime("%b %d, %Y"),
         'games': games,
     }
-    return render(request, page, context)
+    return render_page(request, page, context, dataset_version(context))
 
 
 @require_POST
@@ -63,9 +68,9 @@ def search(request):
 
     search_type = request.POST['type']
     search_name = request.POST['name']
-    data = requests.get(f'http://{request.get_host()}/api/search/{search_type}/{search_name}')
+    data = services.search(search_type, search_name)
 
-    return render(request, 'main/search.html', data.json())
+    return render(request, 'main/search.html', data)
 
 
 # ==============================================================================
@@ -74,23 +79,37 @@ def search(request):
 def players(request, player_id):
     """Individual player stats page.
     """
-    data = requests.get(f'http://{request.get_host()}/api/players/{player_id}').json()
+    data = services.get_player_detail(player_id)
     return render(request, 'main/players.html', data)
 
 
 def players_game_log(request, player_id, season, season_type):
     """Individual player season game log page.
     """
-    url = f'http://{request.get_host()}/api/players/{player_id}/{season}/{season_type}'
-    data = requests.get(url).json()
+    data = services.get_player_game_log(player_id, season, season_type)
     return render(request, 'main/player_games.html', context=data)
 
 
 def players_stats(request):
-    """Player list page.
+    """Player list page, paged and sorted server side.
     """
-    data = requests.get(f'http://{request.get_host()}/api/player_list').json()
-    return render(request, 'main/player_list.html', context={'data': data})
+    table = services.get_player_table()
+    ordering = request.GET.get('ordering', '')
+    if ordering.lstrip('-') not in table.columns:
+        ordering = ''
+
+    rows = table.rows([ordering] if ordering else [])
+    page = Paginator(rows, PLAYER_LIST_PAGE_SIZE).get_page(request.GET.get('page'))
+    context = {
+        'data': page.object_list,
+        'page': page,
+        'ordering': ordering,
+        # Headers sort descending first, then toggle
+        'headers': [
+            (column, column if ordering == f'-{column}' else f'-{column}') for column in table.columns
+        ]
+    }
+    return render_page(request, 'main/player_list.html', context, table.version)
 
 
 # ==============================================================================
@@ -99,25 +118,25 @@ def players_stats(request):
 def teams(request, team_id):
     """Individual team detail page.
     """
-    response = requests.get(f'http://{request.get_host()}/api/teams/{team_id}')
-    return render(request, 'main/teams.html', context=response.json())
+    data = services.get_team_detail(team_id)
+    return render(request, 'main/teams.html', context=data)
 
 
 def team_game_log(request, team_id, season):
     """Individual team season game log page.
     """
-    response = requests.get(f'http://{request.get_host()}/api/teams/{team_id}/{season}/Regular')
-    return render(request, 'main/team_games.html', context=response.json())
+    data = services.get_team_game_log(team_id, season, 'Regular')
+    return render(request, 'main/team_games.html', context=data)
 
 
 def teams_stats(request):
     """Team list page.
     """
-    response = requests.get(f'http://{request.get_host()}/api/team_list')
+    table = services.get_team_table()
     context = {
-        'data': response.json()
+        'data': table.rows()[:]
     }
-    return render(request, 'main/teams_stats.html', context=context)
+    return render_page(request, 'main/teams_stats.html', context, table.version)
 
 
 # ==============================================================================
@@ -126,8 +145,8 @@ def teams_stats(request):
 def game_detail(request, game_id):
     """Single game box score page.
     """
-    response = requests.get(f'http://{request.get_host()}/api/games/{game_id}')
-    return render(request, 'main/game_detail.html', context=response.json())
+    data = services.get_game(game_id)
+    return render(request, 'main/game_detail.html', context=data)
 
 
 # ==============================================================================
@@ -136,12 +155,11 @@ def game_detail(request, game_id):
 def standings(request):
     """Season standing page.
     """
-    response = requests.get(f'http://{request.get_host()}/api/standings')
     context = {
         'headers': [
             ('bg-danger', 'East Conference', 'East'),
             ('bg-primary', 'West Conference', 'West')
         ],
-        'data': response.json()
+        'data': services.get_standings()
     }
-    return render(request, 'main/standings.html', context=context)
+    return render_page(request, 'main/standings.html', context, dataset_version(context))
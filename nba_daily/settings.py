@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.UpstreamMiddleware',
 ]
 
 ROOT_URLCONF = 'nba_daily.urls'
@@ -65,7 +67,7 @@ STATICFILES_DIRS = [
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'api.templating.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -93,6 +95,120 @@ DATABASES = {
 }
 
 
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.NumpyJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'nba_api': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nba_api',
+        'OPTIONS': {
+            'MAX_ENTRIES': 2048,
+        },
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pages',
+        'OPTIONS': {
+            'MAX_ENTRIES': 512,
+        },
+    },
+}
+
+# How long (in seconds) a rendered page of the main app is cached for the same
+# dataset version, 0 to render every page (see main/pages.py).
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60 * 60))
+
+# Per-endpoint TTL overrides (in seconds) for cached nba_api responses, e.g.
+# {'LeagueStandings': 300}. See api/cache.py for the defaults.
+NBA_API_CACHE_TIMEOUTS = {}
+
+# Path of the optional on-disk (requests-cache SQLite) nba_api response cache.
+NBA_API_DISK_CACHE = os.environ.get('NBA_API_DISK_CACHE', '')
+
+
+# Maximum number of concurrent nba_api requests made for a single page, and the
+# timeout (in seconds) of each of those requests.
+NBA_API_MAX_WORKERS = int(os.environ.get('NBA_API_MAX_WORKERS', 8))
+NBA_API_TIMEOUT = int(os.environ.get('NBA_API_TIMEOUT', 10))
+
+# Maximum number of games requested at once from /api/games?ids=...
+NBA_API_MAX_BATCH_SIZE = int(os.environ.get('NBA_API_MAX_BATCH_SIZE', 50))
+
+# Maximum number of seasons requested at once from the game log range endpoints
+NBA_API_MAX_SEASONS = int(os.environ.get('NBA_API_MAX_SEASONS', 30))
+
+# Whether concurrent fetches of the same nba_api request are also coalesced
+# across workers, through a lock in the nba_api cache. Only useful when that
+# cache is shared between workers (see api/cache.py).
+NBA_API_SINGLE_FLIGHT_LOCK = os.environ.get('NBA_API_SINGLE_FLIGHT_LOCK', '') == '1'
+
+# Upstream guards (see api/upstream.py): requests per second and burst size of
+# the rate limiter, consecutive failures opening the circuit breaker and how
+# long (in seconds) it stays open, and how long the last good response of each
+# request is kept to be served stale.
+NBA_API_RATE_LIMIT = float(os.environ.get('NBA_API_RATE_LIMIT', 5))
+NBA_API_RATE_BURST = int(os.environ.get('NBA_API_RATE_BURST', 20))
+NBA_API_BREAKER_THRESHOLD = int(os.environ.get('NBA_API_BREAKER_THRESHOLD', 5))
+NBA_API_BREAKER_COOLDOWN = int(os.environ.get('NBA_API_BREAKER_COOLDOWN', 30))
+NBA_API_STALE_TIMEOUT = int(os.environ.get('NBA_API_STALE_TIMEOUT', 24 * 60 * 60))
+
+# Record/replay of raw nba_api responses (see api/replay.py): '' (live),
+# 'record' or 'replay', the fixture directory, and the latency (in seconds)
+# injected in every replayed response.
+NBA_API_FIXTURES = os.environ.get('NBA_API_FIXTURES', '')
+NBA_API_FIXTURES_DIR = os.environ.get('NBA_API_FIXTURES_DIR', os.path.join(BASE_DIR, 'fixtures'))
+NBA_API_REPLAY_LATENCY = float(os.environ.get('NBA_API_REPLAY_LATENCY', 0))
+
+# Cache TTL (in seconds) of the payload and box score endpoint responses of a
+# game in progress. Final games are cached forever (and kept in the local
+# store) and scheduled games until tip-off.
+NBA_API_LIVE_GAME_TIMEOUT = int(os.environ.get('NBA_API_LIVE_GAME_TIMEOUT', 5))
+
+# How long (in seconds) the ETag of an API response is trusted before the
+# payload is built again to check it (see api/conditional.py).
+NBA_API_ETAG_TIMEOUT = int(os.environ.get('NBA_API_ETAG_TIMEOUT', 5))
+
+# How long (in seconds) a player bio is kept, in the nba_api cache and in the
+# local store, and whether the bios of the players of a viewed team or search
+# result are prefetched in the background (see api/bios.py), at most how many
+# players are queued for it, and its own rate limit (requests per second, see
+# api/upstream.py).
+NBA_API_PLAYER_BIO_TIMEOUT = int(os.environ.get('NBA_API_PLAYER_BIO_TIMEOUT', 3 * 24 * 60 * 60))
+NBA_API_PREFETCH_BIOS = os.environ.get('NBA_API_PREFETCH_BIOS', '1') == '1'
+NBA_API_PREFETCH_QUEUE_SIZE = int(os.environ.get('NBA_API_PREFETCH_QUEUE_SIZE', 100))
+NBA_API_PREFETCH_RATE = float(os.environ.get('NBA_API_PREFETCH_RATE', 1))
+
+# Whether the web process loads the nba_api endpoints and everything else the
+# workers need at startup, before gunicorn forks them (see api/preload.py and
+# gunicorn.conf.py), instead of on the first requests of each worker.
+NBA_API_PRELOAD = os.environ.get('NBA_API_PRELOAD', '') == '1'
+
+# Background refresh of the hot page datasets (see api/warmer.py), and its
+# interval (in seconds) when no game is live and while a game is live.
+NBA_API_WARMER = os.environ.get('NBA_API_WARMER', '') == '1'
+NBA_API_WARM_INTERVAL = int(os.environ.get('NBA_API_WARM_INTERVAL', 300))
+NBA_API_WARM_LIVE_INTERVAL = int(os.environ.get('NBA_API_WARM_LIVE_INTERVAL', 30))
+
+# Bearer token of the scrapers allowed to read /metrics (see api/metrics.py).
+# Without it, only staff users can.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
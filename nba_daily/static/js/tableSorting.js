@@ -140,19 +140,11 @@ $(document).ready(function () {
       $(".player-list-table").wrap("<div class='table-responsive'></div>");
     },
 
-    pagingType: "full_numbers",
-    paging: true,
-    pageLength: 30,
-    "bLengthChange": false,
+    /* Paged and sorted server side */
+    paging: false,
+    ordering: false,
     "bFilter": false,
-    "bInfo": false,
-    /* Disable initial sort */
-    "aaSorting": [],
-    "aoColumns": [
-      {"orderSequence": ["desc", "asc"]},
-      {"bSortable": false},
-      {"bSortable": false}
-    ].concat(getAOColumnsDesc(20))
+    "bInfo": false
   });
 });
 
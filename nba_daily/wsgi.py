@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nba_daily.settings')
 
 application = get_wsgi_application()
+
+if settings.NBA_API_PRELOAD:
+    from api.preload import preload
+    preload()